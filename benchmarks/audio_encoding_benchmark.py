@@ -0,0 +1,66 @@
+"""Measures CPU cost and compression ratio of the client-side audio encoders.
+
+Usage: python benchmarks/audio_encoding_benchmark.py [16 bit PCM WAV file]
+
+Without a file, ten seconds of synthetic speech-like audio are used.
+"""
+
+import math
+import os
+import random
+import struct
+import sys
+import time
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from rev_ai.audioencoding import FlacEncoder, MulawEncoder  # noqa: E402
+
+CHUNK_SIZE = 8000
+
+
+def synthetic_audio(rate, seconds):
+    random.seed(0)
+    samples = []
+    for i in range(rate * seconds):
+        envelope = max(0.0, math.sin(i * 2 * math.pi / rate))
+        value = 6000 * envelope * (math.sin(i * 0.07) + 0.5 * math.sin(i * 0.31)) + \
+            random.gauss(0, 150)
+        samples.append(int(max(-32768, min(32767, value))))
+    return struct.pack('<{}h'.format(len(samples)), *samples), rate, 1
+
+
+def read_wav(filename):
+    reader = wave.open(filename, 'rb')
+    try:
+        return reader.readframes(reader.getnframes()), reader.getframerate(), \
+            reader.getnchannels()
+    finally:
+        reader.close()
+
+
+def main():
+    if len(sys.argv) > 1:
+        pcm, rate, channels = read_wav(sys.argv[1])
+    else:
+        pcm, rate, channels = synthetic_audio(16000, 10)
+    duration = len(pcm) / float(2 * channels * rate)
+    chunks = [pcm[i:i + CHUNK_SIZE] for i in range(0, len(pcm), CHUNK_SIZE)]
+
+    print('{:.1f} s of audio, {} Hz, {} channel(s), {} kbps raw'.format(
+        duration, rate, channels, 16 * rate * channels // 1000))
+    print('{:<10} {:>8} {:>10} {:>14}'.format('encoder', 'ratio', 'kbps', 'x realtime'))
+    for encoder in [MulawEncoder(rate, channels), FlacEncoder(rate, channels)]:
+        start = time.time()
+        size = sum(len(data) for data in encoder.encode_stream(iter(chunks)))
+        elapsed = time.time() - start
+        print('{:<10} {:>8.3f} {:>10.1f} {:>14.1f}'.format(
+            type(encoder).__name__.replace('Encoder', ''),
+            size / float(len(pcm)),
+            size * 8 / duration / 1000,
+            duration / elapsed))
+
+
+if __name__ == '__main__':
+    main()
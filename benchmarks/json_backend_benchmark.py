@@ -0,0 +1,82 @@
+"""Compares the installed JSON backends on the payloads the SDK handles.
+
+Usage: python benchmarks/json_backend_benchmark.py
+
+Measures decoding of a page of jobs, of a transcript and of streaming
+frames, and encoding of job submission options.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from rev_ai.jsonbackend import BACKENDS, JsonBackend  # noqa: E402
+
+REPEAT = 5
+
+
+def jobs_page():
+    return json.dumps([{
+        'id': 'job{:06d}'.format(i), 'created_on': '2021-06-01T00:00:00.000Z',
+        'status': 'transcribed', 'name': 'file{}.mp3'.format(i), 'type': 'async',
+        'duration_seconds': 61.5, 'language': 'en'} for i in range(1000)]).encode('utf-8')
+
+
+def transcript():
+    random.seed(0)
+    elements = []
+    for i in range(20000):
+        elements.append({'type': 'text', 'value': 'word', 'ts': i * 0.4,
+                         'end_ts': i * 0.4 + 0.3, 'confidence': random.random()})
+        elements.append({'type': 'punct', 'value': ' '})
+    return json.dumps({'monologues': [{'speaker': 0, 'elements': elements}]}).encode('utf-8')
+
+
+def streaming_frames():
+    return [json.dumps({'type': 'partial', 'ts': i * 0.1, 'end_ts': i * 0.1 + 0.5,
+                        'elements': [{'type': 'text', 'value': 'word'}] * (i % 12 + 1)})
+            for i in range(5000)]
+
+
+def submission_options():
+    return [{'metadata': 'batch {}'.format(i), 'callback_url': 'https://example.com/done',
+             'skip_diarization': False, 'language': 'en', 'delete_after_seconds': 86400,
+             'custom_vocabularies': [{'phrases': ['Rev.ai', 'diarization']}]}
+            for i in range(5000)]
+
+
+def best_of(function):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    page, document, frames, options = jobs_page(), transcript(), streaming_frames(), \
+        submission_options()
+    print('{:<12} {:>12} {:>15} {:>12} {:>12}'.format(
+        'backend', 'jobs ms', 'transcript ms', 'frames ms', 'options ms'))
+    for name in BACKENDS:
+        try:
+            backend = JsonBackend(name)
+        except ImportError:
+            print('{:<12} not installed'.format(name))
+            continue
+        print('{:<12} {:>12.2f} {:>15.2f} {:>12.2f} {:>12.2f}'.format(
+            name,
+            best_of(lambda: backend.loads(page)),
+            best_of(lambda: backend.loads(document)),
+            best_of(lambda: [backend.loads(frame) for frame in frames]),
+            best_of(lambda: [backend.dumps(option, sort_keys=True) for option in options])))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""Measures decoding time and memory of job lists and transcripts.
+
+Usage: python benchmarks/model_decoding_benchmark.py [jobs] [words]
+
+Compares models built one dict.get at a time on __dict__ classes, as before
+the models were slotted, with the slotted models decoded by every installed
+JSON backend.
+"""
+
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from rev_ai import jsonbackend  # noqa: E402
+from rev_ai.models import JobStatus  # noqa: E402
+
+REPEAT = 5
+
+
+class DictJob:
+    def __init__(self, id_, created_on, status, completed_on=None, name=None,
+                 callback_url=None, metadata=None, media_url=None, failure=None,
+                 failure_detail=None, duration_seconds=None):
+        self.id = id_
+        self.created_on = created_on
+        self.status = status
+        self.completed_on = completed_on
+        self.name = name
+        self.callback_url = callback_url
+        self.metadata = metadata
+        self.media_url = media_url
+        self.failure = failure
+        self.failure_detail = failure_detail
+        self.duration_seconds = duration_seconds
+
+    @classmethod
+    def from_json(cls, json):
+        return cls(json['id'], json['created_on'], JobStatus.from_string(json['status']),
+                   json.get('completed_on'), json.get('name'), json.get('callback_url'),
+                   json.get('metadata'), json.get('media_url'), json.get('failure'),
+                   json.get('failure_detail'), json.get('duration_seconds'))
+
+
+class DictElement:
+    def __init__(self, type_, value, timestamp, end_timestamp, confidence):
+        self.type_ = type_
+        self.value = value
+        self.timestamp = timestamp
+        self.end_timestamp = end_timestamp
+        self.confidence = confidence
+
+    @classmethod
+    def from_json(cls, json):
+        return cls(json['type'], json['value'], json.get('ts'), json.get('end_ts'),
+                   json.get('confidence'))
+
+
+def jobs_json(count):
+    random.seed(0)
+    return json.dumps([{
+        'id': 'job{:06d}'.format(i),
+        'created_on': '2021-06-01T00:00:{:02d}.000Z'.format(i % 60),
+        'completed_on': '2021-06-01T00:05:00.000Z',
+        'status': random.choice(['transcribed', 'in_progress', 'failed']),
+        'name': 'file{}.mp3'.format(i),
+        'metadata': 'batch {}'.format(i % 10),
+        'duration_seconds': random.random() * 600,
+        'type': 'async',
+        'language': 'en'} for i in range(count)]).encode('utf-8')
+
+
+def transcript_json(words):
+    random.seed(0)
+    elements = []
+    for i in range(words):
+        elements.append({'type': 'text', 'value': 'word', 'ts': i * 0.4,
+                         'end_ts': i * 0.4 + 0.3, 'confidence': random.random()})
+        elements.append({'type': 'punct', 'value': ' '})
+    monologues = [{'speaker': i % 2, 'elements': elements[i:i + 200]}
+                  for i in range(0, len(elements), 200)]
+    return json.dumps({'monologues': monologues}).encode('utf-8')
+
+
+def measure(decode, data):
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        decode(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    tracemalloc.start()
+    result = decode(data)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return best, size
+
+
+def main():
+    job_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    word_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    jobs = jobs_json(job_count)
+    transcript = transcript_json(word_count)
+
+    cases = [('dict classes, json', 'json',
+              lambda data: [DictJob.from_json(job) for job in json.loads(data.decode('utf-8'))],
+              lambda data: [DictElement.from_json(element)
+                            for monologue in json.loads(data.decode('utf-8'))['monologues']
+                            for element in monologue['elements']])]
+    for name in jsonbackend.BACKENDS:
+        try:
+            jsonbackend.JsonBackend(name)
+        except ImportError:
+            continue
+        cases.append(('slots, ' + name, name, jsonbackend.decode_jobs,
+                      jsonbackend.decode_transcript))
+
+    print('{} jobs ({} KiB), transcript of {} words ({} KiB)'.format(
+        job_count, len(jobs) // 1024, word_count, len(transcript) // 1024))
+    print('{:<20} {:>10} {:>12} {:>14} {:>14}'.format(
+        'decoder', 'jobs ms', 'B per job', 'transcript ms', 'B per element'))
+    for label, backend, decode_jobs, decode_transcript in cases:
+        jsonbackend.set_backend(backend)
+        jobs_time, jobs_size = measure(decode_jobs, jobs)
+        transcript_time, transcript_size = measure(decode_transcript, transcript)
+        print('{:<20} {:>10.2f} {:>12} {:>14.2f} {:>14}'.format(
+            label, jobs_time * 1000, jobs_size // job_count,
+            transcript_time * 1000, transcript_size // (2 * word_count)))
+
+
+if __name__ == '__main__':
+    main()
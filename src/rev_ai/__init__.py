@@ -3,4 +3,40 @@
 
 __version__ = '2.12.0'
 
-from .models import Job, JobStatus, Account, Transcript, MediaConfig, CaptionType, CustomVocabulary
+import importlib
+import sys
+
+# Public names of the package and the submodules defining them. On Python 3.7
+# and later they, like every submodule, are imported on first access so that
+# importing the package does not pay for models and clients it does not use.
+_lazy_names = {
+    'Job': 'models',
+    'JobStatus': 'models',
+    'Account': 'models',
+    'Transcript': 'models',
+    'MediaConfig': 'models',
+    'CaptionType': 'models',
+    'CustomVocabulary': 'models',
+    'CustomVocabularyStatus': 'models',
+    'CustomVocabularyInformation': 'models',
+}
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        if name in _lazy_names:
+            value = getattr(importlib.import_module('.' + _lazy_names[name], __name__), name)
+            globals()[name] = value
+            return value
+        if not name.startswith('_'):
+            try:
+                return importlib.import_module('.' + name, __name__)
+            except ImportError as err:
+                if getattr(err, 'name', None) != '{}.{}'.format(__name__, name):
+                    raise
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+
+    def __dir__():
+        return sorted(set(globals()) | set(_lazy_names))
+else:
+    from .models import Job, JobStatus, Account, Transcript, MediaConfig, CaptionType, \
+        CustomVocabulary, CustomVocabularyStatus, CustomVocabularyInformation
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""Cached account balance and local ledger of credits spent by submissions"""
+
+import threading
+import wave
+from .models import JobStatus
+from .ratelimit import _clock
+from . import utils
+
+
+class InsufficientBalance(Exception):
+    """Raised before submitting media whose expected duration exceeds the
+    balance left on the account
+    """
+    pass
+
+
+class AccountMonitor:
+    """Keeps the Account fetched from the API for a time to live, and a ledger
+    of the seconds expected to be billed for jobs submitted since. The
+    balance still available is the cached balance minus the outstanding
+    charges and the reservations of submissions in progress, so that batches
+    stop submitting before the API refuses jobs for lack of credits. The
+    cache is reconciled with the server once its time to live expires: the
+    status of every outstanding job is refreshed, and charges of jobs which
+    finished are then dropped as the server balance includes them.
+
+    Example::
+
+        client = RevAiAPIClient(token, account_monitor=AccountMonitor(ttl=300))
+        client.submit_job_local_file('meeting.wav')  # raises InsufficientBalance
+        print(client.account_monitor.available_seconds())
+    """
+
+    def __init__(self, client=None, ttl=300.0, reserve_seconds=0):
+        """Constructor
+
+        :param client (optional): RevAiAPIClient used to fetch the account and
+            the status of outstanding jobs. A RevAiAPIClient given this
+            monitor uses itself if None
+        :param ttl (optional): seconds during which a fetched Account is used
+            before it is fetched again
+        :param reserve_seconds (optional): seconds of balance never spent by
+            admitted submissions
+        """
+        self.client = client
+        self.ttl = ttl
+        self.reserve_seconds = reserve_seconds
+        self._account = None
+        self._fetched_at = None
+        # Job id to [expected seconds, whether the job finished, time it finished]
+        self._charges = {}
+        # Reservation to seconds, for submissions without a job id yet
+        self._reservations = {}
+        self._lock = threading.Lock()
+
+    def account(self):
+        """Returns the cached Account, fetching it if its time to live expired
+
+        :raises: HTTPError
+        """
+        with self._lock:
+            account = self._account
+            if account is not None and _clock() - self._fetched_at < self.ttl:
+                return account
+        return self.reconcile()
+
+    def reconcile(self):
+        """Refreshes the status of the outstanding jobs, fetches the Account
+        from the server and drops the charges of jobs which finished before it
+        was fetched. Jobs which no longer exist are dropped as well.
+
+        :returns: Account
+        :raises: HTTPError
+        """
+        from requests.exceptions import HTTPError
+
+        if self.client is None:
+            raise ValueError('client must be provided')
+        with self._lock:
+            pending = [job_id for job_id, charge in self._charges.items() if not charge[1]]
+        for job_id in pending:
+            try:
+                job = self.client.get_job_details(job_id)
+            except HTTPError as err:
+                if not utils._is_not_found(err):
+                    raise
+                with self._lock:
+                    self._charges.pop(job_id, None)
+                continue
+            self.update(job)
+
+        fetched_at = _clock()
+        account = self.client.get_account()
+        with self._lock:
+            self._account = account
+            self._fetched_at = fetched_at
+            for job_id, charge in list(self._charges.items()):
+                if charge[1] and charge[2] <= fetched_at:
+                    del self._charges[job_id]
+        return account
+
+    def outstanding_seconds(self):
+        """Returns the seconds charged or reserved but not yet in the cached balance"""
+        with self._lock:
+            return self._outstanding()
+
+    def available_seconds(self):
+        """Returns the seconds of audio which can still be submitted
+
+        :raises: HTTPError
+        """
+        balance = self.account().balance_seconds
+        return balance - self.outstanding_seconds() - self.reserve_seconds
+
+    def admit(self, seconds):
+        """Checks that media of the given duration can be submitted and
+        reserves its seconds in the same step, so that concurrent submissions
+        cannot all be admitted against the same balance. When the cached
+        balance is insufficient it is fetched again once, in case credits
+        were added. The reservation must be passed to commit once the job is
+        submitted, or to release if the submission failed.
+
+        :param seconds: expected duration of the media, 0 if unknown
+        :returns: reservation
+        :raises: InsufficientBalance if the balance does not cover it
+        :raises: HTTPError
+        """
+        seconds = seconds or 0
+        reservation = _Reservation()
+        for fetch in (self.account, self.reconcile):
+            balance = fetch().balance_seconds
+            with self._lock:
+                available = balance - self._outstanding() - self.reserve_seconds
+                if available > 0 and seconds <= available:
+                    self._reservations[reservation] = seconds
+                    return reservation
+        raise InsufficientBalance(
+            '{:.0f} seconds of audio exceed the {:.0f} seconds of balance available'.format(
+                seconds, max(available, 0)))
+
+    def commit(self, reservation, job_id, seconds=None):
+        """Replaces a reservation by the charge of the job submitted with it
+
+        :param reservation: reservation returned by admit
+        :param job_id: id of the submitted job
+        :param seconds (optional): seconds expected to be billed for the job.
+            The reserved seconds if None
+        """
+        with self._lock:
+            reserved = self._reservations.pop(reservation, 0)
+            self._charges[job_id] = [reserved if seconds is None else seconds, False, None]
+
+    def release(self, reservation, seconds=None):
+        """Gives back the seconds of a reservation whose submission failed
+
+        :param reservation: reservation returned by admit
+        :param seconds (optional): number of seconds to give back, all of
+            them if None
+        """
+        with self._lock:
+            reserved = self._reservations.pop(reservation, 0)
+            if seconds is not None and seconds < reserved:
+                self._reservations[reservation] = reserved - seconds
+
+    def charge(self, job_id, seconds):
+        """Records the seconds expected to be billed for a job submitted
+        without a reservation
+        """
+        with self._lock:
+            self._charges[job_id] = [seconds or 0, False, None]
+
+    def update(self, job):
+        """Updates the ledger from a Job. Its duration_seconds replaces the
+        expected duration, failed jobs cost nothing and finished jobs are
+        settled.
+        """
+        with self._lock:
+            charge = self._charges.get(job.id)
+            if charge is None:
+                return
+            if job.status == JobStatus.FAILED:
+                charge[0] = 0
+            elif job.duration_seconds is not None:
+                charge[0] = job.duration_seconds
+            if job.status != JobStatus.IN_PROGRESS and not charge[1]:
+                charge[1] = True
+                charge[2] = _clock()
+
+    def ledger(self):
+        """Returns a dictionary of job id to outstanding seconds"""
+        with self._lock:
+            return dict((job_id, charge[0]) for job_id, charge in self._charges.items())
+
+    def _outstanding(self):
+        return sum(charge[0] for charge in self._charges.values()) + \
+            sum(self._reservations.values())
+
+
+class _Reservation:
+    pass
+
+
+def probe_duration(filename):
+    """Returns the duration in seconds of a WAV file, or None if the duration
+    of the file cannot be determined locally
+    """
+    try:
+        reader = wave.open(filename, 'rb')
+    except (wave.Error, EOFError, IOError, OSError):
+        return None
+    try:
+        return reader.getnframes() / float(reader.getframerate())
+    finally:
+        reader.close()
@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
 """Speech recognition tools for using Rev.ai"""
 
-import json
-from .models import Account, CaptionType, Job, Transcript
+import copy
+import os
+import tempfile
+from .models import Account, CaptionType, Job, JobStatus, Transcript
 from .baseclient import BaseClient
+from . import deadline
+from . import jsonbackend
 from . import utils
+from .singleflight import SingleFlight
+from .vocabularyregistry import _resolve_vocabulary_id
 
 try:
     from urllib.parse import urljoin
@@ -26,15 +32,51 @@ class RevAiAPIClient(BaseClient):
     # Rev.ai transcript format
     rev_json_content_type = 'application/vnd.rev.transcript.v1.0+json'
 
-    def __init__(self, access_token):
+    def __init__(
+            self,
+            access_token,
+            dedup_index=None,
+            cache=None,
+            hedging_policy=None,
+            rate_limiter=None,
+            timeout=None,
+            hooks=None,
+            vocabulary_registry=None,
+            account_monitor=None):
         """Constructor
 
         :param access_token: access token which authorizes all requests and links them to your
                              account. Generated on the settings page of your account dashboard
                              on Rev.ai.
+        :param dedup_index: optional JobDedupIndex. Local files already submitted with the same
+                            options are then not uploaded again, and their existing job is
+                            returned instead.
+        :param cache: optional TranscriptCache. Transcripts and captions are then only
+                      downloaded once, as they never change once a job is transcribed.
+        :param hedging_policy: optional HedgingPolicy. Slow GET requests are then duplicated
+                               and the first response wins.
+        :param rate_limiter: optional RateLimiter, which may be shared with other clients,
+                             limiting the rate of requests.
+        :param timeout: optional default timeout of requests in seconds, or tuple of connect
+                        and read timeouts. Requests wait indefinitely if None.
+        :param hooks: optional instrumentation Hooks called around every request, for
+                      example to export metrics or traces.
+        :param vocabulary_registry: optional VocabularyRegistry. A CustomVocabulary, or list
+                                    of them, may then be passed as custom_vocabulary_id and
+                                    is only submitted if the registry does not know it.
+        :param account_monitor: optional AccountMonitor. Submissions are then refused with
+                                InsufficientBalance before the account runs out of credits.
         """
 
-        BaseClient.__init__(self, access_token)
+        BaseClient.__init__(self, access_token, hedging_policy, rate_limiter, timeout, hooks)
+        self.dedup_index = dedup_index
+        self.cache = cache
+        self.vocabulary_registry = vocabulary_registry
+        self.account_monitor = account_monitor
+        if account_monitor is not None and account_monitor.client is None:
+            account_monitor.client = self
+        # Concurrent identical reads of job details and transcripts share one request
+        self.single_flight = SingleFlight()
 
     def submit_job_url(
             self, media_url,
@@ -76,13 +118,17 @@ class RevAiAPIClient(BaseClient):
         :param language: specify language using ISO 639-1 2-letter language code
         :param custom_vocabulary_id: The id of a pre-completed custom vocabulary
             submitted through the custom vocabularies api. Cannot be used with the
-            custom_vocabularies parameter.
+            custom_vocabularies parameter. With a vocabulary_registry, a
+            CustomVocabulary or list of them whose id is looked up in the registry.
         :returns: raw response data
         :raises: HTTPError
         """
         if not media_url:
             raise ValueError('media_url must be provided')
 
+        custom_vocabulary_id = _resolve_vocabulary_id(self.vocabulary_registry,
+                                                      custom_vocabulary_id)
+
         payload = self._create_job_options_payload(media_url, metadata,
                                                    callback_url, skip_diarization,
                                                    skip_punctuation, speaker_channels_count,
@@ -90,13 +136,26 @@ class RevAiAPIClient(BaseClient):
                                                    remove_disfluencies, delete_after_seconds,
                                                    language, custom_vocabulary_id)
 
-        response = self._make_http_request(
-            "POST",
-            urljoin(self.base_url, 'jobs'),
-            json=payload
-        )
+        reservation = None
+        if self.account_monitor is not None:
+            # The duration of remote media is unknown until the job reports it
+            reservation = self.account_monitor.admit(0)
+        try:
+            response = self._make_http_request(
+                "POST",
+                urljoin(self.base_url, 'jobs'),
+                data=utils._json_body(payload, custom_vocabularies),
+                headers={'Content-Type': 'application/json'}
+            )
+            job = Job.from_json(jsonbackend.loads(response.content))
+        except Exception:
+            if reservation is not None:
+                self.account_monitor.release(reservation)
+            raise
 
-        return Job.from_json(response.json())
+        if reservation is not None:
+            self.account_monitor.commit(reservation, job.id, job.duration_seconds)
+        return job
 
     def submit_job_local_file(
             self, filename,
@@ -110,7 +169,8 @@ class RevAiAPIClient(BaseClient):
             remove_disfluencies=False,
             delete_after_seconds=None,
             language=None,
-            custom_vocabulary_id=None):
+            custom_vocabulary_id=None,
+            encoder=None):
         """Submit a local file for transcription.
         Note that the content type is inferred if not provided.
 
@@ -138,32 +198,35 @@ class RevAiAPIClient(BaseClient):
         :param language: specify language using ISO 639-1 2-letter language code
         :param custom_vocabulary_id: The id of a pre-completed custom vocabulary
             submitted through the custom vocabularies api. Cannot be used with the
-            custom_vocabulaies parameter.
+            custom_vocabulaies parameter. With a vocabulary_registry, a
+            CustomVocabulary or list of them whose id is looked up in the registry.
+        :param encoder: optional AudioEncoder used to compress a WAV or raw
+            S16LE file into a temporary file before uploading it
         :returns: raw response data
         :raises: HTTPError
         """
         if not filename:
             raise ValueError('filename must be provided')
 
+        custom_vocabulary_id = _resolve_vocabulary_id(self.vocabulary_registry,
+                                                      custom_vocabulary_id)
+
         payload = self._create_job_options_payload(None, metadata, callback_url, skip_diarization,
                                                    skip_punctuation, speaker_channels_count,
                                                    custom_vocabularies, filter_profanity,
                                                    remove_disfluencies, delete_after_seconds,
                                                    language, custom_vocabulary_id)
 
-        with open(filename, 'rb') as f:
-            files = {
-                'media': (filename, f),
-                'options': (None, json.dumps(payload, sort_keys=True))
-            }
+        if self.dedup_index is not None:
+            options = dict(payload)
+            if encoder:
+                options['encoding'] = encoder.content_type
+            return self._submit_job_deduplicated(
+                self.dedup_index.make_key(filename, options),
+                lambda: self._submit_job_local_file(filename, payload, encoder),
+                delete_after_seconds)
 
-            response = self._make_http_request(
-                "POST",
-                urljoin(self.base_url, 'jobs'),
-                files=files
-            )
-
-        return Job.from_json(response.json())
+        return self._submit_job_local_file(filename, payload, encoder)
 
     def get_job_details(self, id_):
         """View information about a specific job.
@@ -176,12 +239,7 @@ class RevAiAPIClient(BaseClient):
         if not id_:
             raise ValueError('id_ must be provided')
 
-        response = self._make_http_request(
-            "GET",
-            urljoin(self.base_url, 'jobs/{}'.format(id_))
-        )
-
-        return Job.from_json(response.json())
+        return self.single_flight.do(('job', id_), lambda: self._get_job_details(id_), copy.copy)
 
     def get_list_of_jobs(self, limit=None, starting_after=None):
         """Get a list of transcription jobs submitted within the last week in reverse
@@ -207,7 +265,73 @@ class RevAiAPIClient(BaseClient):
             urljoin(self.base_url, 'jobs{}'.format(query))
         )
 
-        return [Job.from_json(job) for job in response.json()]
+        jobs = Job.list_from_json(jsonbackend.loads(response.content))
+        if self.account_monitor is not None:
+            for job in jobs:
+                self.account_monitor.update(job)
+        return jobs
+
+    def iter_jobs(
+            self,
+            page_size=100,
+            statuses=None,
+            created_after=None,
+            created_before=None,
+            prefetch=True):
+        """Iterate over transcription jobs submitted within the last week in reverse
+        chronological order, following pagination cursors automatically. The next
+        page is fetched in the background while the current one is consumed.
+
+        :param page_size: optional, number of jobs requested per call, max 1000
+        :param statuses: optional, collection of JobStatus to filter jobs by
+        :param created_after: optional, datetime in UTC or ISO 8601 string. Iteration
+                              stops at the first job created before it
+        :param created_before: optional, datetime in UTC or ISO 8601 string. Jobs
+                               created at or after it are skipped
+        :param prefetch: optional, whether to fetch the next page in the background
+        :returns: generator of jobs
+        :raises: HTTPError
+        """
+        if not 1 <= page_size <= 1000:
+            raise ValueError('page_size must be between 1 and 1000')
+        if created_after is not None:
+            created_after = utils._parse_datetime(created_after)
+        if created_before is not None:
+            created_before = utils._parse_datetime(created_before)
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            page = self.get_list_of_jobs(page_size)
+            while page:
+                next_page = None
+                past_window = created_after is not None and \
+                    utils._parse_datetime(page[-1].created_on) < created_after
+                if len(page) == page_size and not past_window:
+                    if executor is not None:
+                        next_page = executor.submit(deadline._propagate(
+                            self.get_list_of_jobs), page_size, page[-1].id)
+                    else:
+                        next_page = page[-1].id
+
+                for job in page:
+                    created_on = utils._parse_datetime(job.created_on)
+                    if created_after is not None and created_on < created_after:
+                        return
+                    if created_before is not None and created_on >= created_before:
+                        continue
+                    if statuses is not None and job.status not in statuses:
+                        continue
+                    yield job
+
+                if next_page is None:
+                    return
+                page = next_page.result() if executor is not None \
+                    else self.get_list_of_jobs(page_size, next_page)
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False)
 
     def get_transcript_text(self, id_):
         """Get the transcript of a specific job as plain text.
@@ -219,9 +343,13 @@ class RevAiAPIClient(BaseClient):
         if not id_:
             raise ValueError('id_ must be provided')
 
+        url = urljoin(self.base_url, 'jobs/{}/transcript'.format(id_))
+        if self.cache is not None:
+            return self._get_cached_content(id_, url, 'text/plain').decode('utf-8')
+
         response = self._make_http_request(
             "GET",
-            urljoin(self.base_url, 'jobs/{}/transcript'.format(id_)),
+            url,
             headers={'Accept': 'text/plain'}
         )
 
@@ -257,13 +385,8 @@ class RevAiAPIClient(BaseClient):
         if not id_:
             raise ValueError('id_ must be provided')
 
-        response = self._make_http_request(
-            "GET",
-            urljoin(self.base_url, 'jobs/{}/transcript'.format(id_)),
-            headers={'Accept': self.rev_json_content_type}
-        )
-
-        return response.json()
+        return self.single_flight.do(
+            ('transcript_json', id_), lambda: self._get_transcript_json(id_), copy.deepcopy)
 
     def get_transcript_json_as_stream(self, id_):
         """Get the transcript of a specific job as streamed json.
@@ -285,23 +408,24 @@ class RevAiAPIClient(BaseClient):
 
         return response
 
-    def get_transcript_object(self, id_):
+    def get_transcript_object(self, id_, time_map=None):
         """Get the transcript of a specific job as a python object`.
 
         :param id_: id of job to be requested
+        :param time_map: optional TimeMap returned by compact_silence when the
+            job's media was compacted. Element timestamps are converted to
+            times in the original media
         :returns: transcript data as a python object
         :raises: HTTPError
         """
         if not id_:
             raise ValueError('id_ must be provided')
 
-        response = self._make_http_request(
-            "GET",
-            urljoin(self.base_url, 'jobs/{}/transcript'.format(id_)),
-            headers={'Accept': self.rev_json_content_type}
-        )
-
-        return Transcript.from_json(response.json())
+        transcript = Transcript.from_json(self.single_flight.do(
+            ('transcript_json', id_), lambda: self._get_transcript_json(id_), copy.deepcopy))
+        if time_map is not None:
+            time_map.remap_transcript(transcript)
+        return transcript
 
     def get_captions(self, id_, content_type=CaptionType.SRT, channel_id=None):
         """Get the captions output of a specific job and return it as plain text
@@ -316,9 +440,14 @@ class RevAiAPIClient(BaseClient):
             raise ValueError('id_ must be provided')
         query = self._create_captions_query(channel_id)
 
+        url = urljoin(self.base_url, 'jobs/{0}/captions{1}'.format(id_, query))
+        if self.cache is not None:
+            return self._get_cached_content(
+                id_, url, content_type.value, channel_id).decode('utf-8')
+
         response = self._make_http_request(
             "GET",
-            urljoin(self.base_url, 'jobs/{0}/captions{1}'.format(id_, query)),
+            url,
             headers={'Accept': content_type.value}
         )
 
@@ -364,6 +493,11 @@ class RevAiAPIClient(BaseClient):
             urljoin(self.base_url, 'jobs/{}'.format(id_)),
         )
 
+        if self.dedup_index is not None:
+            self.dedup_index.remove_job(id_)
+        if self.cache is not None:
+            self.cache.invalidate(id_)
+
         return
 
     def get_account(self):
@@ -376,7 +510,7 @@ class RevAiAPIClient(BaseClient):
             urljoin(self.base_url, 'account')
         )
 
-        return Account.from_json(response.json())
+        return Account.from_json(jsonbackend.loads(response.content))
 
     def _create_job_options_payload(
             self, media_url,
@@ -421,3 +555,107 @@ class RevAiAPIClient(BaseClient):
 
     def _create_captions_query(self, speaker_channel):
         return '' if speaker_channel is None else '?speaker_channel={}'.format(speaker_channel)
+
+    def _get_job_details(self, id_):
+        response = self._make_http_request(
+            "GET",
+            urljoin(self.base_url, 'jobs/{}'.format(id_))
+        )
+
+        job = Job.from_json(jsonbackend.loads(response.content))
+        if self.account_monitor is not None:
+            self.account_monitor.update(job)
+        return job
+
+    def _get_transcript_json(self, id_):
+        url = urljoin(self.base_url, 'jobs/{}/transcript'.format(id_))
+        if self.cache is not None:
+            return jsonbackend.loads(self._get_cached_content(
+                id_, url, self.rev_json_content_type))
+
+        response = self._make_http_request(
+            "GET",
+            url,
+            headers={'Accept': self.rev_json_content_type}
+        )
+
+        return jsonbackend.loads(response.content)
+
+    def _get_cached_content(self, id_, url, accept, channel_id=None):
+        content = self.cache.get(id_, accept, channel_id)
+        if content is None:
+            response = self._make_http_request("GET", url, headers={'Accept': accept})
+            content = response.content
+            self.cache.put(id_, accept, content, channel_id)
+        return content
+
+    def _submit_job_media(self, filename, f, payload):
+        files = {
+            'media': (filename, f),
+            'options': (None, jsonbackend.dumps(payload, sort_keys=True))
+        }
+
+        response = self._make_http_request(
+            "POST",
+            urljoin(self.base_url, 'jobs'),
+            files=files
+        )
+
+        return Job.from_json(jsonbackend.loads(response.content))
+
+    def _submit_job_local_file(self, filename, payload, encoder):
+        if self.account_monitor is None:
+            return self._upload_local_file(filename, payload, encoder)
+
+        from .accountmonitor import probe_duration
+
+        reservation = self.account_monitor.admit(probe_duration(filename))
+        try:
+            job = self._upload_local_file(filename, payload, encoder)
+        except Exception:
+            self.account_monitor.release(reservation)
+            raise
+        self.account_monitor.commit(reservation, job.id, job.duration_seconds)
+        return job
+
+    def _upload_local_file(self, filename, payload, encoder):
+        if encoder:
+            from .audioencoding import encode_file
+
+            with tempfile.TemporaryFile() as f:
+                encode_file(encoder, filename, f)
+                f.seek(0)
+                encoded_filename = os.path.splitext(filename)[0] + encoder.file_extension
+                return self._submit_job_media(encoded_filename, f, payload)
+
+        with open(filename, 'rb') as f:
+            return self._submit_job_media(filename, f, payload)
+
+    def _submit_job_deduplicated(self, key, submit, delete_after_seconds):
+        while True:
+            job_id = self.dedup_index.acquire(key)
+            if job_id is None:
+                break
+            job = self._get_reusable_job(job_id)
+            if job is not None:
+                return job
+            self.dedup_index.remove(key)
+
+        try:
+            job = submit()
+        except Exception:
+            self.dedup_index.release(key)
+            raise
+        self.dedup_index.record(key, job.id, delete_after_seconds)
+        return job
+
+    def _get_reusable_job(self, job_id):
+        from requests.exceptions import HTTPError
+
+        try:
+            job = self.get_job_details(job_id)
+        except HTTPError as err:
+            if utils._is_not_found(err):
+                return None
+            raise
+        return None if job.status == JobStatus.FAILED else job
@@ -0,0 +1,359 @@
+# -*- coding: utf-8 -*-
+"""Client-side encoding of raw S16LE PCM audio into compact formats"""
+
+import struct
+from array import array
+from .models import MediaConfig
+from . import utils
+
+
+class AudioEncoder:
+    """Base class of streaming encoders. Encoders consume raw, interleaved,
+    signed 16 bit little endian PCM in chunks of any size and produce a
+    self-describing stream which the service can decode.
+    """
+
+    content_type = None
+    file_extension = None
+
+    def __init__(self, rate=16000, channels=1):
+        """
+        :param rate (optional): sampling rate of the input audio
+        :param channels (optional): number of interleaved channels of the input audio
+        """
+        self.rate = rate
+        self.channels = channels
+        self.reset()
+
+    def reset(self, rate=None, channels=None):
+        """Prepares the encoder for a new stream
+
+        :param rate (optional): new sampling rate of the input audio
+        :param channels (optional): new number of channels of the input audio
+        """
+        if rate:
+            self.rate = rate
+        if channels:
+            self.channels = channels
+        self.frames_encoded = 0
+        self._pending = b''
+        self._header_sent = False
+
+    def media_config(self):
+        """Returns the MediaConfig describing the encoded stream"""
+        return MediaConfig(self.content_type)
+
+    def header(self, total_frames=None):
+        """Returns the stream header. Encoders write placeholder sizes while
+        streaming, when the total number of frames is not known yet.
+        """
+        return b''
+
+    def encode(self, chunk):
+        """Encodes a chunk of raw audio. The output of the first call is
+        preceded by the stream header.
+
+        :param chunk: bytes of S16LE PCM audio
+        :returns: encoded bytes, possibly empty if more input is needed
+        """
+        data = self._pending + chunk
+        usable = len(data) - len(data) % self._bytes_per_block()
+        self._pending = data[usable:]
+        return self._with_header(self._encode_samples(utils._to_samples(data[:usable])))
+
+    def flush(self):
+        """Encodes any buffered audio. Must be called at the end of the stream.
+
+        :returns: encoded bytes
+        """
+        frame_size = 2 * self.channels
+        data = self._pending[:len(self._pending) - len(self._pending) % frame_size]
+        self._pending = b''
+        return self._with_header(self._encode_samples(utils._to_samples(data)))
+
+    def encode_stream(self, generator):
+        """Wraps a generator of raw audio chunks, such as the one given to
+        RevAiStreamingClient.start, into a generator of encoded chunks.
+
+        :param generator: generator object that yields binary audio data
+        """
+        self.reset()
+        for chunk in generator:
+            data = self.encode(chunk)
+            if data:
+                yield data
+        data = self.flush()
+        if data:
+            yield data
+
+    def _bytes_per_block(self):
+        return 2 * self.channels
+
+    def _with_header(self, data):
+        if self._header_sent:
+            return data
+        self._header_sent = True
+        return self.header() + data
+
+    def _encode_samples(self, samples):
+        raise NotImplementedError
+
+
+class MulawEncoder(AudioEncoder):
+    """Encodes audio as 8 bit G.711 mu-law in a WAV container. Halves the
+    bitrate at almost no CPU cost."""
+
+    content_type = 'audio/x-wav'
+    file_extension = '.wav'
+
+    # Sizes used in the header while the stream length is unknown
+    _unknown_size = 0xFFFFFFFF - 50
+
+    def header(self, total_frames=None):
+        data_size = self._unknown_size if total_frames is None \
+            else total_frames * self.channels
+        return b''.join([
+            b'RIFF', struct.pack('<I', min(data_size + 50, 0xFFFFFFFF)), b'WAVE',
+            b'fmt ', struct.pack('<IHHIIHHH', 18, 7, self.channels, self.rate,
+                                 self.rate * self.channels, self.channels, 8, 0),
+            b'fact', struct.pack('<II', 4, data_size // self.channels),
+            b'data', struct.pack('<I', data_size)])
+
+    def _encode_samples(self, samples):
+        self.frames_encoded += len(samples) // self.channels
+        samples = array('H', samples.tobytes() if hasattr(samples, 'tobytes')
+                        else samples.tostring())
+        return bytes(bytearray(map(_mulaw_table().__getitem__, samples)))
+
+
+class FlacEncoder(AudioEncoder):
+    """Encodes audio as a FLAC stream using fixed linear predictors and Rice
+    coded residuals. Lossless, and typically a third smaller than raw speech
+    audio."""
+
+    content_type = 'audio/x-flac'
+    file_extension = '.flac'
+
+    def __init__(self, rate=16000, channels=1, block_size=4096):
+        """
+        :param rate (optional): sampling rate of the input audio
+        :param channels (optional): number of interleaved channels of the input audio
+        :param block_size (optional): number of samples per channel in a FLAC frame
+        """
+        if not 16 <= block_size <= 65535:
+            raise ValueError('block_size must be between 16 and 65535')
+        self.block_size = block_size
+        AudioEncoder.__init__(self, rate, channels)
+
+    def reset(self, rate=None, channels=None):
+        AudioEncoder.reset(self, rate, channels)
+        if not 1 <= self.channels <= 8:
+            raise ValueError('FLAC supports between 1 and 8 channels')
+        self._frame_number = 0
+
+    def header(self, total_frames=None):
+        streaminfo = struct.pack('>HH', self.block_size, self.block_size) + b'\0' * 6 + \
+            _pack_bits([(self.rate, 20), (self.channels - 1, 3), (15, 5),
+                        (total_frames or 0, 36)]) + b'\0' * 16
+        return b'fLaC' + struct.pack('>I', 0x80000000 | len(streaminfo)) + streaminfo
+
+    def _bytes_per_block(self):
+        return 2 * self.channels * self.block_size
+
+    def _encode_samples(self, samples):
+        frames = []
+        step = self.block_size * self.channels
+        for start in range(0, len(samples), step):
+            frames.append(self._encode_frame(samples[start:start + step]))
+        return b''.join(frames)
+
+    def _encode_frame(self, samples):
+        block_size = len(samples) // self.channels
+        header = bytearray(b'\xff\xf8')
+        header.append(0x70)
+        header.append(((self.channels - 1) << 4) | 0x08)
+        header.extend(_utf8_number(self._frame_number))
+        header.extend(struct.pack('>H', block_size - 1))
+        header.append(_crc8(header))
+
+        bits = []
+        for channel in range(self.channels):
+            bits.append(_encode_subframe(samples[channel::self.channels]))
+        bits = ''.join(bits)
+        bits += '0' * (-len(bits) % 8)
+        frame = bytes(header) + _bits_to_bytes(bits)
+        frame += struct.pack('>H', _crc16(frame))
+
+        self._frame_number += 1
+        self.frames_encoded += block_size
+        return frame
+
+
+def encode_file(encoder, filename, fileobj):
+    """Encodes a local WAV file or headerless S16LE file into a file object.
+    The encoder is reset and, for WAV files, configured from the file header.
+
+    :param encoder: AudioEncoder used to encode the audio
+    :param filename: path to a local WAV or raw S16LE file
+    :param fileobj: binary file object the encoded stream is written to
+    """
+    rate, channels, chunks = utils._read_pcm(filename, encoder.rate, encoder.channels)
+    encoder.reset(rate, channels)
+    _write_encoded(encoder, chunks, fileobj)
+
+
+def _write_encoded(encoder, chunks, fileobj):
+    # Python 2 files have no seekable, and unseekable streams fail to tell
+    try:
+        start = fileobj.tell()
+    except (AttributeError, IOError, OSError):
+        start = None
+    for chunk in chunks:
+        fileobj.write(encoder.encode(chunk))
+    fileobj.write(encoder.flush())
+
+    if start is not None:
+        # Rewrite the header now that the stream length is known
+        end = fileobj.tell()
+        fileobj.seek(start)
+        fileobj.write(encoder.header(encoder.frames_encoded))
+        fileobj.seek(end)
+
+
+def _mulaw(sample):
+    """G.711 mu-law code of a 16 bit sample, computed on its 14 most
+    significant bits like the reference implementation"""
+    magnitude = sample >> 2
+    mask = 0xFF
+    if magnitude < 0:
+        magnitude = -magnitude
+        mask = 0x7F
+    magnitude = min(magnitude, 8159) + 0x21
+    exponent = magnitude.bit_length() - 6
+    if exponent > 7:
+        return 0x7F ^ mask
+    return ((exponent << 4) | ((magnitude >> (exponent + 1)) & 0x0F)) ^ mask
+
+
+# mu-law byte of every 16 bit sample, indexed by its unsigned representation.
+# Built on first use as it takes tens of milliseconds
+_MULAW_TABLE = None
+
+
+def _mulaw_table():
+    global _MULAW_TABLE
+    if _MULAW_TABLE is None:
+        _MULAW_TABLE = bytearray(_mulaw(u - 65536 if u >= 32768 else u) for u in range(65536))
+    return _MULAW_TABLE
+
+
+def _encode_subframe(samples):
+    """Returns the bits of the smallest of the fixed predictor subframes"""
+    if all(s == samples[0] for s in samples):
+        return '00000000' + _signed_bits(samples[0], 16)
+
+    best = '00000010' + ''.join(_signed_bits(s, 16) for s in samples)
+    residuals = list(samples)
+    for order in range(min(5, len(samples))):
+        if order:
+            residuals = [b - a for a, b in zip(residuals, residuals[1:])]
+        zigzag = [r << 1 if r >= 0 else (-r << 1) - 1 for r in residuals]
+        parameter = _rice_parameter(zigzag)
+        if parameter is None:
+            continue
+        bits = ['0', format(0x08 | order, '06b'), '0']
+        bits.extend(_signed_bits(s, 16) for s in samples[:order])
+        bits.append('00' + '0000' + format(parameter, '04b'))
+        bits.append(_rice_bits(zigzag, parameter))
+        bits = ''.join(bits)
+        if len(bits) < len(best):
+            best = bits
+    return best
+
+
+def _rice_parameter(values):
+    """Chooses the Rice parameter minimizing the coded size, None if no
+    parameter fits in the 4 bit field"""
+    if not values:
+        return 0
+    mean = sum(values) // len(values)
+    estimate = max(mean.bit_length() - 1, 0)
+    best, best_size = None, None
+    for parameter in range(max(estimate - 1, 0), min(estimate + 2, 15)):
+        size = sum(v >> parameter for v in values) + len(values) * (parameter + 1)
+        if best_size is None or size < best_size:
+            best, best_size = parameter, size
+    return best
+
+
+def _rice_bits(values, parameter):
+    if parameter == 0:
+        return ''.join('0' * v + '1' for v in values)
+    mask = (1 << parameter) - 1
+    low_format = '0{}b'.format(parameter)
+    return ''.join('0' * (v >> parameter) + '1' + format(v & mask, low_format)
+                   for v in values)
+
+
+def _signed_bits(value, width):
+    return format(value & ((1 << width) - 1), '0{}b'.format(width))
+
+
+def _bits_to_bytes(bits):
+    if not bits:
+        return b''
+    value = int(bits, 2)
+    length = len(bits) // 8
+    if hasattr(value, 'to_bytes'):
+        return value.to_bytes(length, 'big')
+    return bytes(bytearray.fromhex('{:0{}x}'.format(value, 2 * length)))
+
+
+def _pack_bits(fields):
+    return _bits_to_bytes(''.join(format(value, '0{}b'.format(width))
+                                  for value, width in fields))
+
+
+def _utf8_number(number):
+    """Frame number coded as in UTF-8, extended to 36 bits as FLAC requires"""
+    if number < 0x80:
+        return bytearray([number])
+    length = 2
+    while number >= 1 << (5 * length + 1):
+        length += 1
+    out = bytearray()
+    for _ in range(length - 1):
+        out.insert(0, 0x80 | (number & 0x3F))
+        number >>= 6
+    out.insert(0, ((0xFF00 >> length) & 0xFF) | number)
+    return out
+
+
+def _make_crc_table(polynomial, width):
+    top = 1 << (width - 1)
+    mask = (1 << width) - 1
+    table = []
+    for byte in range(256):
+        crc = byte << (width - 8)
+        for _ in range(8):
+            crc = ((crc << 1) ^ polynomial) if crc & top else crc << 1
+        table.append(crc & mask)
+    return table
+
+
+_CRC8_TABLE = _make_crc_table(0x07, 8)
+_CRC16_TABLE = _make_crc_table(0x8005, 16)
+
+
+def _crc8(data):
+    crc = 0
+    for byte in bytearray(data):
+        crc = _CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def _crc16(data):
+    crc = 0
+    for byte in bytearray(data):
+        crc = ((crc << 8) & 0xFFFF) ^ _CRC16_TABLE[(crc >> 8) ^ byte]
+    return crc
@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
 """Speech recognition tools for using Rev.ai"""
 
-import requests
-from requests.exceptions import HTTPError
+import threading
 from . import __version__
-from . import CustomVocabulary
+from . import deadline
+from .instrumentation import RequestInfo
 
 
 class BaseClient:
@@ -16,13 +16,23 @@ class BaseClient:
     # Default address of the API
     base_url = 'https://api.rev.ai/speechtotext/{}/'.format(version)
 
-    def __init__(self, access_token):
+    def __init__(self, access_token, hedging_policy=None, rate_limiter=None, timeout=None,
+                 hooks=None):
         """Constructor
 
         :param access_token: access token which authorizes all requests and
                              links them to your account. Generated on the
                              settings page of your account dashboard
                              on Rev.ai
+        :param hedging_policy: optional HedgingPolicy. Slow GET requests are
+                               then duplicated and the first response wins
+        :param rate_limiter: optional RateLimiter, which may be shared with
+                             other clients, limiting the rate of requests
+        :param timeout: optional default timeout of requests in seconds, or
+                        tuple of connect and read timeouts, as accepted by
+                        requests. Requests wait indefinitely if None
+        :param hooks: optional instrumentation Hooks called around every
+                      request
         """
         if not access_token:
             raise ValueError('access_token must be provided')
@@ -31,6 +41,12 @@ class BaseClient:
             'Authorization': 'Bearer {}'.format(access_token),
             'User-Agent': 'RevAi-PythonSDK/{}'.format(__version__)
         }
+        self.hedging_policy = hedging_policy
+        self.rate_limiter = rate_limiter
+        self.timeout = timeout
+        self.hooks = hooks
+        self._timeout_counts = {'connect': 0, 'read': 0, 'deadline': 0}
+        self._timeout_lock = threading.Lock()
 
     def _make_http_request(self, method, url, **kwargs):
         """Wrapper method for initiating HTTP requests and handling potential
@@ -42,12 +58,18 @@ class BaseClient:
             and stream
         :raises: HTTPError
         """
+        from requests.exceptions import HTTPError
+
         headers = self.default_headers.copy()
         if 'headers' in kwargs:
             headers.update(kwargs.get('headers'))
             del kwargs['headers']
-        with requests.Session() as session:
-            response = session.request(method, url, headers=headers, **kwargs)
+        if self.hedging_policy is not None and method == "GET" and not kwargs.get('stream'):
+            response = self.hedging_policy.execute(
+                self._endpoint_name(method, url),
+                deadline._propagate(lambda: self._send_request(method, url, headers, kwargs)))
+        else:
+            response = self._send_request(method, url, headers, kwargs)
 
         try:
             response.raise_for_status()
@@ -58,3 +80,75 @@ class BaseClient:
                             "; Server Response : {}".
                             format(response.content.decode('utf-8')),)
             raise
+
+    def timeout_stats(self):
+        """Returns a dictionary with the number of requests which hit their
+        connect timeout, their read timeout, or were not sent because their
+        deadline had passed
+        """
+        with self._timeout_lock:
+            return dict(self._timeout_counts)
+
+    def _send_request(self, method, url, headers, kwargs):
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(method, self._endpoint_name(method, url))
+        if self.hooks is None:
+            return self._send(method, url, headers, kwargs)
+
+        segments = self._path_segments(url)
+        request = RequestInfo(method, url, self._endpoint_path(segments),
+                              segments[1] if len(segments) > 1 and segments[0] == 'jobs'
+                              else None)
+        self.hooks.before_request(request)
+        try:
+            response = self._send(method, url, headers, kwargs)
+        except Exception as err:
+            request._finish(None, err, False)
+            self.hooks.after_request(request)
+            raise
+        request._finish(response, None, kwargs.get('stream', False))
+        self.hooks.after_request(request)
+        return response
+
+    def _send(self, method, url, headers, kwargs):
+        # requests is imported on first use to keep importing the SDK fast
+        import requests
+        from requests.exceptions import ConnectTimeout, ReadTimeout
+
+        try:
+            timeout = deadline._request_timeout(self.timeout)
+            # Only passed when set, so that requests keeps its own default otherwise
+            if timeout is not None:
+                kwargs = dict(kwargs, timeout=timeout)
+            with requests.Session() as session:
+                return session.request(method, url, headers=headers, **kwargs)
+        except ConnectTimeout:
+            self._count_timeout('connect')
+            raise
+        except ReadTimeout:
+            self._count_timeout('read')
+            raise
+        except deadline.DeadlineExceeded:
+            self._count_timeout('deadline')
+            raise
+
+    def _count_timeout(self, kind):
+        with self._timeout_lock:
+            self._timeout_counts[kind] += 1
+
+    def _endpoint_name(self, method, url):
+        """Returns the method and path of a request relative to the API root,
+        with ids replaced by a placeholder, such as 'GET jobs/{id}/transcript'
+        """
+        return '{} {}'.format(method, self._endpoint_path(self._path_segments(url)))
+
+    def _endpoint_path(self, segments):
+        # Paths alternate between collection names and ids
+        return '/'.join(segment if index % 2 == 0 else '{id}'
+                        for index, segment in enumerate(segments))
+
+    def _path_segments(self, url):
+        path = url.split('?', 1)[0]
+        if path.startswith(BaseClient.base_url):
+            path = path[len(BaseClient.base_url):]
+        return path.strip('/').split('/')
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""Concurrent deletion of many jobs and retention sweeping"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ALL_COMPLETED, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+from requests.exceptions import HTTPError
+from .concurrency import _call
+from .models import JobStatus
+from .ratelimit import TokenBucket, _clock
+from . import deadline
+from . import utils
+
+
+class BulkDeleteReport:
+    """Outcome of a bulk deletion"""
+
+    def __init__(self):
+        self.deleted = []
+        # Jobs which were already deleted, either by someone else (404) or
+        # by a previous run according to the checkpoint
+        self.already_deleted = []
+        self.failed = {}
+        self.elapsed = 0.0
+
+    @property
+    def deletes_per_second(self):
+        """Number of successful deletes per second of wall clock time"""
+        return len(self.deleted) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return '<BulkDeleteReport deleted={} already_deleted={} failed={} ' \
+            'deletes_per_second={:.1f}>'.format(
+                len(self.deleted), len(self.already_deleted), len(self.failed),
+                self.deletes_per_second)
+
+
+def delete_jobs(client, job_ids, max_workers=8, rate=None, checkpoint=None, concurrency=None):
+    """Deletes jobs concurrently. Jobs which no longer exist count as already
+    deleted, and other failures are collected in the report instead of
+    stopping the other deletes.
+
+    :param client: RevAiAPIClient used to delete the jobs
+    :param job_ids: iterable of ids of the jobs to delete, consumed lazily
+    :param max_workers (optional): number of concurrent delete requests
+    :param rate (optional): maximum number of delete requests per second,
+        or a TokenBucket shared with other work. Unlimited if None
+    :param checkpoint (optional): path of a file recording the ids of the
+        jobs already handled, one per line. Those jobs are skipped when the
+        same deletion is run again after an interruption
+    :param concurrency (optional): AdaptiveConcurrencyLimiter adapting the
+        number of concurrent deletes, used instead of max_workers
+    :returns: BulkDeleteReport
+    """
+    return _delete_all(client.delete_job, job_ids, max_workers, rate, checkpoint, concurrency)
+
+
+def _delete_all(delete_one, ids, max_workers, rate, checkpoint, concurrency):
+    """Calls delete_one concurrently on every id, see delete_jobs"""
+    if concurrency is not None:
+        max_workers = concurrency.max_limit
+    if max_workers < 1:
+        raise ValueError('max_workers must be at least 1')
+    if rate is not None and not isinstance(rate, TokenBucket):
+        rate = TokenBucket(rate)
+
+    done = _read_checkpoint(checkpoint)
+    report = BulkDeleteReport()
+    lock = threading.Lock()
+    checkpoint_file = open(checkpoint, 'a') if checkpoint else None
+
+    def delete(id_):
+        if rate is not None:
+            rate.acquire()
+        try:
+            _call(concurrency, delete_one, id_)
+            outcome = report.deleted
+        except HTTPError as err:
+            if not utils._is_not_found(err):
+                raise
+            outcome = report.already_deleted
+        with lock:
+            outcome.append(id_)
+            if checkpoint_file is not None:
+                checkpoint_file.write(id_ + '\n')
+                checkpoint_file.flush()
+
+    start = _clock()
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Only a few deletes are queued at a time so that ids can be a
+            # generator over a long listing
+            pending = {}
+            for id_ in ids:
+                if id_ in done:
+                    report.already_deleted.append(id_)
+                    continue
+                if len(pending) >= 2 * max_workers:
+                    _collect(pending, report, FIRST_COMPLETED)
+                pending[executor.submit(deadline._propagate(delete), id_)] = id_
+            _collect(pending, report)
+    finally:
+        report.elapsed = _clock() - start
+        if checkpoint_file is not None:
+            checkpoint_file.close()
+
+    return report
+
+
+class RetentionSweeper:
+    """Deletes finished jobs matching a retention policy, for example every
+    job older than 5 days whose metadata marks it as belonging to a tenant.
+    Candidates come from the list of jobs, which only covers the last week,
+    so max_age should be shorter than 7 days and the sweep run regularly.
+
+    Example::
+
+        sweeper = RetentionSweeper(client, max_age=timedelta(days=5), rate=20)
+        report = sweeper.sweep()
+    """
+
+    def __init__(
+            self,
+            client,
+            max_age=None,
+            statuses=(JobStatus.TRANSCRIBED, JobStatus.FAILED),
+            metadata=None,
+            metadata_contains=None,
+            max_workers=8,
+            rate=None,
+            checkpoint=None,
+            concurrency=None):
+        """Constructor
+
+        :param client: RevAiAPIClient used to list and delete jobs
+        :param max_age (optional): timedelta or number of seconds. Only jobs
+            created longer ago are deleted. Jobs older than a week are not
+            listed, so a max_age of 7 days or more matches nothing
+        :param statuses (optional): collection of JobStatus of the jobs to
+            delete. Jobs in progress cannot be deleted
+        :param metadata (optional): exact metadata of the jobs to delete
+        :param metadata_contains (optional): substring of the metadata of the
+            jobs to delete
+        :param max_workers (optional): number of concurrent delete requests
+        :param rate (optional): maximum number of delete requests per second,
+            or a shared TokenBucket
+        :param checkpoint (optional): path of the checkpoint file, see delete_jobs
+        :param concurrency (optional): AdaptiveConcurrencyLimiter, see delete_jobs
+        """
+        if max_age is not None and not isinstance(max_age, timedelta):
+            max_age = timedelta(seconds=max_age)
+
+        self.client = client
+        self.max_age = max_age
+        self.statuses = statuses
+        self.metadata = metadata
+        self.metadata_contains = metadata_contains
+        self.max_workers = max_workers
+        self.rate = rate
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+
+    def select(self):
+        """Lists the jobs matching the policy
+
+        :returns: list of Job
+        :raises: HTTPError
+        """
+        created_before = None
+        if self.max_age is not None:
+            created_before = datetime.utcnow() - self.max_age
+        return [job for job in self.client.iter_jobs(
+                    page_size=1000, statuses=self.statuses, created_before=created_before)
+                if self._matches_metadata(job.metadata)]
+
+    def sweep(self):
+        """Deletes the jobs matching the policy. They are all listed before
+        the first delete so that deletes do not disturb pagination.
+
+        :returns: BulkDeleteReport
+        :raises: HTTPError if listing the jobs failed
+        """
+        job_ids = [job.id for job in self.select()]
+        return delete_jobs(self.client, job_ids, self.max_workers, self.rate, self.checkpoint,
+                           self.concurrency)
+
+    def _matches_metadata(self, metadata):
+        if self.metadata is not None and metadata != self.metadata:
+            return False
+        if self.metadata_contains is not None and \
+                (metadata is None or self.metadata_contains not in metadata):
+            return False
+        return True
+
+
+def _read_checkpoint(checkpoint):
+    if not checkpoint or not os.path.exists(checkpoint):
+        return set()
+    with open(checkpoint) as f:
+        return set(line.strip() for line in f if line.strip())
+
+
+def _collect(pending, report, return_when=ALL_COMPLETED):
+    finished, _ = wait(list(pending), return_when=return_when)
+    for future in finished:
+        id_ = pending.pop(future)
+        error = future.exception()
+        if error is not None:
+            report.failed[id_] = error
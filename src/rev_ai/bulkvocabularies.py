@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Concurrent management of many custom vocabularies"""
+
+from concurrent.futures import ThreadPoolExecutor
+from requests.exceptions import HTTPError
+from .bulkdelete import _delete_all
+from .concurrency import _call
+from .ratelimit import TokenBucket
+from . import deadline
+from . import utils
+
+
+def delete_custom_vocabularies(client, vocabulary_ids, max_workers=8, rate=None,
+                               checkpoint=None, concurrency=None, vocabulary_registry=None):
+    """Deletes custom vocabularies concurrently. Vocabularies which no longer
+    exist count as already deleted, and other failures are collected in the
+    report instead of stopping the other deletes.
+
+    :param client: RevAiCustomVocabulariesClient used to delete the vocabularies
+    :param vocabulary_ids: iterable of ids of the vocabularies to delete, or
+        of CustomVocabularyInformation, consumed lazily
+    :param max_workers (optional): number of concurrent delete requests
+    :param rate (optional): maximum number of delete requests per second,
+        or a TokenBucket shared with other work. Unlimited if None
+    :param checkpoint (optional): path of a file recording the ids of the
+        vocabularies already handled, see delete_jobs
+    :param concurrency (optional): AdaptiveConcurrencyLimiter adapting the
+        number of concurrent deletes, used instead of max_workers
+    :param vocabulary_registry (optional): VocabularyRegistry from which the
+        vocabularies are removed, including those which no longer exist
+    :returns: BulkDeleteReport
+    """
+    def delete(vocabulary_id):
+        if vocabulary_registry is None:
+            return client.delete_custom_vocabulary(vocabulary_id)
+        return client.delete_custom_vocabulary(vocabulary_id, vocabulary_registry)
+
+    return _delete_all(delete, _ids(vocabulary_ids), max_workers, rate, checkpoint, concurrency)
+
+
+def refresh_custom_vocabularies(client, vocabulary_ids, max_workers=8, rate=None,
+                                concurrency=None):
+    """Fetches the current information of custom vocabularies concurrently
+
+    :param client: RevAiCustomVocabulariesClient used to fetch the vocabularies
+    :param vocabulary_ids: iterable of ids of the vocabularies, or of
+        CustomVocabularyInformation
+    :param max_workers (optional): number of concurrent requests
+    :param rate (optional): maximum number of requests per second, or a
+        shared TokenBucket. Unlimited if None
+    :param concurrency (optional): AdaptiveConcurrencyLimiter adapting the
+        number of concurrent requests, used instead of max_workers
+    :returns: dictionary of id to CustomVocabularyInformation. Vocabularies
+        which no longer exist are left out
+    :raises: HTTPError
+    """
+    if concurrency is not None:
+        max_workers = concurrency.max_limit
+    if max_workers < 1:
+        raise ValueError('max_workers must be at least 1')
+    if rate is not None and not isinstance(rate, TokenBucket):
+        rate = TokenBucket(rate)
+
+    def refresh(vocabulary_id):
+        if rate is not None:
+            rate.acquire()
+        try:
+            return _call(concurrency, client.get_custom_vocabulary_details, vocabulary_id)
+        except HTTPError as err:
+            if utils._is_not_found(err):
+                return None
+            raise
+
+    vocabulary_ids = list(_ids(vocabulary_ids))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        vocabularies = list(executor.map(deadline._propagate(refresh), vocabulary_ids))
+    return dict((vocabulary_id, vocabulary)
+                for vocabulary_id, vocabulary in zip(vocabulary_ids, vocabularies)
+                if vocabulary is not None)
+
+
+def _ids(vocabularies):
+    for vocabulary in vocabularies:
+        yield getattr(vocabulary, 'id', vocabulary)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""Cache of transcripts and captions, which never change once a job is transcribed"""
+
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from . import utils
+
+
+class TranscriptCache:
+    """Thread-safe LRU cache of transcript and caption payloads, bounded by
+    their total size in bytes, with an optional directory on disk as a second
+    tier which outlives the process and can be shared by processes.
+
+    Entries are keyed by job id, Accept type and speaker channel id.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, directory=None):
+        """Constructor
+
+        :param max_bytes (optional): maximum total size of the payloads kept in memory
+        :param directory (optional): directory in which payloads are also
+            stored, created if needed. Memory only if None
+        """
+        if max_bytes < 0:
+            raise ValueError('max_bytes must not be negative')
+
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def get(self, id_, accept, channel_id=None):
+        """Returns the cached payload, or None
+
+        :param id_: id of the job
+        :param accept: Accept type of the payload
+        :param channel_id (optional): speaker channel of captions
+        """
+        key = (id_, accept, channel_id)
+        with self._lock:
+            content = self._entries.pop(key, None)
+            if content is not None:
+                self._entries[key] = content
+                self.hits += 1
+                return content
+
+        content = self._read(key)
+        with self._lock:
+            if content is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._add(key, content)
+        return content
+
+    def put(self, id_, accept, content, channel_id=None):
+        """Stores a payload
+
+        :param id_: id of the job
+        :param accept: Accept type of the payload
+        :param content: payload as bytes
+        :param channel_id (optional): speaker channel of captions
+        """
+        key = (id_, accept, channel_id)
+        with self._lock:
+            self._add(key, content)
+        self._write(key, content)
+
+    def invalidate(self, id_):
+        """Removes every payload of a job, for example once it was deleted"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == id_]:
+                self._bytes -= len(self._entries.pop(key))
+        if self.directory is not None:
+            shutil.rmtree(self._job_directory(id_), ignore_errors=True)
+
+    def clear(self):
+        """Removes every payload held in memory"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Returns a dictionary of cache metrics. 'hits' includes 'disk_hits'"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': float(self.hits) / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+            }
+
+    def _add(self, key, content):
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+        if len(content) > self.max_bytes:
+            return
+        self._entries[key] = content
+        self._bytes += len(content)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.evictions += 1
+
+    def _job_directory(self, id_):
+        return os.path.join(self.directory, hashlib.sha1(id_.encode('utf-8')).hexdigest())
+
+    def _path(self, key):
+        id_, accept, channel_id = key
+        name = '{}\0{}'.format(accept, '' if channel_id is None else channel_id)
+        return os.path.join(self._job_directory(id_),
+                            hashlib.sha1(name.encode('utf-8')).hexdigest())
+
+    def _read(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def _write(self, key, content):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        directory = os.path.dirname(path)
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # Created concurrently
+                pass
+        utils._write_atomically(path, [content])
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Adaptive concurrency limiting of bulk operations"""
+
+import threading
+import time
+from collections import deque
+from requests import exceptions
+from .ratelimit import _clock
+
+
+class AdaptiveConcurrencyLimiter:
+    """Limits the number of concurrent requests of bulk operations with an
+    additive increase, multiplicative decrease (AIMD) policy. The limit grows
+    by about `increase` for every `limit` healthy requests, and is multiplied by
+    `decrease` on 429 responses, 5xx responses, connection errors and
+    latencies above latency_factor times the usual latency. Requests started
+    before a decrease do not decrease it again.
+
+    Example::
+
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=32)
+        delete_jobs(client, job_ids, concurrency=limiter)
+        print(limiter.limit, list(limiter.history))
+    """
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=64, increase=1.0, decrease=0.5,
+                 latency_factor=2.0, history_size=1000):
+        """Constructor
+
+        :param initial_limit (optional): number of concurrent requests allowed at first
+        :param min_limit (optional): lowest limit
+        :param max_limit (optional): highest limit, and number of worker threads
+            of the bulk operations using the limiter
+        :param increase (optional): growth of the limit per round of healthy requests
+        :param decrease (optional): factor applied to the limit on overload
+        :param latency_factor (optional): latency, relative to the moving
+            average of healthy latencies, above which a request counts as
+            overload. Latency is ignored if None
+        :param history_size (optional): number of limit changes kept in history
+        """
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError('limits must satisfy 1 <= min_limit <= initial_limit <= max_limit')
+        if not 0 < decrease < 1:
+            raise ValueError('decrease must be between 0 and 1')
+
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.in_flight = 0
+        # Tuples of (time, limit, reason) for every change of the limit
+        self.history = deque(maxlen=history_size)
+        self._limit = float(initial_limit)
+        self._latency = None
+        self._healthy = 0
+        self._last_decrease = None
+        self._condition = threading.Condition()
+        self.history.append((time.time(), initial_limit, 'initial'))
+
+    @property
+    def limit(self):
+        """Current number of concurrent requests allowed"""
+        return int(self._limit)
+
+    def acquire(self):
+        """Waits for a request slot
+
+        :returns: token to pass to release
+        """
+        with self._condition:
+            while self.in_flight >= int(self._limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return _clock()
+
+    def release(self, token, error=None):
+        """Releases a request slot and adapts the limit to its outcome
+
+        :param token: token returned by acquire
+        :param error (optional): exception raised by the request
+        """
+        now = _clock()
+        latency = now - token
+        with self._condition:
+            self.in_flight -= 1
+            if error is not None:
+                if _is_overload(error):
+                    self._decrease(token, now, 'error')
+            elif self._is_slow(latency):
+                self._decrease(token, now, 'latency')
+            else:
+                self._latency = latency if self._latency is None \
+                    else 0.9 * self._latency + 0.1 * latency
+                self._healthy += 1
+                if self._healthy >= 10:
+                    self._change(self._limit + self.increase / self._limit, 'healthy')
+            self._condition.notify_all()
+
+    def call(self, function, *args, **kwargs):
+        """Calls function within a request slot
+
+        :returns: result of the function
+        """
+        token = self.acquire()
+        try:
+            result = function(*args, **kwargs)
+        except Exception as err:
+            self.release(token, err)
+            raise
+        self.release(token)
+        return result
+
+    def _is_slow(self, latency):
+        return self.latency_factor is not None and self._healthy >= 10 and \
+            latency > self.latency_factor * self._latency
+
+    def _decrease(self, token, now, reason):
+        if self._last_decrease is not None and token < self._last_decrease:
+            return
+        self._last_decrease = now
+        self._change(self._limit * self.decrease, reason)
+
+    def _change(self, limit, reason):
+        previous = int(self._limit)
+        self._limit = min(max(limit, self.min_limit), self.max_limit)
+        if int(self._limit) != previous:
+            self.history.append((time.time(), int(self._limit), reason))
+
+
+def _is_overload(error):
+    if isinstance(error, exceptions.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return status == 429 or (status is not None and status >= 500)
+    return isinstance(error, (exceptions.ConnectionError, exceptions.Timeout))
+
+
+def _call(limiter, function, *args):
+    """Calls function within a slot of limiter, or directly if it is None"""
+    if limiter is None:
+        return function(*args)
+    return limiter.call(function, *args)
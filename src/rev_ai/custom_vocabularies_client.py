@@ -2,6 +2,8 @@
 """Speech recognition tools for using Rev.ai"""
 
 from .baseclient import BaseClient
+from .models import CustomVocabularyInformation
+from . import jsonbackend
 from . import utils
 
 try:
@@ -15,15 +17,24 @@ class RevAiCustomVocabulariesClient(BaseClient):
     See https://www.rev.ai/docs/streaming#section/WebSocket-Endpoint/Custom-Vocabulary
     """
 
-    def __init__(self, access_token):
+    def __init__(self, access_token, hedging_policy=None, rate_limiter=None, timeout=None,
+                 hooks=None):
         """Constructor
 
         :param access_token: access token which authorizes all requests and
                              links them to your account. Generated on the
                              settings page of your account dashboard
                              on Rev.ai
+        :param hedging_policy: optional HedgingPolicy. Slow GET requests are
+                               then duplicated and the first response wins
+        :param rate_limiter: optional RateLimiter, which may be shared with
+                             other clients, limiting the rate of requests
+        :param timeout: optional default timeout of requests in seconds, or
+                        tuple of connect and read timeouts
+        :param hooks: optional instrumentation Hooks called around every
+                      request
         """
-        BaseClient.__init__(self, access_token)
+        BaseClient.__init__(self, access_token, hedging_policy, rate_limiter, timeout, hooks)
 
         self.base_url = urljoin(self.base_url, 'vocabularies/')
 
@@ -53,10 +64,11 @@ class RevAiCustomVocabulariesClient(BaseClient):
         response = self._make_http_request(
             "POST",
             self.base_url,
-            json=payload
+            data=utils._json_body(payload, custom_vocabularies),
+            headers={'Content-Type': 'application/json'}
         )
 
-        return response.json()
+        return jsonbackend.loads(response.content)
 
     def get_custom_vocabularies_information(self, id):
         """ Get the custom vocabulary status
@@ -66,31 +78,88 @@ class RevAiCustomVocabulariesClient(BaseClient):
         """
 
         response = self._make_http_request("GET", urljoin(self.base_url, id))
-        return response.json()
+        return jsonbackend.loads(response.content)
 
-    def get_list_of_custom_vocabularies(self, limit=None):
+    def get_custom_vocabulary_details(self, id):
+        """ Get the custom vocabulary status as a typed object
+
+        :param id: string id of custom vocabulary submission
+        :returns: CustomVocabularyInformation
+        :raises: HTTPError
+        """
+        if not id:
+            raise ValueError('id must be provided')
+
+        return CustomVocabularyInformation.from_json(self.get_custom_vocabularies_information(id))
+
+    def get_list_of_custom_vocabularies(self, limit=None, starting_after=None):
         """ Get a list of custom vocabularies
         See https://www.rev.ai/docs/streaming#operation/GetCustomVocabularies
 
         :param limit: optional, limits the number of jobs returned
+        :param starting_after: optional, returns vocabularies submitted after
+                               the one with this id, exclusive
         """
 
-        url = self.base_url
+        params = []
         if limit:
-            url += '?limit={}'.format(limit)
+            params.append('limit={}'.format(limit))
+        if starting_after is not None:
+            params.append('starting_after={}'.format(starting_after))
+
+        url = self.base_url
+        if params:
+            url += '?' + '&'.join(params)
 
         response = self._make_http_request("GET", url)
-        return response.json()
+        return jsonbackend.loads(response.content)
 
-    def delete_custom_vocabulary(self, id):
+    def iter_custom_vocabularies(self, page_size=100, statuses=None):
+        """ Iterate over all custom vocabularies, following pagination
+        cursors automatically
+
+        :param page_size: optional, number of vocabularies requested per call
+        :param statuses: optional, collection of CustomVocabularyStatus to
+                         filter vocabularies by
+        :returns: generator of CustomVocabularyInformation
+        :raises: HTTPError
+        """
+        if page_size < 1:
+            raise ValueError('page_size must be at least 1')
+
+        seen = set()
+        starting_after = None
+        while True:
+            page = self.get_list_of_custom_vocabularies(page_size, starting_after)
+            # A page of vocabularies already seen means the cursor is not
+            # honored, so iteration stops instead of looping forever
+            if not page or page[-1]['id'] in seen:
+                return
+            for vocabulary in page:
+                if vocabulary['id'] in seen:
+                    continue
+                seen.add(vocabulary['id'])
+                vocabulary = CustomVocabularyInformation.from_json(vocabulary)
+                if statuses is None or vocabulary.status in statuses:
+                    yield vocabulary
+            if len(page) < page_size:
+                return
+            starting_after = page[-1]['id']
+
+    def delete_custom_vocabulary(self, id, vocabulary_registry=None):
         """ Delete a custom vocabulary
         See https://www.rev.ai/docs/streaming#operation/DeleteCustomVocabulary
 
         :param id: string id of custom vocabulary to be deleted
+        :param vocabulary_registry: optional VocabularyRegistry from which the
+                                    vocabulary is removed, so that its phrases
+                                    are submitted again when next used
         :returns: None if job was successfully deleted
         :raises: HTTPError
         """
 
+        if vocabulary_registry is not None:
+            vocabulary_registry.remove(id)
         self._make_http_request("DELETE", urljoin(self.base_url, id))
         return
 
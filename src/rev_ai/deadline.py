@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Deadlines and timeout overrides for requests made by the clients"""
+
+import threading
+from contextlib import contextmanager
+from .ratelimit import _clock
+
+_local = threading.local()
+
+# Marks the absence of a timeout override, as None means no timeout
+_UNSET = object()
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work is started after the time budget of its deadline was spent"""
+    pass
+
+
+class Deadline:
+    """Time budget shared by every request made in its context, including
+    multi-step operations such as submitting a job, waiting for it and
+    fetching its transcript. Requests are given at most the remaining time
+    as connect and read timeouts, and no request is started once it is spent.
+    Deadlines can be nested, the earliest one applies.
+
+    Example::
+
+        with Deadline(300):
+            job = client.submit_job_url(media_url)
+            wait_for_jobs(client, [job.id])
+            transcript = client.get_transcript_object(job.id)
+    """
+
+    def __init__(self, seconds):
+        """Constructor
+
+        :param seconds: time budget in seconds, starting now
+        """
+        self.seconds = seconds
+        self.expires_at = _clock() + seconds
+
+    def remaining(self):
+        """Returns the seconds left before the deadline"""
+        return max(self.expires_at - _clock(), 0.0)
+
+    @property
+    def expired(self):
+        return _clock() >= self.expires_at
+
+    def check(self):
+        """Raises DeadlineExceeded if the deadline has passed"""
+        if self.expired:
+            raise DeadlineExceeded('Deadline of {} seconds exceeded'.format(self.seconds))
+
+    def __enter__(self):
+        _deadlines().append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _deadlines().remove(self)
+
+
+@contextmanager
+def request_timeout(timeout):
+    """Overrides the timeout of the clients for requests made in this context
+    by the current thread
+
+    :param timeout: seconds, or tuple of connect and read timeouts in seconds,
+        as accepted by requests. None disables the timeout
+    """
+    previous = getattr(_local, 'timeout', _UNSET)
+    _local.timeout = timeout
+    try:
+        yield
+    finally:
+        _local.timeout = previous
+
+
+def remaining():
+    """Returns the seconds left before the earliest deadline of the current
+    thread, or None if there is none
+    """
+    deadlines = _deadlines()
+    if not deadlines:
+        return None
+    return min(deadline.remaining() for deadline in deadlines)
+
+
+def check():
+    """Raises DeadlineExceeded if a deadline of the current thread has passed"""
+    for deadline in _deadlines():
+        deadline.check()
+
+
+def _deadlines():
+    deadlines = getattr(_local, 'deadlines', None)
+    if deadlines is None:
+        deadlines = _local.deadlines = []
+    return deadlines
+
+
+def _request_timeout(default):
+    """Returns the timeout of a request given the client's default, taking the
+    current override and deadlines into account
+    """
+    timeout = getattr(_local, 'timeout', _UNSET)
+    if timeout is _UNSET:
+        timeout = default
+    check()
+    budget = remaining()
+    if budget is None:
+        return timeout
+    if timeout is None:
+        return budget
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    return (budget if connect is None else min(connect, budget),
+            budget if read is None else min(read, budget))
+
+
+def _propagate(function):
+    """Wraps function so that it runs with the deadlines and timeout override
+    of the calling thread, for work handed to other threads
+    """
+    deadlines = list(_deadlines())
+    timeout = getattr(_local, 'timeout', _UNSET)
+
+    def run(*args, **kwargs):
+        previous = (list(_deadlines()), getattr(_local, 'timeout', _UNSET))
+        _local.deadlines, _local.timeout = list(deadlines), timeout
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _local.deadlines, _local.timeout = previous
+    return run
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Local index of submitted media used to avoid transcribing a file twice"""
+
+import hashlib
+import json
+import threading
+import time
+from . import utils
+
+# Size of chunks read when hashing media
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class JobDedupIndex:
+    """SQLite index mapping a hash of media content and job options to the id
+    of the job which transcribed them. The database can be shared by threads
+    and processes of one host. A submission first claims its key, so that
+    concurrent submissions of the same media wait for the first one instead of
+    uploading it again.
+    """
+
+    def __init__(self, path, default_ttl=None, claim_timeout=3600.0, poll_interval=1.0):
+        """Constructor
+
+        :param path: path of the SQLite database file, created if needed
+        :param default_ttl (optional): seconds after which entries of jobs
+            submitted without delete_after_seconds expire. Never if None
+        :param claim_timeout (optional): seconds after which a claim whose
+            submission never completed can be taken over
+        :param poll_interval (optional): seconds between lookups while waiting
+            for another submitter
+        """
+        if not path:
+            raise ValueError('path must be provided')
+
+        self.path = path
+        self.default_ttl = default_ttl
+        self.claim_timeout = claim_timeout
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'key TEXT PRIMARY KEY, job_id TEXT, created_at REAL NOT NULL, expires_at REAL)')
+
+    def make_key(self, filename, options):
+        """Returns the key of a submission, a SHA-256 of the media content and
+        of the job options serialized in a canonical form
+
+        :param filename: path to the local media file
+        :param options: dictionary of job options, as sent to the API
+        """
+        digest = hashlib.sha256()
+        with open(filename, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+        digest.update(b'\0')
+        digest.update(json.dumps(options, sort_keys=True, separators=(',', ':')).encode('utf-8'))
+        return digest.hexdigest()
+
+    def acquire(self, key):
+        """Looks up a key, claiming it if it is unknown. Waits while another
+        submitter holds a claim on the key.
+
+        :param key: key returned by make_key
+        :returns: id of the job recorded for the key, or None if the caller
+            now holds the claim and must submit the media then call record or
+            release
+        """
+        while True:
+            now = time.time()
+            connection = self._connection()
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                connection.execute(
+                    'DELETE FROM jobs WHERE key = ? AND ((job_id IS NULL AND created_at < ?) '
+                    'OR expires_at < ?)', (key, now - self.claim_timeout, now))
+                row = connection.execute(
+                    'SELECT job_id FROM jobs WHERE key = ?', (key,)).fetchone()
+                if row is None:
+                    connection.execute(
+                        'INSERT INTO jobs (key, job_id, created_at) VALUES (?, NULL, ?)',
+                        (key, now))
+            except Exception:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+
+            if row is None:
+                return None
+            if row[0] is not None:
+                return row[0]
+            time.sleep(self.poll_interval)
+
+    def record(self, key, job_id, delete_after_seconds=None):
+        """Records the job submitted for a claimed key
+
+        :param key: key returned by make_key
+        :param job_id: id of the submitted job
+        :param delete_after_seconds (optional): delete_after_seconds of the job.
+            The job exists at least this long, so the entry expires then
+        """
+        ttl = delete_after_seconds if delete_after_seconds is not None else self.default_ttl
+        now = time.time()
+        self._connection().execute(
+            'INSERT OR REPLACE INTO jobs (key, job_id, created_at, expires_at) '
+            'VALUES (?, ?, ?, ?)', (key, job_id, now, None if ttl is None else now + ttl))
+
+    def release(self, key):
+        """Gives up a claim after a failed submission"""
+        self._connection().execute(
+            'DELETE FROM jobs WHERE key = ? AND job_id IS NULL', (key,))
+
+    def remove(self, key):
+        """Removes the entry of a key, for example when its job was deleted"""
+        self._connection().execute('DELETE FROM jobs WHERE key = ?', (key,))
+
+    def remove_job(self, job_id):
+        """Removes the entries pointing to a job"""
+        self._connection().execute('DELETE FROM jobs WHERE job_id = ?', (job_id,))
+
+    def purge_expired(self):
+        """Deletes expired entries
+
+        :returns: number of deleted entries
+        """
+        return self._connection().execute(
+            'DELETE FROM jobs WHERE expires_at < ?', (time.time(),)).rowcount
+
+    def _connection(self):
+        return utils._thread_connection(self._local, self.path)
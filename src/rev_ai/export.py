@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""Concurrent export of transcripts and captions of many jobs to disk"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .concurrency import _call
+from .models import CaptionType
+from .ratelimit import _clock
+from . import deadline
+from . import utils
+
+# Size of chunks in which artifacts are streamed to disk
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Artifacts which can be exported, with the extension of their files
+ARTIFACTS = {
+    'json': 'json',
+    'text': 'txt',
+    'srt': 'srt',
+    'vtt': 'vtt',
+}
+
+
+class ExportReport:
+    """Outcome of an export"""
+
+    def __init__(self):
+        # Dictionary of (job id, artifact, channel id) to the path of the file
+        self.files = {}
+        # Dictionary of (job id, artifact, channel id) to the raised exception
+        self.failed = {}
+        self.bytes_written = 0
+        self.elapsed = 0.0
+
+    def __repr__(self):
+        return '<ExportReport files={} failed={} bytes_written={}>'.format(
+            len(self.files), len(self.failed), self.bytes_written)
+
+
+def export_jobs(
+        client,
+        job_ids,
+        output_dir,
+        artifacts=('json', 'text', 'srt', 'vtt'),
+        channel_ids=None,
+        max_workers=8,
+        skip_existing=False,
+        chunk_size=EXPORT_CHUNK_SIZE,
+        concurrency=None):
+    """Downloads the transcripts and captions of many jobs concurrently.
+    Every response is streamed to a temporary file which is renamed into place
+    once complete, so memory use is bounded by chunk_size per worker and
+    interrupted exports never leave partial files behind.
+
+    Files are named <job id>.<extension>, captions of a speaker channel
+    <job id>.ch<channel id>.<extension>.
+
+    :param client: RevAiAPIClient used to download the artifacts
+    :param job_ids: ids of transcribed jobs
+    :param output_dir: directory in which the files are written
+    :param artifacts (optional): artifacts to export among 'json', 'text',
+        'srt' and 'vtt'
+    :param channel_ids (optional): speaker channels to export captions for,
+        either a list used for every job or a dictionary of job id to list.
+        Captions of the whole job are exported if None
+    :param max_workers (optional): number of concurrent downloads
+    :param skip_existing (optional): whether to skip artifacts whose file
+        already exists, to resume an interrupted export
+    :param chunk_size (optional): number of bytes read from a response at a time
+    :param concurrency (optional): AdaptiveConcurrencyLimiter adapting the
+        number of concurrent downloads, used instead of max_workers
+    :returns: ExportReport
+    """
+    for artifact in artifacts:
+        if artifact not in ARTIFACTS:
+            raise ValueError('unknown artifact {}, expected one of {}'.format(
+                artifact, ', '.join(sorted(ARTIFACTS))))
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    if concurrency is not None:
+        max_workers = concurrency.max_limit
+
+    report = ExportReport()
+    lock = threading.Lock()
+
+    def export(task):
+        path = os.path.join(output_dir, _filename(*task))
+        if skip_existing and os.path.exists(path):
+            written = 0
+        else:
+            written = _call(concurrency, lambda: _download(
+                _open_stream(client, *task), path, chunk_size))
+        with lock:
+            report.files[task] = path
+            report.bytes_written += written
+
+    start = _clock()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        tasks = list(_tasks(job_ids, artifacts, channel_ids))
+        futures = [executor.submit(deadline._propagate(export), task) for task in tasks]
+        for task, future in zip(tasks, futures):
+            error = future.exception()
+            if error is not None:
+                report.failed[task] = error
+    report.elapsed = _clock() - start
+
+    return report
+
+
+def _tasks(job_ids, artifacts, channel_ids):
+    for job_id in job_ids:
+        channels = channel_ids.get(job_id) if isinstance(channel_ids, dict) else channel_ids
+        for artifact in artifacts:
+            if artifact in ('srt', 'vtt') and channels:
+                for channel_id in channels:
+                    yield (job_id, artifact, channel_id)
+            else:
+                yield (job_id, artifact, None)
+
+
+def _filename(job_id, artifact, channel_id):
+    if channel_id is None:
+        return '{}.{}'.format(job_id, ARTIFACTS[artifact])
+    return '{}.ch{}.{}'.format(job_id, channel_id, ARTIFACTS[artifact])
+
+
+def _open_stream(client, job_id, artifact, channel_id):
+    if artifact == 'json':
+        return client.get_transcript_json_as_stream(job_id)
+    if artifact == 'text':
+        return client.get_transcript_text_as_stream(job_id)
+    return client.get_captions_as_stream(job_id, CaptionType.from_string(artifact), channel_id)
+
+
+def _download(response, path, chunk_size):
+    """Streams a response to a temporary file renamed to path when complete"""
+    try:
+        return utils._write_atomically(path, response.iter_content(chunk_size))
+    finally:
+        response.close()
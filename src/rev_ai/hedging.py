@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Hedging of slow idempotent requests"""
+
+import threading
+from .ratelimit import _clock
+
+try:
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
+
+
+class LatencyHistogram:
+    """Thread-safe histogram of latencies with exponentially growing buckets,
+    from one millisecond to about two minutes
+    """
+
+    # Upper bounds of the buckets in seconds, each 25% above the previous one
+    bounds = [0.001 * 1.25 ** i for i in range(53)]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        """Records a latency in seconds"""
+        index = 0
+        while index < len(self.bounds) and seconds > self.bounds[index]:
+            index += 1
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    def percentile(self, percent):
+        """Returns an upper estimate of the given percentile in seconds, or
+        None if nothing was recorded
+        """
+        with self._lock:
+            if not self.count:
+                return None
+            rank = percent / 100.0 * self.count
+            cumulative = 0
+            for index, count in enumerate(self.counts):
+                cumulative += count
+                if cumulative >= rank and count:
+                    return self.bounds[min(index, len(self.bounds) - 1)]
+            return self.bounds[-1]
+
+
+class HedgingPolicy:
+    """Opt-in policy sending a duplicate of an idempotent GET request when the
+    first one has not answered within a percentile of the recent latencies of
+    its endpoint. The first response wins. The share of hedged requests is
+    capped by a budget so that hedging never multiplies the load.
+
+    Example::
+
+        client = RevAiAPIClient('ACCESS TOKEN', hedging_policy=HedgingPolicy(percentile=95))
+    """
+
+    def __init__(self, percentile=95.0, budget=0.05, min_delay=0.01, initial_delay=None,
+                 min_samples=20):
+        """Constructor
+
+        :param percentile (optional): percentile of an endpoint's latencies
+            after which a request is hedged
+        :param budget (optional): maximum fraction of requests which may be hedged
+        :param min_delay (optional): minimum seconds before hedging
+        :param initial_delay (optional): seconds before hedging while an
+            endpoint has fewer than min_samples latencies. No hedging then if None
+        :param min_samples (optional): number of latencies needed before the
+            percentile is used
+        """
+        if not 0 < percentile < 100:
+            raise ValueError('percentile must be between 0 and 100')
+        if not 0 <= budget <= 1:
+            raise ValueError('budget must be between 0 and 1')
+
+        self.percentile = percentile
+        self.budget = budget
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, endpoint):
+        """Returns the LatencyHistogram of an endpoint"""
+        with self._lock:
+            histogram = self._histograms.get(endpoint)
+            if histogram is None:
+                histogram = self._histograms[endpoint] = LatencyHistogram()
+            return histogram
+
+    def histograms(self):
+        """Returns a dictionary of endpoint to its LatencyHistogram"""
+        with self._lock:
+            return dict(self._histograms)
+
+    def delay(self, endpoint):
+        """Returns the seconds after which a request to endpoint is hedged, or
+        None if it is not hedged
+        """
+        histogram = self.histogram(endpoint)
+        if histogram.count < self.min_samples:
+            return self.initial_delay
+        return max(self.min_delay, histogram.percentile(self.percentile))
+
+    def stats(self):
+        """Returns a dictionary with the number of requests, of hedges sent
+        and of hedges which answered first
+        """
+        with self._lock:
+            return {'requests': self.requests, 'hedges': self.hedges,
+                    'hedge_wins': self.hedge_wins}
+
+    def execute(self, endpoint, send):
+        """Sends a request, hedging it if it is slow
+
+        :param endpoint: name of the endpoint, such as 'GET jobs/{id}'
+        :param send: function without arguments sending the request and
+            returning its response
+        :returns: first response received
+        :raises: exception of the request if every attempt failed
+        """
+        with self._lock:
+            self.requests += 1
+        delay = self.delay(endpoint)
+        histogram = self.histogram(endpoint)
+        results = Queue()
+        self._start(send, histogram, results, False)
+        outstanding = 1
+        try:
+            first = results.get(timeout=delay) if delay is not None else results.get()
+        except Empty:
+            if self._take_hedge():
+                self._start(send, histogram, results, True)
+                outstanding += 1
+            first = results.get()
+
+        # A failed attempt only loses if another one is still running
+        response, error, hedge = first
+        outstanding -= 1
+        while error is not None and outstanding:
+            outstanding -= 1
+            response, error, hedge = results.get()
+        if error is not None:
+            raise error
+        if hedge:
+            with self._lock:
+                self.hedge_wins += 1
+        return response
+
+    def _take_hedge(self):
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def _start(self, send, histogram, results, hedge):
+        def attempt():
+            start = _clock()
+            try:
+                response = send()
+            except Exception as err:
+                results.put((None, err, hedge))
+                return
+            histogram.observe(_clock() - start)
+            results.put((response, None, hedge))
+
+        thread = threading.Thread(target=attempt)
+        thread.daemon = True
+        thread.start()
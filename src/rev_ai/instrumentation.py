@@ -0,0 +1,308 @@
+# -*- coding: utf-8 -*-
+"""Instrumentation hooks for requests and streams of the clients"""
+
+import threading
+import time
+from . import jsonbackend
+
+
+class RequestInfo:
+    """Description of an HTTP request passed to hooks"""
+
+    def __init__(self, method, url, endpoint, job_id=None):
+        """
+        :param method: HTTP method
+        :param url: URL of the request
+        :param endpoint: path relative to the API root with ids replaced by a
+            placeholder, such as 'jobs/{id}/transcript'
+        :param job_id: id of the job the request is about, if any
+        """
+        self.method = method
+        self.url = url
+        self.endpoint = endpoint
+        self.job_id = job_id
+        self.start = time.time()
+        self.duration = None
+        self.response = None
+        self.status_code = None
+        # Size of the response body, None for streamed responses without Content-Length
+        self.response_bytes = None
+        self.error = None
+        # Free storage for hooks, for example to keep a span
+        self.data = {}
+
+    def _finish(self, response, error, streamed):
+        self.duration = time.time() - self.start
+        self.error = error
+        if response is not None:
+            self.response = response
+            self.status_code = response.status_code
+            if not streamed:
+                self.response_bytes = len(response.content)
+            elif 'Content-Length' in response.headers:
+                self.response_bytes = int(response.headers['Content-Length'])
+
+
+class StreamInfo:
+    """Description of a streaming connection passed to hooks"""
+
+    def __init__(self, url, content_type):
+        """
+        :param url: URL of the connection, without the access token
+        :param content_type: content type of the audio sent
+        """
+        self.url = url
+        self.content_type = content_type
+        self.job_id = None
+        self.start = time.time()
+        self.duration = None
+        self.messages = 0
+        self.message_bytes = 0
+        self.close_code = None
+        self.close_reason = None
+        self.error = None
+        # Free storage for hooks, for example to keep a span
+        self.data = {}
+
+    def _finish(self):
+        self.duration = time.time() - self.start
+
+
+class Hooks:
+    """Base class of instrumentation hooks. Every method does nothing, so
+    subclasses only override the events they need. Clients without hooks
+    skip instrumentation entirely.
+    """
+
+    def before_request(self, request):
+        """Called with a RequestInfo before an HTTP request is sent"""
+        pass
+
+    def after_request(self, request):
+        """Called with a RequestInfo once an HTTP response, or an error, was
+        received. Its duration, response, status_code, response_bytes and
+        error are set
+        """
+        pass
+
+    def stream_opened(self, stream):
+        """Called with a StreamInfo once a streaming connection is open"""
+        pass
+
+    def message_received(self, stream, message_type, size):
+        """Called for every message of a streaming connection
+
+        :param stream: StreamInfo of the connection
+        :param message_type: type of the message, such as 'connected',
+            'partial' or 'final'
+        :param size: size of the message in bytes
+        """
+        pass
+
+    def stream_closed(self, stream):
+        """Called with a StreamInfo once a streaming connection ended. Its
+        duration, close_code, close_reason and error are set
+        """
+        pass
+
+
+class HookList(Hooks):
+    """Calls several hooks in order"""
+
+    def __init__(self, hooks):
+        self.hooks = list(hooks)
+
+    def before_request(self, request):
+        for hooks in self.hooks:
+            hooks.before_request(request)
+
+    def after_request(self, request):
+        for hooks in self.hooks:
+            hooks.after_request(request)
+
+    def stream_opened(self, stream):
+        for hooks in self.hooks:
+            hooks.stream_opened(stream)
+
+    def message_received(self, stream, message_type, size):
+        for hooks in self.hooks:
+            hooks.message_received(stream, message_type, size)
+
+    def stream_closed(self, stream):
+        for hooks in self.hooks:
+            hooks.stream_closed(stream)
+
+
+class PrometheusHooks(Hooks):
+    """Hooks aggregating request and stream metrics, exposed in the
+    Prometheus text format by exposition(), for example from an HTTP handler
+    """
+
+    # Upper bounds of the request duration buckets in seconds
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, prefix='rev_ai'):
+        """Constructor
+
+        :param prefix (optional): prefix of the metric names
+        """
+        self.prefix = prefix
+        self._requests = {}
+        self._errors = {}
+        self._response_bytes = {}
+        self._durations = {}
+        self._streams_opened = 0
+        self._streams_closed = {}
+        self._messages = {}
+        self._message_bytes = 0
+        self._lock = threading.Lock()
+
+    def after_request(self, request):
+        labels = (('method', request.method), ('endpoint', request.endpoint))
+        with self._lock:
+            if request.error is not None:
+                _increment(self._errors, labels + (('error', type(request.error).__name__),))
+                return
+            _increment(self._requests, labels + (('status', str(request.status_code)),))
+            if request.response_bytes is not None:
+                _increment(self._response_bytes, labels, request.response_bytes)
+            histogram = self._durations.get(labels)
+            if histogram is None:
+                histogram = self._durations[labels] = [[0] * len(self.buckets), 0, 0.0]
+            for index, bound in enumerate(self.buckets):
+                if request.duration <= bound:
+                    histogram[0][index] += 1
+            histogram[1] += 1
+            histogram[2] += request.duration
+
+    def stream_opened(self, stream):
+        with self._lock:
+            self._streams_opened += 1
+
+    def message_received(self, stream, message_type, size):
+        with self._lock:
+            _increment(self._messages, (('type', message_type),))
+            self._message_bytes += size
+
+    def stream_closed(self, stream):
+        reason = 'error' if stream.error is not None else str(stream.close_code)
+        with self._lock:
+            _increment(self._streams_closed, (('code', reason),))
+
+    def exposition(self):
+        """Returns the metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            self._counter(lines, 'requests_total', 'HTTP requests by status code',
+                          self._requests)
+            self._counter(lines, 'request_errors_total', 'HTTP requests without response',
+                          self._errors)
+            self._counter(lines, 'response_bytes_total', 'Bytes of HTTP response bodies',
+                          self._response_bytes)
+            name = self.prefix + '_request_duration_seconds'
+            lines.append('# HELP {} Duration of HTTP requests'.format(name))
+            lines.append('# TYPE {} histogram'.format(name))
+            for labels, (counts, count, total) in sorted(self._durations.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    lines.append('{}_bucket{} {}'.format(
+                        name, _labels(labels + (('le', repr(bound)),)), bucket_count))
+                lines.append('{}_bucket{} {}'.format(
+                    name, _labels(labels + (('le', '+Inf'),)), count))
+                lines.append('{}_sum{} {}'.format(name, _labels(labels), repr(total)))
+                lines.append('{}_count{} {}'.format(name, _labels(labels), count))
+            self._counter(lines, 'streams_opened_total', 'Streaming connections opened',
+                          {(): self._streams_opened})
+            self._counter(lines, 'streams_closed_total', 'Streaming connections closed by code',
+                          self._streams_closed)
+            self._counter(lines, 'stream_messages_total', 'Streaming messages by type',
+                          self._messages)
+            self._counter(lines, 'stream_message_bytes_total', 'Bytes of streaming messages',
+                          {(): self._message_bytes})
+        return '\n'.join(lines) + '\n'
+
+    def _counter(self, lines, name, help_text, values):
+        name = '{}_{}'.format(self.prefix, name)
+        lines.append('# HELP {} {}'.format(name, help_text))
+        lines.append('# TYPE {} counter'.format(name))
+        for labels, value in sorted(values.items()):
+            lines.append('{}{} {}'.format(name, _labels(labels), value))
+
+
+class SpanHooks(Hooks):
+    """Hooks recording an OpenTelemetry span for every request and stream.
+    Spans carry the job id as the rev_ai.job_id attribute, so the requests of
+    a job, from submission to transcript download, can be found together.
+    Any tracer with the OpenTelemetry start_span interface can be used.
+    """
+
+    def __init__(self, tracer=None):
+        """Constructor
+
+        :param tracer (optional): tracer creating the spans. Defaults to the
+            tracer of the installed opentelemetry-api package
+        """
+        if tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                raise ImportError('SpanHooks needs a tracer or the opentelemetry-api package')
+            tracer = trace.get_tracer('rev_ai')
+        self.tracer = tracer
+
+    def before_request(self, request):
+        attributes = {'http.method': request.method, 'http.url': request.url,
+                      'rev_ai.endpoint': request.endpoint}
+        if request.job_id is not None:
+            attributes['rev_ai.job_id'] = request.job_id
+        request.data['span'] = self.tracer.start_span(
+            '{} {}'.format(request.method, request.endpoint), attributes=attributes)
+
+    def after_request(self, request):
+        span = request.data.pop('span')
+        if request.error is not None:
+            span.record_exception(request.error)
+            span.set_attribute('error', True)
+        else:
+            span.set_attribute('http.status_code', request.status_code)
+            if request.status_code >= 400:
+                span.set_attribute('error', True)
+            if request.method == 'POST' and request.endpoint == 'jobs' and \
+                    request.status_code < 400:
+                # Submissions learn their job id from the response
+                job_id = jsonbackend.loads(request.response.content).get('id')
+                span.set_attribute('rev_ai.job_id', job_id)
+        if request.response_bytes is not None:
+            span.set_attribute('http.response_content_length', request.response_bytes)
+        span.end()
+
+    def stream_opened(self, stream):
+        stream.data['span'] = self.tracer.start_span('stream', attributes={
+            'http.url': stream.url, 'rev_ai.content_type': stream.content_type})
+
+    def message_received(self, stream, message_type, size):
+        span = stream.data['span']
+        if message_type == 'connected':
+            span.set_attribute('rev_ai.job_id', stream.job_id)
+        span.add_event('message', {'type': message_type, 'size': size})
+
+    def stream_closed(self, stream):
+        span = stream.data.pop('span')
+        if stream.error is not None:
+            span.record_exception(stream.error)
+            span.set_attribute('error', True)
+        if stream.close_code is not None:
+            span.set_attribute('rev_ai.close_code', stream.close_code)
+        span.set_attribute('rev_ai.messages', stream.messages)
+        span.end()
+
+
+def _increment(values, labels, amount=1):
+    values[labels] = values.get(labels, 0) + amount
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join('{}="{}"'.format(name, value.replace('\\', '\\\\')
+                                           .replace('"', '\\"').replace('\n', '\\n'))
+                          for name, value in labels) + '}'
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""Local SQLite mirror of job metadata"""
+
+import calendar
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from requests.exceptions import HTTPError
+from .concurrency import _call
+from .models import Job, JobStatus
+from . import deadline
+from . import utils
+
+_COLUMNS = ('id', 'created_on', 'status', 'completed_on', 'name', 'callback_url', 'metadata',
+            'media_url', 'failure', 'failure_detail', 'duration_seconds')
+
+
+class JobMirror:
+    """Keeps a copy of the account's jobs in a SQLite database so that status,
+    time range and metadata queries are answered locally. sync() only lists
+    jobs created since the previous sync and refreshes jobs still in progress.
+
+    Example::
+
+        mirror = JobMirror(client, 'jobs.db')
+        mirror.sync()
+        failed = mirror.find(statuses=[JobStatus.FAILED], created_after='2021-06-01T00:00:00Z')
+    """
+
+    def __init__(self, client, path, max_workers=4, concurrency=None):
+        """Constructor
+
+        :param client: RevAiAPIClient used to sync the mirror
+        :param path: path of the SQLite database file, created if needed
+        :param max_workers (optional): number of concurrent requests used to
+            refresh jobs in progress
+        :param concurrency (optional): AdaptiveConcurrencyLimiter adapting the
+            number of concurrent refreshes, used instead of max_workers
+        """
+        if not path:
+            raise ValueError('path must be provided')
+
+        self.client = client
+        self.path = path
+        self.max_workers = concurrency.max_limit if concurrency is not None else max_workers
+        self.concurrency = concurrency
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id TEXT PRIMARY KEY, created_on TEXT NOT NULL, created_at REAL NOT NULL, '
+            'status TEXT NOT NULL, completed_on TEXT, name TEXT, callback_url TEXT, '
+            'metadata TEXT, media_url TEXT, failure TEXT, failure_detail TEXT, '
+            'duration_seconds REAL, synced_at REAL NOT NULL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS jobs_created_at ON jobs (created_at)')
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+        connection.execute('CREATE INDEX IF NOT EXISTS jobs_metadata ON jobs (metadata)')
+
+    def sync(self):
+        """Fetches jobs created since the last sync and refreshes jobs in
+        progress. Jobs which no longer exist are removed from the mirror.
+
+        :returns: dictionary with the number of 'added', 'refreshed' and
+            'removed' jobs
+        :raises: HTTPError
+        """
+        connection = self._connection()
+        newest = connection.execute('SELECT MAX(created_at) FROM jobs').fetchone()[0]
+        known_newest = set(row[0] for row in connection.execute(
+            'SELECT id FROM jobs WHERE created_at = ?', (newest,)))
+
+        # Jobs are listed newest first, so listing stops at the first known job
+        added = []
+        for job in self.client.iter_jobs(page_size=1000):
+            if job.id in known_newest or (newest is not None and
+                                          _timestamp(job.created_on) < newest):
+                break
+            added.append(job)
+        self._store(added)
+        added_ids = set(job.id for job in added)
+
+        in_progress = [row[0] for row in connection.execute(
+            'SELECT id FROM jobs WHERE status = ?', (JobStatus.IN_PROGRESS.name,))
+            if row[0] not in added_ids]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            refreshed = list(executor.map(deadline._propagate(self._get_job_details), in_progress))
+        self._store([job for job in refreshed if job is not None])
+        removed = [job_id for job_id, job in zip(in_progress, refreshed) if job is None]
+        for job_id in removed:
+            self.remove(job_id)
+
+        return {'added': len(added),
+                'refreshed': len(in_progress) - len(removed),
+                'removed': len(removed)}
+
+    def get(self, id_):
+        """Returns the mirrored Job with this id, or None"""
+        rows = self._query('SELECT {} FROM jobs WHERE id = ?', (id_,))
+        return rows[0] if rows else None
+
+    def find(self, statuses=None, created_after=None, created_before=None, metadata=None,
+             metadata_contains=None, limit=None):
+        """Returns mirrored jobs in reverse chronological order
+
+        :param statuses: optional, collection of JobStatus to filter jobs by
+        :param created_after: optional, datetime in UTC or ISO 8601 string.
+            Only jobs created at or after it are returned
+        :param created_before: optional, datetime in UTC or ISO 8601 string.
+            Only jobs created before it are returned
+        :param metadata: optional, exact metadata of the jobs
+        :param metadata_contains: optional, substring of the metadata of the jobs
+        :param limit: optional, maximum number of jobs returned
+        """
+        conditions = []
+        parameters = []
+        if statuses is not None:
+            statuses = list(statuses)
+            conditions.append('status IN ({})'.format(', '.join('?' * len(statuses))))
+            parameters.extend(status.name for status in statuses)
+        if created_after is not None:
+            conditions.append('created_at >= ?')
+            parameters.append(_timestamp(created_after))
+        if created_before is not None:
+            conditions.append('created_at < ?')
+            parameters.append(_timestamp(created_before))
+        if metadata is not None:
+            conditions.append('metadata = ?')
+            parameters.append(metadata)
+        if metadata_contains is not None:
+            conditions.append("instr(metadata, ?) > 0")
+            parameters.append(metadata_contains)
+
+        sql = 'SELECT {} FROM jobs'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY created_at DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            parameters.append(limit)
+        return self._query(sql, parameters)
+
+    def count_by_status(self):
+        """Returns a dictionary of JobStatus to number of mirrored jobs"""
+        return {JobStatus[status]: count for status, count in self._connection().execute(
+            'SELECT status, COUNT(*) FROM jobs GROUP BY status')}
+
+    def remove(self, id_):
+        """Removes a job from the mirror, for example after deleting it"""
+        self._connection().execute('DELETE FROM jobs WHERE id = ?', (id_,))
+
+    def _get_job_details(self, id_):
+        try:
+            return _call(self.concurrency, self.client.get_job_details, id_)
+        except HTTPError as err:
+            if utils._is_not_found(err):
+                return None
+            raise
+
+    def _store(self, jobs):
+        if not jobs:
+            return
+        now = time.time()
+        connection = self._connection()
+        connection.execute('BEGIN')
+        try:
+            connection.executemany(
+                'INSERT OR REPLACE INTO jobs ({}, created_at, synced_at) VALUES ({})'.format(
+                    ', '.join(_COLUMNS), ', '.join('?' * (len(_COLUMNS) + 2))),
+                [_row(job) + (_timestamp(job.created_on), now) for job in jobs])
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _query(self, sql, parameters):
+        rows = self._connection().execute(sql.format(', '.join(_COLUMNS)), parameters)
+        return [_job(row) for row in rows]
+
+    def _connection(self):
+        return utils._thread_connection(self._local, self.path)
+
+
+def _timestamp(value):
+    value = utils._parse_datetime(value)
+    return calendar.timegm(value.timetuple()) + value.microsecond / 1e6
+
+
+def _row(job):
+    return (job.id, job.created_on, job.status.name, job.completed_on, job.name,
+            job.callback_url, job.metadata, job.media_url, job.failure, job.failure_detail,
+            job.duration_seconds)
+
+
+def _job(row):
+    return Job(row[0], row[1], JobStatus[row[2]], *row[3:])
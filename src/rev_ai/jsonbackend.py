@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Pluggable JSON backend and bulk decoders of API responses"""
+
+import importlib
+import os
+import threading
+
+# Backends in order of preference when none is chosen
+BACKENDS = ('orjson', 'ujson', 'simplejson', 'json')
+
+# Environment variable naming the backend used by default
+BACKEND_ENV = 'REV_AI_JSON_BACKEND'
+
+
+class JsonBackend:
+    """Encodes and decodes JSON with one of the supported libraries. loads
+    accepts bytes or text, and dumps returns compact text which is the same
+    whatever the library.
+    """
+
+    def __init__(self, name):
+        """Constructor
+
+        :param name: one of 'orjson', 'ujson', 'simplejson' or 'json'
+        :raises: ValueError if the backend is unknown
+        :raises: ImportError if its library is not installed
+        """
+        if name not in BACKENDS:
+            raise ValueError('Unknown JSON backend {!r}, expected one of {}'.format(
+                name, ', '.join(BACKENDS)))
+        self.name = name
+        self.module = importlib.import_module(name)
+        self.loads = self._make_loads()
+        self.dumps = self._make_dumps()
+
+    def __repr__(self):
+        return 'JsonBackend({!r})'.format(self.name)
+
+    def _make_loads(self):
+        loads = self.module.loads
+        if self.name == 'orjson':
+            return loads
+
+        def decode(data):
+            if isinstance(data, (bytes, bytearray)):
+                data = data.decode('utf-8')
+            return loads(data)
+        return decode
+
+    def _make_dumps(self):
+        module = self.module
+        if self.name == 'orjson':
+            def encode(obj, sort_keys=False):
+                option = module.OPT_SORT_KEYS if sort_keys else 0
+                return module.dumps(obj, option=option).decode('utf-8')
+        elif self.name == 'ujson':
+            def encode(obj, sort_keys=False):
+                return module.dumps(obj, sort_keys=sort_keys, ensure_ascii=False,
+                                    escape_forward_slashes=False)
+        else:
+            def encode(obj, sort_keys=False):
+                return module.dumps(obj, sort_keys=sort_keys, ensure_ascii=False,
+                                    separators=(',', ':'))
+        return encode
+
+
+_lock = threading.Lock()
+_backend = None
+
+
+def get_backend():
+    """Returns the JsonBackend in use. Unless set_backend was called, it is
+    the one named by the REV_AI_JSON_BACKEND environment variable, or else the
+    fastest installed one.
+    """
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = _detect()
+    return _backend
+
+
+def set_backend(backend):
+    """Sets the JSON backend used by the SDK
+
+    :param backend: JsonBackend or name of a backend. None restores the default
+    :returns: the previous JsonBackend
+    """
+    global _backend
+    if backend is not None and not isinstance(backend, JsonBackend):
+        backend = JsonBackend(backend)
+    previous = get_backend()
+    _backend = backend
+    return previous
+
+
+def loads(data):
+    """Decodes JSON bytes or text with the current backend"""
+    return get_backend().loads(data)
+
+
+def dumps(obj, sort_keys=False):
+    """Encodes an object to JSON text with the current backend"""
+    return get_backend().dumps(obj, sort_keys)
+
+
+def decode_jobs(data):
+    """Decodes the JSON bytes of a list of jobs into a list of Job"""
+    from .models import Job
+    return Job.list_from_json(loads(data))
+
+
+def decode_transcript(data):
+    """Decodes the JSON bytes of a transcript into a Transcript"""
+    from .models import Transcript
+    return Transcript.from_json(loads(data))
+
+
+def decode_account(data):
+    """Decodes the JSON bytes of an account into an Account"""
+    from .models import Account
+    return Account.from_json(loads(data))
+
+
+def _detect():
+    name = os.environ.get(BACKEND_ENV)
+    if name:
+        return JsonBackend(name)
+    for name in BACKENDS:
+        try:
+            return JsonBackend(name)
+        except ImportError:
+            pass
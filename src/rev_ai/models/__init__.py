@@ -2,5 +2,7 @@
 """Models"""
 
 from .customvocabulary import CustomVocabulary
+from .customvocabularystatus import CustomVocabularyStatus
+from .customvocabularyinformation import CustomVocabularyInformation
 from .streaming import MediaConfig
 from .asynchronous import Job, JobStatus, Account, Transcript, Monologue, Element, CaptionType
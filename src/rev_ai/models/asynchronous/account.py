@@ -2,7 +2,9 @@
 """Account model"""
 
 
-class Account:
+class Account(object):
+    __slots__ = ('email', 'balance_seconds')
+
     def __init__(self, email, balance_seconds):
         """
         :param email: email associated with the account
@@ -14,7 +16,7 @@ class Account:
     def __eq__(self, other):
         """Override default equality operator"""
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return self.email == other.email and self.balance_seconds == other.balance_seconds
         return False
 
     @classmethod
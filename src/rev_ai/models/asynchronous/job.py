@@ -4,7 +4,10 @@
 from .job_status import JobStatus
 
 
-class Job:
+class Job(object):
+    __slots__ = ('id', 'created_on', 'status', 'completed_on', 'name', 'callback_url',
+                 'metadata', 'media_url', 'failure', 'failure_detail', 'duration_seconds')
+
     def __init__(
             self, id_, created_on, status,
             completed_on=None,
@@ -36,7 +39,7 @@ class Job:
         self.status = status
         self.completed_on = completed_on
         self.name = name
-        self.callback_url = callback_url,
+        self.callback_url = callback_url
         self.metadata = metadata
         self.media_url = media_url
         self.failure = failure
@@ -46,22 +49,34 @@ class Job:
     def __eq__(self, other):
         """Override default equality operator"""
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
         return False
 
     @classmethod
     def from_json(cls, json):
         """Alternate constructor used for parsing json"""
+        get = json.get
+        status = json['status']
         return cls(
             json['id'],
             json['created_on'],
-            JobStatus.from_string(json['status']),
-            json.get('completed_on'),
-            json.get('name'),
-            json.get('callback_url'),
-            json.get('metadata'),
-            json.get('media_url'),
-            json.get('failure'),
-            json.get('failure_detail'),
-            json.get('duration_seconds')
+            _STATUSES.get(status) or JobStatus.from_string(status),
+            get('completed_on'),
+            get('name'),
+            get('callback_url'),
+            get('metadata'),
+            get('media_url'),
+            get('failure'),
+            get('failure_detail'),
+            get('duration_seconds')
         )
+
+    @classmethod
+    def list_from_json(cls, json):
+        """Alternate constructor parsing a json list of jobs into a list of Job"""
+        from_json = cls.from_json
+        return [from_json(job) for job in json]
+
+
+# JobStatus of every status string returned by the API
+_STATUSES = dict((status.name.lower(), status) for status in JobStatus)
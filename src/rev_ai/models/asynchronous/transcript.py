@@ -2,7 +2,9 @@
 """Transcript model"""
 
 
-class Transcript:
+class Transcript(object):
+    __slots__ = ('monologues',)
+
     def __init__(self, monologues):
         """
         :param monologues: list of monologues included in output
@@ -18,10 +20,12 @@ class Transcript:
     @classmethod
     def from_json(cls, json):
         """Alternate constructor used for parsing json"""
-        return cls([Monologue.from_json(monologue) for monologue in json.get('monologues', [])])
+        return cls([Monologue.from_json(monologue) for monologue in json.get('monologues', ())])
+
 
+class Monologue(object):
+    __slots__ = ('speaker', 'elements')
 
-class Monologue:
     def __init__(self, speaker, elements):
         """
         :param speaker: speaker identified for this monologue
@@ -40,12 +44,18 @@ class Monologue:
     @classmethod
     def from_json(cls, json):
         """Alternate constructor used for parsing json"""
+        # Elements are built inline rather than through Element.from_json,
+        # as transcripts hold thousands of them
         return cls(
             json['speaker'],
-            [Element.from_json(element) for element in json.get('elements', [])])
+            [Element(element['type'], element['value'], element.get('ts'),
+                     element.get('end_ts'), element.get('confidence'))
+             for element in json.get('elements', ())])
+
 
+class Element(object):
+    __slots__ = ('type_', 'value', 'timestamp', 'end_timestamp', 'confidence')
 
-class Element:
     def __init__(self, type_, value, timestamp, end_timestamp, confidence):
         """
         :param type_: type of element: text, punct, or unknown
@@ -63,7 +73,10 @@ class Element:
     def __eq__(self, other):
         """Override default equality operator"""
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return self.type_ == other.type_ and self.value == other.value and \
+                self.timestamp == other.timestamp and \
+                self.end_timestamp == other.end_timestamp and \
+                self.confidence == other.confidence
         return False
 
     @classmethod
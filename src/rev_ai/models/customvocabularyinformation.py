@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""Custom vocabulary information model"""
+
+from .customvocabularystatus import CustomVocabularyStatus
+
+
+class CustomVocabularyInformation(object):
+    __slots__ = ('id', 'status', 'created_on', 'completed_on', 'metadata', 'callback_url',
+                 'failure')
+
+    def __init__(
+            self, id_, status,
+            created_on=None,
+            completed_on=None,
+            metadata=None,
+            callback_url=None,
+            failure=None):
+        """
+        :param id_: unique id of the custom vocabulary
+        :param status: CustomVocabularyStatus of the custom vocabulary
+        :param created_on: date and time at which the custom vocabulary was submitted
+        :param completed_on: date and time at which the custom vocabulary
+                             finished processing
+        :param metadata: metadata if provided
+        :param callback_url: callback_url if provided
+        :param failure: details of the failure if processing failed
+        """
+        self.id = id_
+        self.status = status
+        self.created_on = created_on
+        self.completed_on = completed_on
+        self.metadata = metadata
+        self.callback_url = callback_url
+        self.failure = failure
+
+    def __eq__(self, other):
+        """Override default equality operator"""
+        if isinstance(other, self.__class__):
+            return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+        return False
+
+    @classmethod
+    def from_json(cls, json):
+        """Alternate constructor used for parsing json"""
+        get = json.get
+        return cls(
+            json['id'],
+            CustomVocabularyStatus.from_string(json['status']),
+            get('created_on'),
+            get('completed_on'),
+            get('metadata'),
+            get('callback_url'),
+            get('failure'))
@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+"""Enum for custom vocabulary statuses"""
+
+from enum import Enum
+
+
+class CustomVocabularyStatus(Enum):
+    IN_PROGRESS = 1
+    COMPLETE = 2
+    FAILED = 3
+
+    @classmethod
+    def from_string(cls, status):
+        return cls[status.upper()]
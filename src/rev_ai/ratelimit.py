@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+"""Rate limiting of requests to the API"""
+
+import threading
+import time
+from . import utils
+
+# Monotonic clock where available, so that rates survive system clock changes
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request would exceed the rate limit and the limiter is
+    configured not to wait
+    """
+    pass
+
+
+class TokenBucket:
+    """Thread-safe token bucket. Tokens are added continuously at rate per
+    second up to capacity, and every request takes one or more of them.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """Constructor
+
+        :param rate: number of tokens added per second
+        :param capacity (optional): maximum number of tokens stored, which is
+            the largest burst allowed. Defaults to one second worth of tokens
+        """
+        if rate <= 0:
+            raise ValueError('rate must be positive')
+        if capacity is None:
+            capacity = max(float(rate), 1.0)
+        if capacity < 1:
+            raise ValueError('capacity must be at least 1')
+
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = self.capacity
+        self._updated = _clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1, blocking=True, timeout=None):
+        """Takes tokens from the bucket, waiting for them to be added if needed
+
+        :param tokens (optional): number of tokens to take
+        :param blocking (optional): whether to wait for the tokens. If False,
+            returns immediately
+        :param timeout (optional): maximum number of seconds to wait. Waits
+            as long as needed if None
+        :returns: True if the tokens were taken, False otherwise
+        """
+        if tokens > self.capacity:
+            raise ValueError('cannot acquire more tokens than the bucket capacity')
+
+        deadline = None if timeout is None else _clock() + timeout
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return True
+            if not blocking or (deadline is not None and _clock() + wait > deadline):
+                return False
+            time.sleep(wait)
+
+    def release(self, tokens=1):
+        """Returns tokens taken for work which did not happen, up to the capacity
+
+        :param tokens (optional): number of tokens to return
+        """
+        self._give(tokens)
+
+    @property
+    def available(self):
+        """Number of tokens currently in the bucket"""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def _take(self, tokens):
+        """Takes tokens if available and returns 0, otherwise returns the
+        seconds until they will be
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def _give(self, tokens):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + tokens)
+
+    def _refill(self):
+        now = _clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+
+class SharedTokenBucket(TokenBucket):
+    """Token bucket stored in a SQLite database, so that every thread and
+    process of a host using the same path and name shares it. Updates are
+    serialized by the database file lock.
+    """
+
+    def __init__(self, path, name, rate, capacity=None):
+        """Constructor
+
+        :param path: path of the SQLite database file, created if needed
+        :param name: name of the bucket within the database
+        :param rate: number of tokens added per second
+        :param capacity (optional): maximum number of tokens stored, which is
+            the largest burst allowed. Defaults to one second worth of tokens
+        """
+        if not path:
+            raise ValueError('path must be provided')
+
+        TokenBucket.__init__(self, rate, capacity)
+        self.path = path
+        self.name = name
+        self._local = threading.local()
+        connection = self._connection()
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS buckets ('
+            'name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)')
+        connection.execute(
+            'INSERT OR IGNORE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)',
+            (name, self.capacity, time.time()))
+
+    @property
+    def available(self):
+        """Number of tokens currently in the bucket"""
+        return self._update(lambda tokens: (tokens, tokens))
+
+    def _take(self, tokens):
+        def take(available):
+            if available >= tokens:
+                return available - tokens, 0
+            return available, (tokens - available) / self.rate
+        return self._update(take)
+
+    def _give(self, tokens):
+        self._update(lambda available: (min(self.capacity, available + tokens), None))
+
+    def _update(self, function):
+        """Applies function, which takes the current number of tokens and
+        returns the new one and a result, in one transaction
+        """
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            # Processes share the wall clock, not a monotonic one
+            now = time.time()
+            stored, updated = connection.execute(
+                'SELECT tokens, updated FROM buckets WHERE name = ?', (self.name,)).fetchone()
+            available = min(self.capacity, stored + max(now - updated, 0) * self.rate)
+            tokens, result = function(available)
+            connection.execute('UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?',
+                               (tokens, now, self.name))
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+        return result
+
+    def _connection(self):
+        return utils._thread_connection(self._local, self.path)
+
+
+class RateLimiter:
+    """Limits the rate of requests made by clients, with separate buckets for
+    job and vocabulary submissions, status polling, transcript and caption
+    downloads, and other requests such as deletes. An optional total bucket
+    applies to every request. One limiter can be shared by several clients.
+
+    Example::
+
+        limiter = RateLimiter.shared('ratelimit.db', submissions=2, polling=10, downloads=5)
+        client = RevAiAPIClient('ACCESS TOKEN', rate_limiter=limiter)
+    """
+
+    categories = ('submissions', 'polling', 'downloads', 'other')
+
+    def __init__(self, submissions=None, polling=None, downloads=None, other=None, total=None,
+                 blocking=True, timeout=None):
+        """Constructor
+
+        Every limit is either a number of requests per second or a TokenBucket.
+        Requests of a category without a limit are not limited.
+
+        :param submissions (optional): limit of POST requests
+        :param polling (optional): limit of GET requests other than downloads
+        :param downloads (optional): limit of transcript and caption downloads
+        :param other (optional): limit of other requests, such as deletes
+        :param total (optional): limit of all requests
+        :param blocking (optional): whether to wait for the rate limit. If
+            False, requests over the limit raise RateLimitExceeded immediately
+        :param timeout (optional): maximum seconds to wait before raising
+            RateLimitExceeded. Waits as long as needed if None
+        """
+        self.buckets = {}
+        for category, limit in zip(self.categories + ('total',),
+                                   (submissions, polling, downloads, other, total)):
+            if limit is not None:
+                self.buckets[category] = limit if isinstance(limit, TokenBucket) \
+                    else TokenBucket(limit)
+        self.blocking = blocking
+        self.timeout = timeout
+
+    @classmethod
+    def shared(cls, path, submissions=None, polling=None, downloads=None, other=None,
+               total=None, blocking=True, timeout=None):
+        """Creates a limiter whose buckets are stored in a SQLite database, so
+        that processes of a host using the same path share the limits
+
+        :param path: path of the SQLite database file, created if needed
+        """
+        limits = dict(zip(cls.categories + ('total',),
+                          (submissions, polling, downloads, other, total)))
+        buckets = dict((category, SharedTokenBucket(path, category, limit))
+                       for category, limit in limits.items() if limit is not None)
+        return cls(blocking=blocking, timeout=timeout, **buckets)
+
+    def category(self, method, endpoint):
+        """Returns the category of a request
+
+        :param method: HTTP method of the request
+        :param endpoint: name of the endpoint, such as 'GET jobs/{id}/transcript'
+        """
+        if method == 'POST':
+            return 'submissions'
+        if method == 'GET':
+            if endpoint.endswith('/transcript') or endpoint.endswith('/captions'):
+                return 'downloads'
+            return 'polling'
+        return 'other'
+
+    def acquire(self, method, endpoint):
+        """Waits until a request may be sent
+
+        :param method: HTTP method of the request
+        :param endpoint: name of the endpoint, such as 'GET jobs/{id}/transcript'
+
+        :raises: RateLimitExceeded if the limiter does not wait or the timeout expired
+        """
+        taken = []
+        for name in (self.category(method, endpoint), 'total'):
+            bucket = self.buckets.get(name)
+            if bucket is None:
+                continue
+            if not bucket.acquire(blocking=self.blocking, timeout=self.timeout):
+                # The request is not sent, so it does not count against the
+                # buckets it already passed
+                for previous in taken:
+                    previous.release()
+                raise RateLimitExceeded('Rate limit of {} requests exceeded'.format(name))
+            taken.append(bucket)
@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+"""Parallel transcription of long audio split into overlapping segments"""
+
+import os
+import shutil
+import tempfile
+import time
+import wave
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from .concurrency import _call
+from .models import JobStatus, Transcript, Monologue, Element
+from .silencetrimming import _windows
+from . import deadline
+from . import utils
+
+
+class AudioSegment:
+    def __init__(self, filename, start, end):
+        """
+        :param filename: path of the WAV file holding the segment
+        :param start: time in seconds at which the segment starts in the original audio
+        :param end: time in seconds at which the segment ends in the original audio
+        """
+        self.filename = filename
+        self.start = start
+        self.end = end
+
+    def __eq__(self, other):
+        """Override default equality operator"""
+        if isinstance(other, self.__class__):
+            return self.__dict__ == other.__dict__
+        return False
+
+
+def split_audio(
+        filename,
+        output_dir,
+        segment_length=600.0,
+        overlap=2.0,
+        search_window=30.0,
+        rate=16000,
+        channels=1,
+        window=0.03):
+    """Splits a local WAV or raw S16LE file into WAV segments of at most
+    segment_length seconds. Each cut is placed at the quietest point of the
+    last search_window seconds of the segment, and the next segment starts
+    overlap seconds before the cut. Memory use is bounded by search_window.
+
+    :param filename: path to a local 16 bit PCM WAV file or headerless S16LE file
+    :param output_dir: directory in which the segment files are written
+    :param segment_length (optional): maximum length of a segment in seconds
+    :param overlap (optional): seconds of audio shared by consecutive segments
+    :param search_window (optional): seconds before segment_length in which to
+        look for a silence to cut at
+    :param rate (optional): sampling rate of raw input, ignored for WAV files
+    :param channels (optional): number of channels of raw input, ignored for WAV files
+    :param window (optional): seconds of audio per energy measurement
+    :returns: list of AudioSegment in order
+    """
+    if not 0 <= overlap < search_window < segment_length:
+        raise ValueError('overlap must be shorter than search_window, '
+                         'which must be shorter than segment_length')
+
+    rate, channels, chunks = utils._read_pcm(filename, rate, channels)
+    window_frames = max(int(rate * window), 1)
+    frame_size = 2 * channels
+    segment_windows = int(segment_length * rate / window_frames)
+    search_windows = int(search_window * rate / window_frames)
+    overlap_windows = int(round(overlap * rate / window_frames))
+    base = os.path.splitext(os.path.basename(filename))[0]
+
+    writer = _SegmentWriter(output_dir, base, rate, channels, overlap_windows)
+    # Windows at the end of the current segment among which the cut is placed
+    candidates = []
+    frames_read = 0
+    try:
+        for data, energy in _windows(chunks, window_frames * frame_size):
+            audio_window = (data, frames_read)
+            frames_read += len(data) // frame_size
+            if writer.windows < segment_windows - search_windows:
+                writer.write(audio_window)
+                continue
+
+            candidates.append((audio_window, energy))
+            if writer.windows + len(candidates) < segment_windows:
+                continue
+
+            # Cut after the quietest window, preferring later ones
+            cut = min(range(len(candidates)), key=lambda i: (candidates[i][1], -i)) + 1
+            for audio_window, _ in candidates[:cut]:
+                writer.write(audio_window)
+            shared = list(writer.recent) if overlap_windows else []
+            writer.next_segment()
+            for audio_window in shared + [item[0] for item in candidates[cut:]]:
+                writer.write(audio_window)
+            candidates = []
+
+        for audio_window, _ in candidates:
+            writer.write(audio_window)
+    finally:
+        writer.close()
+
+    return writer.segments
+
+
+def wait_for_jobs(client, job_ids, poll_interval=10.0, timeout=None):
+    """Waits until none of the given jobs is in progress. Statuses are polled
+    in batches through the list of recent jobs, which is only paged back to
+    the creation of the oldest job waited for, with get_job_details only used
+    for jobs missing from that list.
+
+    :param client: RevAiAPIClient which submitted the jobs
+    :param job_ids: ids of the jobs to wait for, or the Jobs themselves so
+        that the first poll is bounded by their creation time too
+    :param poll_interval (optional): seconds between polls
+    :param timeout (optional): seconds after which to give up. Waits
+        indefinitely if None
+    :returns: dictionary of job id to the Job of every finished job
+    :raises: RuntimeError if the timeout expired
+    :raises: DeadlineExceeded if the current Deadline passed
+    """
+    expires_at = None if timeout is None else time.time() + timeout
+    jobs = dict((job.id, job) for job in job_ids if hasattr(job, 'created_on'))
+    pending = set(getattr(job, 'id', job) for job in job_ids)
+    while True:
+        created_on = [jobs[job_id].created_on for job_id in pending if job_id in jobs]
+        created_after = min(created_on, key=utils._parse_datetime) \
+            if len(created_on) == len(pending) else None
+        for job in _get_jobs(client, pending, created_after):
+            jobs[job.id] = job
+        pending = set(job_id for job_id in pending
+                      if jobs[job_id].status == JobStatus.IN_PROGRESS)
+        if not pending:
+            return jobs
+        if expires_at is not None and time.time() + poll_interval > expires_at:
+            raise RuntimeError('{} jobs still in progress after {} seconds'.format(
+                len(pending), timeout))
+        budget = deadline.remaining()
+        time.sleep(poll_interval if budget is None else min(poll_interval, budget))
+
+
+def merge_transcripts(segment_transcripts):
+    """Merges the transcripts of overlapping segments into one transcript of
+    the original audio. Timestamps are shifted by the start of their segment,
+    and words in an overlap are taken from the first segment before its
+    midpoint and from the second one after it. Speakers are numbered
+    independently in every segment.
+
+    :param segment_transcripts: list of (AudioSegment, Transcript) tuples in order
+    :returns: Transcript of the original audio
+    """
+    monologues = []
+    for index, (segment, transcript) in enumerate(segment_transcripts):
+        lower = upper = None
+        if index > 0:
+            lower = (segment.start + segment_transcripts[index - 1][0].end) / 2.0
+        if index + 1 < len(segment_transcripts):
+            upper = (segment.end + segment_transcripts[index + 1][0].start) / 2.0
+
+        for monologue in transcript.monologues:
+            elements = []
+            # Untimed punctuation follows the fate of the preceding word
+            keep = False
+            for element in monologue.elements:
+                timestamp = _shift(element.timestamp, segment.start)
+                if timestamp is not None:
+                    keep = (lower is None or timestamp >= lower) and \
+                        (upper is None or timestamp < upper)
+                if keep:
+                    elements.append(Element(
+                        element.type_, element.value, timestamp,
+                        _shift(element.end_timestamp, segment.start), element.confidence))
+            if elements:
+                monologues.append(Monologue(monologue.speaker, elements))
+    return Transcript(monologues)
+
+
+def transcribe_segmented(
+        client,
+        filename,
+        segment_length=600.0,
+        overlap=2.0,
+        max_workers=4,
+        poll_interval=10.0,
+        timeout=None,
+        output_dir=None,
+        rate=16000,
+        channels=1,
+        concurrency=None,
+        **job_options):
+    """Transcribes a long local WAV or raw S16LE file by splitting it into
+    segments which are submitted and transcribed in parallel.
+
+    :param client: RevAiAPIClient used to submit the segments
+    :param filename: path to a local 16 bit PCM WAV file or headerless S16LE file
+    :param segment_length (optional): maximum length of a segment in seconds
+    :param overlap (optional): seconds of audio shared by consecutive segments
+    :param max_workers (optional): number of concurrent uploads and downloads
+    :param poll_interval (optional): seconds between job status polls
+    :param timeout (optional): seconds to wait for the jobs to finish
+    :param output_dir (optional): directory in which to keep the segment
+        files. A temporary directory, removed afterwards, is used if None
+    :param rate (optional): sampling rate of raw input, ignored for WAV files
+    :param channels (optional): number of channels of raw input, ignored for WAV files
+    :param concurrency (optional): AdaptiveConcurrencyLimiter adapting the
+        number of concurrent uploads and downloads, used instead of max_workers
+    :param job_options: options passed to submit_job_local_file for every segment
+    :returns: merged Transcript of the whole file
+    :raises: RuntimeError if a segment job failed
+    :raises: InsufficientBalance if the AccountMonitor of the client finds
+        the balance too low for the whole file
+    :raises: HTTPError
+    """
+    if not 0 <= overlap < segment_length:
+        raise ValueError('overlap must be at least 0 and shorter than segment_length')
+    # Cuts are searched for in the last quarter of a segment, at most 30
+    # seconds, and always after the overlap
+    search_window = min(30.0, segment_length / 4.0)
+    if search_window <= overlap:
+        search_window = min(overlap * 2, (overlap + segment_length) / 2.0)
+
+    if concurrency is not None:
+        max_workers = concurrency.max_limit
+    segment_dir = output_dir or tempfile.mkdtemp(prefix='rev_ai_segments_')
+    try:
+        segments = split_audio(filename, segment_dir, segment_length, overlap,
+                               search_window, rate, channels)
+        account_monitor = getattr(client, 'account_monitor', None)
+        reservation = None
+        if account_monitor is not None:
+            # Nothing is submitted unless the balance covers every segment
+            reservation = account_monitor.admit(
+                sum(segment.end - segment.start for segment in segments))
+
+        def submit(segment):
+            if reservation is not None:
+                # Each submission reserves its own segment again
+                account_monitor.release(reservation, segment.end - segment.start)
+            return _call(concurrency, lambda: client.submit_job_local_file(
+                segment.filename, **job_options))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                jobs = list(executor.map(deadline._propagate(submit), segments))
+            finally:
+                if reservation is not None:
+                    account_monitor.release(reservation)
+            finished = wait_for_jobs(client, jobs, poll_interval, timeout)
+            for job in jobs:
+                if finished[job.id].status == JobStatus.FAILED:
+                    raise RuntimeError('Segment job {} failed: {}'.format(
+                        job.id, finished[job.id].failure_detail))
+            transcripts = list(executor.map(deadline._propagate(
+                lambda job: _call(concurrency, client.get_transcript_object, job.id)), jobs))
+    finally:
+        if output_dir is None:
+            shutil.rmtree(segment_dir, ignore_errors=True)
+
+    return merge_transcripts(list(zip(segments, transcripts)))
+
+
+def _get_jobs(client, job_ids, created_after=None):
+    """Fetches the given jobs, mostly from pages of the list of recent jobs
+    created from created_after on
+    """
+    remaining = set(job_ids)
+    for job in client.iter_jobs(page_size=1000, created_after=created_after, prefetch=False):
+        if job.id in remaining:
+            remaining.discard(job.id)
+            yield job
+            if not remaining:
+                return
+    for job_id in remaining:
+        yield client.get_job_details(job_id)
+
+
+def _shift(timestamp, offset):
+    return None if timestamp is None else timestamp + offset
+
+
+class _SegmentWriter:
+    """Writes windows of audio to consecutive segment files"""
+
+    def __init__(self, output_dir, base, rate, channels, overlap_windows):
+        self.output_dir = output_dir
+        self.base = base
+        self.rate = float(rate)
+        self.channels = channels
+        self.segments = []
+        self.recent = deque(maxlen=max(overlap_windows, 1))
+        self.writer = None
+        self.windows = 0
+
+    def write(self, audio_window):
+        data, frame = audio_window
+        if self.writer is None:
+            self._open(frame)
+        self.writer.writeframes(data)
+        self.windows += 1
+        self.recent.append(audio_window)
+        self.segments[-1].end = (frame + len(data) // (2 * self.channels)) / self.rate
+
+    def next_segment(self):
+        self.close()
+        self.recent.clear()
+        self.windows = 0
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def _open(self, frame):
+        filename = os.path.join(self.output_dir, '{}.{:04d}.wav'.format(
+            self.base, len(self.segments)))
+        self.writer = wave.open(filename, 'wb')
+        self.writer.setnchannels(self.channels)
+        self.writer.setsampwidth(2)
+        self.writer.setframerate(int(self.rate))
+        self.segments.append(AudioSegment(filename, frame / self.rate, None))
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+"""Removal of long silences from local audio before submission"""
+
+import wave
+from bisect import bisect_left, bisect_right
+from collections import deque
+from . import utils
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class TimeMap:
+    """Maps times in compacted audio back to times in the original audio.
+    The compacted audio is a concatenation of regions of the original; region i
+    starts at compacted_starts[i] in the compacted audio and at
+    original_starts[i] in the original.
+    """
+
+    def __init__(self, compacted_starts=None, original_starts=None):
+        """
+        :param compacted_starts (optional): sorted start times of the kept
+            regions in the compacted audio
+        :param original_starts (optional): start times of the same regions in
+            the original audio
+        """
+        self.compacted_starts = list(compacted_starts or [])
+        self.original_starts = list(original_starts or [])
+        if len(self.compacted_starts) != len(self.original_starts):
+            raise ValueError('compacted_starts and original_starts must have the same length')
+
+    def __eq__(self, other):
+        """Override default equality operator"""
+        if isinstance(other, self.__class__):
+            return self.__dict__ == other.__dict__
+        return False
+
+    def add_region(self, compacted_start, original_start):
+        """Records that the audio at compacted_start continues from
+        original_start in the original audio"""
+        self.compacted_starts.append(compacted_start)
+        self.original_starts.append(original_start)
+
+    def to_original(self, time, is_end=False):
+        """Converts a time in the compacted audio to the original audio
+
+        :param time: time in seconds in the compacted audio
+        :param is_end (optional): whether the time ends an interval, in which
+            case a time on a region boundary is mapped to the end of the
+            previous region rather than the start of the next one
+        """
+        if time is None or not self.compacted_starts:
+            return time
+        index = (bisect_left if is_end else bisect_right)(self.compacted_starts, time) - 1
+        index = max(index, 0)
+        return self.original_starts[index] + time - self.compacted_starts[index]
+
+    def remap_transcript(self, transcript):
+        """Converts the timestamps of every element of a transcript of the
+        compacted audio to the original audio, in place
+
+        :param transcript: Transcript of the compacted audio
+        :returns: the same transcript
+        """
+        for monologue in transcript.monologues:
+            for element in monologue.elements:
+                element.timestamp = self.to_original(element.timestamp)
+                element.end_timestamp = self.to_original(element.end_timestamp, is_end=True)
+        return transcript
+
+    def to_json(self):
+        """Returns the raw form of the map, to be stored next to the job id"""
+        return {'compacted_starts': self.compacted_starts,
+                'original_starts': self.original_starts}
+
+    @classmethod
+    def from_json(cls, json):
+        """Alternate constructor used for parsing json"""
+        return cls(json['compacted_starts'], json['original_starts'])
+
+
+def compact_silence(
+        filename,
+        output_filename,
+        rate=16000,
+        channels=1,
+        threshold_db=-40.0,
+        min_silence=1.0,
+        padding=0.25,
+        window=0.03):
+    """Writes a WAV copy of a local WAV or raw S16LE file in which every
+    silence longer than min_silence is shortened to 2 * padding. The audio is
+    processed in chunks, so memory use does not depend on the file length.
+
+    :param filename: path to a local 16 bit PCM WAV file or headerless S16LE file
+    :param output_filename: path of the WAV file to write
+    :param rate (optional): sampling rate of raw input, ignored for WAV files
+    :param channels (optional): number of channels of raw input, ignored for WAV files
+    :param threshold_db (optional): windows quieter than this level, in dB
+        relative to full scale, are silent
+    :param min_silence (optional): seconds of silence that are kept as is
+    :param padding (optional): seconds of silence kept on each side of speech
+        when a silence is shortened
+    :param window (optional): seconds of audio per energy measurement
+    :returns: TimeMap from the output audio to the input audio
+    """
+    if min_silence < 2 * padding:
+        raise ValueError('min_silence must be at least twice the padding')
+
+    rate, channels, chunks = utils._read_pcm(filename, rate, channels)
+    window_frames = max(int(rate * window), 1)
+    window_bytes = 2 * channels * window_frames
+    padding_windows = int(round(padding * rate / window_frames))
+    min_silence_windows = int(round(min_silence * rate / window_frames))
+    threshold = _energy_threshold(threshold_db)
+
+    time_map = TimeMap()
+    writer = wave.open(output_filename, 'wb')
+    try:
+        writer.setnchannels(channels)
+        writer.setsampwidth(2)
+        writer.setframerate(rate)
+
+        output = _CompactedWriter(writer, time_map)
+        frames_read = 0
+
+        # Silent windows of the current run which may still be kept. Leading
+        # silence only keeps its padding, as if speech had just ended.
+        silent_run = padding_windows
+        pending = deque()
+        for data, energy in _windows(chunks, window_bytes):
+            original_frame = frames_read
+            frames_read += len(data) // (2 * channels)
+            if energy < threshold:
+                silent_run += 1
+                if silent_run <= padding_windows:
+                    output.write(data, original_frame)
+                else:
+                    pending.append((data, original_frame))
+                    if silent_run > min_silence_windows:
+                        while len(pending) > padding_windows:
+                            pending.popleft()
+            else:
+                for item in pending:
+                    output.write(*item)
+                pending.clear()
+                silent_run = 0
+                output.write(data, original_frame)
+    finally:
+        writer.close()
+
+    return time_map
+
+
+class _CompactedWriter:
+    """Writes kept windows and records where the output stops being
+    contiguous with the input"""
+
+    def __init__(self, writer, time_map):
+        self.writer = writer
+        self.time_map = time_map
+        self.frame_size = 2 * writer.getnchannels()
+        self.rate = float(writer.getframerate())
+        self.frames_written = 0
+        self.next_original_frame = None
+
+    def write(self, data, original_frame):
+        if original_frame != self.next_original_frame:
+            self.time_map.add_region(self.frames_written / self.rate, original_frame / self.rate)
+        self.writer.writeframes(data)
+        frames = len(data) // self.frame_size
+        self.frames_written += frames
+        self.next_original_frame = original_frame + frames
+
+
+def _energy_threshold(threshold_db):
+    """Mean square sample value of a window at threshold_db dBFS"""
+    return (32768 * 10 ** (threshold_db / 20.0)) ** 2
+
+
+def _windows(chunks, window_bytes):
+    """Splits chunks of S16LE audio into windows of window_bytes bytes and
+    yields each window with its mean square sample value. The last window may
+    be shorter."""
+    remainder = b''
+    for chunk in chunks:
+        data = remainder + chunk
+        usable = len(data) - len(data) % window_bytes
+        remainder = data[usable:]
+        if usable:
+            energies = _window_energies(data[:usable], window_bytes // 2)
+            for index, energy in enumerate(energies):
+                yield data[index * window_bytes:(index + 1) * window_bytes], energy
+    if remainder:
+        yield remainder, _window_energies(remainder, len(remainder) // 2)[0]
+
+
+def _window_energies(data, window_samples):
+    """Mean square sample value of each window of window_samples samples"""
+    if numpy is not None:
+        samples = numpy.frombuffer(data, dtype='<i2').astype(numpy.float64)
+        return (samples.reshape(-1, window_samples) ** 2).mean(axis=1).tolist()
+
+    samples = utils._to_samples(data)
+    return [sum(s * s for s in samples[start:start + window_samples]) / float(window_samples)
+            for start in range(0, len(samples), window_samples)]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""Coalescing of concurrent identical requests"""
+
+import threading
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time. Callers asking for a key while
+    a call for it is in flight wait for that call and share its outcome
+    instead of making their own request.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.saved = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, function, copy=None):
+        """Calls function, or waits for the call in flight for the same key
+
+        :param key: hashable identifying the request
+        :param function: function without arguments making the request
+        :param copy (optional): function returning a copy of a result. When
+            given, every waiting caller gets its own copy so that mutable
+            results are never shared
+        :returns: result of the call
+        :raises: exception raised by the call
+        """
+        with self._lock:
+            call = self._in_flight.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._in_flight[key] = call
+                self.calls += 1
+            else:
+                call.waiters += 1
+                self.saved += 1
+
+        if leader:
+            return self._run(key, call, function, copy)
+
+        call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.results.pop()
+
+    def stats(self):
+        """Returns a dictionary with the number of calls made and of calls saved"""
+        with self._lock:
+            return {'calls': self.calls, 'saved': self.saved}
+
+    def _run(self, key, call, function, copy):
+        try:
+            result = function()
+        except BaseException as err:
+            with self._lock:
+                del self._in_flight[key]
+            call.error = err
+            call.done.set()
+            raise
+
+        # Once the call is out of the map no one else can wait on it, so the
+        # copies are made here before any waiter resumes. Waiters get the
+        # error of a failed copy, the leader keeps its result
+        with self._lock:
+            del self._in_flight[key]
+        try:
+            call.results = [result if copy is None else copy(result)
+                            for _ in range(call.waiters)]
+        except BaseException as err:
+            call.error = err
+        finally:
+            call.done.set()
+        return result
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.results = None
+        self.error = None
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""Fan-out of streaming responses to multiple consumers"""
+
+import threading
+import time
+from collections import deque
+from enum import Enum
+from . import jsonbackend
+
+# Seconds the reader waits for a subscriber with the BLOCK policy by default
+DEFAULT_BLOCK_TIMEOUT = 5.0
+
+
+class OverflowPolicy(Enum):
+    """What to do when a subscriber's buffer is full.
+
+    DROP_PARTIALS discards buffered partial hypotheses, which are superseded by
+    any newer message anyway. BLOCK makes the reader wait for the subscriber
+    (at most block_timeout seconds). DISCONNECT drops the subscriber.
+    """
+    DROP_PARTIALS = 1
+    BLOCK = 2
+    DISCONNECT = 3
+
+
+class Subscription:
+    def __init__(self, name, max_buffer_size, overflow_policy,
+                 block_timeout=DEFAULT_BLOCK_TIMEOUT):
+        """
+        :param name: name used to identify this subscriber in lag reports
+        :param max_buffer_size: maximum number of responses buffered for this
+            subscriber
+        :param overflow_policy: OverflowPolicy applied once the buffer is full
+        :param block_timeout (optional): seconds the reader waits on a full
+            buffer with the BLOCK policy before disconnecting the subscriber,
+            so that a stalled subscriber cannot stall the others. The default
+            is used if None
+        """
+        if max_buffer_size < 1:
+            raise ValueError('max_buffer_size must be at least 1')
+        if block_timeout is None:
+            block_timeout = DEFAULT_BLOCK_TIMEOUT
+
+        self.name = name
+        self.max_buffer_size = max_buffer_size
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.delivered = 0
+        self.dropped = 0
+        self.disconnected = False
+        self._buffer = deque()
+        self._closed = False
+        self._error = None
+        self._condition = threading.Condition()
+
+    @property
+    def lag(self):
+        """Number of responses waiting to be consumed by this subscriber"""
+        with self._condition:
+            return len(self._buffer)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        with self._condition:
+            while not self._buffer and not self._closed:
+                self._condition.wait()
+            if self._buffer:
+                self.delivered += 1
+                data, _ = self._buffer.popleft()
+                self._condition.notify_all()
+                return data
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+            raise StopIteration
+
+    next = __next__
+
+    def unsubscribe(self):
+        """Stops delivery to this subscriber and discards its buffer"""
+        with self._condition:
+            self.dropped += len(self._buffer)
+            self._buffer.clear()
+            self.disconnected = True
+            self._closed = True
+            self._condition.notify_all()
+
+    def _publish(self, data, is_partial):
+        """Called from the reader thread. Never blocks unless the subscriber
+        chose the BLOCK policy."""
+        with self._condition:
+            if self._closed:
+                return
+            if len(self._buffer) >= self.max_buffer_size:
+                if not self._make_room(is_partial):
+                    return
+            self._buffer.append((data, is_partial))
+            self._condition.notify_all()
+
+    def _make_room(self, is_partial):
+        if self.overflow_policy == OverflowPolicy.BLOCK:
+            expires_at = time.time() + self.block_timeout
+            while len(self._buffer) >= self.max_buffer_size and not self._closed:
+                remaining = expires_at - time.time()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            else:
+                return not self._closed
+        elif self.overflow_policy == OverflowPolicy.DROP_PARTIALS:
+            kept = deque(item for item in self._buffer if not item[1])
+            self.dropped += len(self._buffer) - len(kept)
+            self._buffer = kept
+            if len(self._buffer) < self.max_buffer_size:
+                return True
+            if is_partial:
+                self.dropped += 1
+                return False
+
+        # The subscriber cannot keep up even with final hypotheses
+        self.dropped += len(self._buffer) + 1
+        self._buffer.clear()
+        self.disconnected = True
+        self._closed = True
+        self._condition.notify_all()
+        return False
+
+    def _close(self, error=None):
+        with self._condition:
+            self._closed = True
+            self._error = error
+            self._condition.notify_all()
+
+
+class StreamingBroadcaster:
+    """Reads responses from a single streaming response generator on a
+    background thread and delivers each one to every subscriber through its own
+    bounded buffer, so one slow consumer cannot stall the websocket reader.
+
+    Example::
+
+        broadcaster = StreamingBroadcaster(client.start(generator))
+        captions = broadcaster.subscribe('captions')
+        analytics = broadcaster.subscribe('analytics', overflow_policy=OverflowPolicy.DISCONNECT)
+        broadcaster.start()
+    """
+
+    def __init__(self, response_generator, max_buffer_size=100,
+                 overflow_policy=OverflowPolicy.DROP_PARTIALS):
+        """Constructor
+
+        :param response_generator: generator of responses, as returned by
+            RevAiStreamingClient.start
+        :param max_buffer_size (optional): default buffer size of subscribers
+        :param overflow_policy (optional): default OverflowPolicy of subscribers
+        """
+        if response_generator is None:
+            raise ValueError('response_generator must be provided')
+
+        self.response_generator = response_generator
+        self.max_buffer_size = max_buffer_size
+        self.overflow_policy = overflow_policy
+        self.subscriptions = []
+        self._lock = threading.Lock()
+        self._finished = False
+        self.reader_thread = None
+
+    def subscribe(self, name=None, max_buffer_size=None, overflow_policy=None,
+                  block_timeout=None):
+        """Register a new consumer. Subscribers only receive responses read
+        after they subscribed.
+
+        :param name (optional): name reported in lag()
+        :param max_buffer_size (optional): overrides the broadcaster default
+        :param overflow_policy (optional): overrides the broadcaster default
+        :param block_timeout (optional): see Subscription
+        :returns: Subscription which can be iterated to consume responses
+        """
+        with self._lock:
+            if self._finished:
+                raise RuntimeError('The response stream has already ended')
+            subscription = Subscription(
+                name if name is not None else 'subscriber-{}'.format(len(self.subscriptions)),
+                max_buffer_size or self.max_buffer_size,
+                overflow_policy or self.overflow_policy,
+                block_timeout)
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def start(self):
+        """Starts the background thread reading the response generator"""
+        if self.reader_thread is not None:
+            raise RuntimeError('The broadcaster has already been started')
+
+        self.reader_thread = threading.Thread(target=self._read_responses)
+        self.reader_thread.daemon = True
+        self.reader_thread.start()
+        return self
+
+    def lag(self):
+        """Returns a dictionary of subscriber name to number of buffered,
+        unconsumed responses"""
+        with self._lock:
+            subscriptions = list(self.subscriptions)
+        return {subscription.name: subscription.lag for subscription in subscriptions}
+
+    def _read_responses(self):
+        error = None
+        try:
+            for data in self.response_generator:
+                is_partial = _is_partial(data)
+                with self._lock:
+                    subscriptions = [s for s in self.subscriptions if not s.disconnected]
+                for subscription in subscriptions:
+                    subscription._publish(data, is_partial)
+        except Exception as e:
+            error = e
+        finally:
+            with self._lock:
+                self._finished = True
+                subscriptions = list(self.subscriptions)
+            for subscription in subscriptions:
+                subscription._close(error)
+
+
+def _is_partial(data):
+    if not data:
+        return True
+    try:
+        return jsonbackend.loads(data).get('type') == 'partial'
+    except (ValueError, AttributeError):
+        return False
@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 """StreamingClient tool used for streaming services"""
-import websocket
 import threading
-import six
-import json
+import time
 from . import __version__
+from . import jsonbackend
+from .instrumentation import StreamInfo
+from .vocabularyregistry import _resolve_vocabulary_id
 
 try:
     from urllib.parse import urlencode
@@ -12,6 +13,12 @@ except ImportError:
     from urllib import urlencode
 
 
+class StreamingTimeoutError(Exception):
+    """Raised through on_error when no frame was received from the server
+    within the configured idle timeout"""
+    pass
+
+
 def on_error(error):
     raise error
 
@@ -31,7 +38,12 @@ class RevAiStreamingClient():
                  version='v1',
                  on_error=on_error,
                  on_close=on_close,
-                 on_connected=on_connected):
+                 on_connected=on_connected,
+                 heartbeat_interval=None,
+                 idle_timeout=None,
+                 encoder=None,
+                 hooks=None,
+                 vocabulary_registry=None):
         """Constructor for Streaming Client
         :param access_token: access token which authorizes all requests and
             links them to your account. Generated on the settings page of your
@@ -45,6 +57,20 @@ class RevAiStreamingClient():
             closes
         :param on_connected (optional): function to be called when the websocket
             and thread starts successfully
+        :param heartbeat_interval (optional): seconds between pings sent to the
+            server to keep the connection alive. No pings are sent if None
+        :param idle_timeout (optional): seconds without any frame from the
+            server, pongs included, after which the connection is considered
+            dead and a StreamingTimeoutError is passed to on_error. Should be
+            larger than heartbeat_interval. Waits indefinitely if None
+        :param encoder (optional): AudioEncoder used to compress the raw audio
+            described by config before sending it. config must then describe
+            S16LE audio/x-raw with its rate and channels. The content type
+            sent to the server is the one of the encoded stream
+        :param hooks (optional): instrumentation Hooks called when the
+            connection opens and closes and for every message received
+        :param vocabulary_registry (optional): VocabularyRegistry resolving a
+            CustomVocabulary passed to start as custom_vocabulary_id
         """
         if not access_token:
             raise ValueError('access_token must be provided')
@@ -52,13 +78,31 @@ class RevAiStreamingClient():
         if not config:
             raise ValueError('config must be provided')
 
+        if encoder:
+            if config.content_type != 'audio/x-raw' or config.format != 'S16LE' or \
+                    not config.rate or not config.channels:
+                raise ValueError('An encoder requires a config of raw S16LE audio '
+                                 '(audio/x-raw, format S16LE) with a rate and channels')
+            encoder.reset(config.rate, config.channels)
+            config = encoder.media_config()
+
         self.access_token = access_token
         self.config = config
+        self.encoder = encoder
         self.base_url = 'wss://api.rev.ai/speechtotext/{}/stream'. \
             format(version)
         self.on_error = on_error
         self.on_close = on_close
         self.on_connected = on_connected
+        self.heartbeat_interval = heartbeat_interval
+        self.idle_timeout = idle_timeout
+        self.hooks = hooks
+        self.vocabulary_registry = vocabulary_registry
+        self.last_frame_time = None
+        self._stream = None
+        self._stop_heartbeat = threading.Event()
+        # websocket-client is imported on first use to keep importing the SDK fast
+        import websocket
         self.client = websocket.WebSocket(enable_multithread=True)
 
     def start(self,
@@ -72,11 +116,15 @@ class RevAiStreamingClient():
             thread
         :param generator: generator object that yields binary audio data
         :param metadata: metadata to be attached to streaming job
-        :param custom_vocabulary_id: id of custom vocabulary to be used with this streaming job
+        :param custom_vocabulary_id: id of custom vocabulary to be used with this streaming job,
+            or with a vocabulary_registry a CustomVocabulary or list of them
+            whose id is looked up in the registry
         :param filter_profanity: whether to mask profane words
         :param remove_disfluencies: whether to exclude filler words like "uh"
         :param delete_after_seconds: number of seconds after job completion when job is auto-deleted
         """
+        custom_vocabulary_id = _resolve_vocabulary_id(self.vocabulary_registry,
+                                                      custom_vocabulary_id)
         url = self.base_url + '?' + urlencode({
             'access_token': self.access_token,
             'content_type': self.config.get_content_type_string(),
@@ -102,14 +150,28 @@ class RevAiStreamingClient():
             self.client.connect(url)
         except Exception as e:
             self.on_error(e)
+        else:
+            if self.hooks is not None:
+                self._stream = StreamInfo(url.replace(
+                    urlencode({'access_token': self.access_token}), 'access_token=*'),
+                    self.config.get_content_type_string())
+                self.hooks.stream_opened(self._stream)
+
+        if self.idle_timeout:
+            self.client.settimeout(self.idle_timeout)
+        if self.encoder:
+            generator = self.encoder.encode_stream(generator)
+        self.last_frame_time = time.time()
 
         self._start_send_data_thread(generator)
+        self._start_heartbeat_thread()
 
         return self._get_response_generator()
 
     def end(self):
         """Function to end the streaming service, close the websocket.
         """
+        self._stop_heartbeat.set()
         self.client.abort()
 
     def _start_send_data_thread(self, generator):
@@ -142,16 +204,72 @@ class RevAiStreamingClient():
 
         self.client.send("EOS")
 
+    def _start_heartbeat_thread(self):
+        """Function to start the thread pinging the server every
+            heartbeat_interval seconds
+        """
+        if not self.heartbeat_interval:
+            return
+
+        self._stop_heartbeat.clear()
+        self.heartbeat_thread = threading.Thread(target=self._send_heartbeats)
+        self.heartbeat_thread.daemon = True
+        self.heartbeat_thread.start()
+
+    def _send_heartbeats(self):
+        """Function used in a thread to ping the server until the response
+            generator ends.
+        """
+        while not self._stop_heartbeat.wait(self.heartbeat_interval):
+            try:
+                self.client.ping()
+            except Exception:
+                # The response generator reports broken connections
+                return
+
     def _get_response_generator(self):
         """A generator of reponses from the server. Yields the data decoded.
+            Pings are answered automatically; pongs and binary frames are
+            consumed without being yielded.
         """
+        try:
+            for data in self._read_frames():
+                yield data
+        finally:
+            self._stop_heartbeat.set()
+            if self._stream is not None:
+                stream, self._stream = self._stream, None
+                stream._finish()
+                self.hooks.stream_closed(stream)
+
+    def _read_frames(self):
+        import six
+        import websocket
+
         while True:
-            with self.client.readlock:
-                opcode, data = self.client.recv_data()
+            try:
+                with self.client.readlock:
+                    opcode, data = self.client.recv_data(control_frame=True)
+            except websocket.WebSocketTimeoutException:
+                error = StreamingTimeoutError(
+                    'No frame received from the server in {:.1f} seconds'.format(
+                        time.time() - self.last_frame_time))
+                if self._stream is not None:
+                    self._stream.error = error
+                # Tears the dead connection down so that the sender and
+                # heartbeat threads stop and the server ends the session
+                self.end()
+                self.on_error(error)
+                return
+            self.last_frame_time = time.time()
             if opcode == websocket.ABNF.OPCODE_TEXT:
+                # Bytes received, not characters once decoded
+                size = len(data)
                 if six.PY3:
                     data = data.decode('utf-8')
-                data_dict = json.loads(data)
+                data_dict = jsonbackend.loads(data)
+                if self._stream is not None:
+                    self._record_message(data_dict, size)
                 if data_dict['type'] == 'connected':
                     self.on_connected(data_dict['id'])
                 else:
@@ -161,7 +279,14 @@ class RevAiStreamingClient():
                     code = 256 * six.byte2int(data[0:1]) + \
                         six.byte2int(data[1:2])
                     reason = data[2:].decode('utf-8')
+                    if self._stream is not None:
+                        self._stream.close_code, self._stream.close_reason = code, reason
                     self.on_close(code, reason)
                 return
-            else:
-                yield ''
+
+    def _record_message(self, message, size):
+        if message['type'] == 'connected':
+            self._stream.job_id = message['id']
+        self._stream.messages += 1
+        self._stream.message_bytes += size
+        self.hooks.message_received(self._stream, message['type'], size)
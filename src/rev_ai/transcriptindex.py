@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Time index over the elements of a transcript"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+
+
+class TranscriptIndex:
+    """Sorted arrays of the timed elements of a Transcript, queried with
+    bisect for the word spoken at a time, the words spoken during an
+    interval and the speaker at a time. Lookups take logarithmic time even
+    when some elements or monologues are much longer than the others.
+    Elements without timestamps, such as punctuation, are not indexed. The
+    index is built once and does not follow later changes to the transcript.
+
+    Example::
+
+        index = TranscriptIndex(client.get_transcript_object(job.id))
+        words = index.elements_between(61.0, 75.5)
+        speaker = index.speaker_at(62.3)
+    """
+
+    def __init__(self, transcript):
+        """Constructor
+
+        :param transcript: Transcript to index
+        """
+        timed = []
+        spans = []
+        for monologue in transcript.monologues:
+            first = last = None
+            for element in monologue.elements:
+                if element.timestamp is None:
+                    continue
+                end = element.end_timestamp
+                if end is None or end < element.timestamp:
+                    end = element.timestamp
+                timed.append((element.timestamp, end, len(timed), element, monologue.speaker))
+                first = element.timestamp if first is None else min(first, element.timestamp)
+                last = end if last is None else max(last, end)
+            if first is not None:
+                spans.append((first, last, len(spans), monologue.speaker))
+        # Channels of multichannel transcripts interleave, hence the sort
+        timed.sort()
+        spans.sort()
+
+        self.starts = array('d', (item[0] for item in timed))
+        self.ends = array('d', (item[1] for item in timed))
+        self.elements = [item[3] for item in timed]
+        self.speakers = [item[4] for item in timed]
+        self._span_starts = array('d', (span[0] for span in spans))
+        self._span_ends = array('d', (span[1] for span in spans))
+        self._span_speakers = [span[3] for span in spans]
+        # Maximum end times of ranges of entries, so that long elements or
+        # monologues never make a lookup scan the entries they overlap
+        self._end_tree = _max_tree(self.ends)
+        self._span_end_tree = _max_tree(self._span_ends)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def element_at(self, time):
+        """Returns the element being spoken at a time in seconds, or None"""
+        index = _index_at(self.starts, self._end_tree, time)
+        return None if index is None else self.elements[index]
+
+    def speaker_at(self, time):
+        """Returns the speaker of the monologue spanning a time in seconds, or
+        None if no one speaks then
+        """
+        index = _index_at(self._span_starts, self._span_end_tree, time)
+        return None if index is None else self._span_speakers[index]
+
+    def elements_between(self, start, end):
+        """Returns the elements overlapping the interval [start, end) in
+        seconds, in chronological order
+        """
+        # Elements starting from start on overlap it, as elements never end
+        # before they start. Earlier ones overlap it if they end after it
+        first = bisect_left(self.starts, start)
+        last = bisect_left(self.starts, end)
+        indices = _indices_above(self._end_tree, min(first, last), start)
+        indices.extend(range(first, last))
+        return [self.elements[i] for i in indices]
+
+    def text_between(self, start, end):
+        """Returns the values of the elements overlapping [start, end) joined by spaces"""
+        return ' '.join(element.value for element in self.elements_between(start, end))
+
+
+def _max_tree(values):
+    """Returns a complete binary tree, stored in an array, of the maximum of
+    the values in the range of every node. The leaves are the values padded
+    to a power of two.
+    """
+    size = 1
+    while size < len(values):
+        size *= 2
+    tree = array('d', [float('-inf')]) * (2 * size)
+    tree[size:size + len(values)] = array('d', values)
+    for node in range(size - 1, 0, -1):
+        tree[node] = max(tree[2 * node], tree[2 * node + 1])
+    return tree
+
+
+def _index_at(starts, end_tree, time):
+    """Returns the latest entry starting at or before time which has not
+    ended yet, or None
+    """
+    last = bisect_right(starts, time) - 1
+    if last < 0:
+        return None
+    if starts[last] == time:
+        # Entries never end before they start, so it spans time
+        return last
+    # Every entry up to last starts before time, so it spans time if it ends
+    # after it. The left siblings met walking up from the leaf of last cover
+    # the earlier entries from right to left
+    size = len(end_tree) // 2
+    node = size + last
+    if end_tree[node] > time:
+        return last
+    while node > 1:
+        if node & 1 and end_tree[node - 1] > time:
+            node -= 1
+            while node < size:
+                node = 2 * node + 1 if end_tree[2 * node + 1] > time else 2 * node
+            return node - size
+        node //= 2
+    return None
+
+
+def _indices_above(end_tree, stop, time):
+    """Returns the indices below stop of the entries ending after time, in order"""
+    indices = []
+    stack = [(1, 0, len(end_tree) // 2)]
+    while stack:
+        node, first, width = stack.pop()
+        if first >= stop or end_tree[node] <= time:
+            continue
+        if width == 1:
+            indices.append(first)
+            continue
+        width //= 2
+        stack.append((2 * node + 1, first + width, width))
+        stack.append((2 * node, first, width))
+    return indices
@@ -1,16 +1,171 @@
 # -*- coding: utf-8 -*-
 """Speech recognition tools for using Rev.ai"""
 
-from . import CustomVocabulary
+import os
+import sys
+import tempfile
+import wave
+from datetime import datetime
+from array import array
+
+# Size of chunks read from local audio files
+AUDIO_CHUNK_SIZE = 64 * 1024
+
+# Python 2 has no atomic replacing rename
+_replace = getattr(os, 'replace', os.rename)
 
 
 def _process_vocabularies(unprocessed_vocabularies):
     """
-    This method takes in a list that contains CustomVocabulary objects
-    and returns a list in which any such objects are converted properly
-    to custom vocabulary dictionaries. Any items of other types in the list
-    are not changed.
+    This method takes in a list that contains CustomVocabulary or
+    VocabularyBuilder objects and returns a list in which any such objects
+    are converted properly to custom vocabulary dictionaries, without copying
+    their phrases. Any items of other types in the list are not changed.
+    """
+    return [custom_vocabulary.to_dict() if hasattr(custom_vocabulary, 'to_dict')
+            else custom_vocabulary for custom_vocabulary in unprocessed_vocabularies]
+
+
+def _json_body(payload, custom_vocabularies=None):
+    """
+    This method encodes a request payload to JSON bytes. When the payload
+    holds custom vocabularies which encode themselves with iter_json, such as
+    VocabularyBuilder, the list is encoded from their chunks rather than from
+    the converted dictionaries of the payload.
+    """
+    from . import jsonbackend
+
+    if not custom_vocabularies or \
+            not any(hasattr(vocabulary, 'iter_json') for vocabulary in custom_vocabularies):
+        return jsonbackend.dumps(payload).encode('utf-8')
+
+    rest = dict(payload)
+    del rest['custom_vocabularies']
+    chunks = [b'{"custom_vocabularies":[']
+    for index, vocabulary in enumerate(custom_vocabularies):
+        if index:
+            chunks.append(b',')
+        if hasattr(vocabulary, 'iter_json'):
+            chunks.extend(vocabulary.iter_json())
+        else:
+            chunks.append(jsonbackend.dumps(_process_vocabularies([vocabulary])[0])
+                          .encode('utf-8'))
+    chunks.append(b']')
+    # Appends the other options after the list, reusing the closing brace
+    chunks.append(b',' + jsonbackend.dumps(rest)[1:].encode('utf-8') if rest else b'}')
+    return b''.join(chunks)
+
+
+def _is_not_found(error):
+    """
+    This method returns whether an HTTPError is a 404 response, which bulk
+    operations treat as the resource being already gone.
+    """
+    return error.response is not None and error.response.status_code == 404
+
+
+def _write_atomically(path, chunks):
+    """
+    This method writes chunks of bytes to a temporary file next to path which
+    is renamed to path once complete, so that readers never see a partial
+    file, and returns the number of bytes written.
+    """
+    fd, temp_path = tempfile.mkstemp(
+        prefix='.' + os.path.basename(path), suffix='.tmp', dir=os.path.dirname(path) or '.')
+    written = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+        _replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    return written
+
+
+def _thread_connection(local, path):
+    """
+    This method returns the SQLite connection to the database at path of the
+    calling thread, stored on the given threading.local, opening it in
+    autocommit mode if needed.
+    """
+    connection = getattr(local, 'connection', None)
+    if connection is None:
+        import sqlite3
+        connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        local.connection = connection
+    return connection
+
+
+def _parse_datetime(value):
+    """
+    This method parses an ISO 8601 UTC timestamp such as the created_on field
+    of jobs, with or without fractional seconds, into a naive datetime in UTC.
+    Aware datetimes are converted to naive UTC, naive ones are returned
+    unchanged.
+    """
+    if isinstance(value, datetime):
+        offset = value.utcoffset()
+        if offset is None:
+            return value
+        return (value - offset).replace(tzinfo=None)
+    value = value.rstrip('Z')
+    if '.' in value:
+        value, fraction = value.split('.', 1)
+        microseconds = int((fraction + '000000')[:6])
+    else:
+        microseconds = 0
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S').replace(microsecond=microseconds)
+
+
+def _read_pcm(filename, rate, channels, chunk_size=AUDIO_CHUNK_SIZE):
+    """
+    This method opens a 16 bit PCM WAV file, or a headerless S16LE file with
+    the given rate and channels, and returns a tuple of its rate, its number of
+    channels and a generator of chunks of whole frames of audio data.
+    """
+    with open(filename, 'rb') as f:
+        is_wav = f.read(12)[8:12] == b'WAVE'
+
+    if is_wav:
+        reader = wave.open(filename, 'rb')
+        try:
+            if reader.getsampwidth() != 2 or reader.getcomptype() != 'NONE':
+                raise ValueError('only 16 bit PCM WAV files are supported')
+            rate, channels = reader.getframerate(), reader.getnchannels()
+        finally:
+            reader.close()
+
+    frame_size = 2 * channels
+    chunk_size -= chunk_size % frame_size
+
+    def chunks():
+        if is_wav:
+            reader = wave.open(filename, 'rb')
+            try:
+                for chunk in iter(lambda: reader.readframes(chunk_size // frame_size), b''):
+                    yield chunk
+            finally:
+                reader.close()
+        else:
+            with open(filename, 'rb') as f:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    yield chunk
+
+    return rate, channels, chunks()
+
+
+def _to_samples(data):
+    """
+    This method converts S16LE audio data to an array of samples.
     """
-    return list(map(lambda custom_vocabulary: custom_vocabulary.to_dict()
-                    if isinstance(custom_vocabulary, CustomVocabulary)
-                    else custom_vocabulary, unprocessed_vocabularies))
+    samples = array('h')
+    if hasattr(samples, 'frombytes'):
+        samples.frombytes(data)
+    else:
+        samples.fromstring(data)
+    if sys.byteorder == 'big':
+        samples.byteswap()
+    return samples
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""Preprocessing of large custom vocabulary lists"""
+
+import io
+import unicodedata
+import six
+from .models import CustomVocabulary
+from . import jsonbackend
+
+# Limits enforced by default, matching those of the Rev.ai API
+MAX_PHRASES = 6000
+MAX_PHRASE_LENGTH = 255
+
+# Number of phrases encoded at a time by iter_json
+_JSON_BATCH_SIZE = 1000
+
+
+class VocabularyBuilder:
+    """Builds a custom vocabulary from phrases streamed from iterables or
+    files. Phrases are normalized, duplicates are dropped as they are added
+    and the limits of the API are checked before anything is submitted.
+
+    Example::
+
+        builder = VocabularyBuilder(ignore_case=True)
+        builder.add_file('catalog.txt')
+        client.submit_custom_vocabularies([builder])
+    """
+
+    def __init__(
+            self,
+            collapse_whitespace=True,
+            lowercase=False,
+            ignore_case=False,
+            max_phrases=MAX_PHRASES,
+            max_phrase_length=MAX_PHRASE_LENGTH):
+        """Constructor
+
+        :param collapse_whitespace (optional): whether to strip phrases and
+            replace runs of whitespace by a single space
+        :param lowercase (optional): whether to lowercase phrases
+        :param ignore_case (optional): whether phrases differing only by case
+            are duplicates. The first spelling is kept
+        :param max_phrases (optional): maximum number of distinct phrases.
+            Unlimited if None
+        :param max_phrase_length (optional): maximum number of characters of a
+            phrase. Unlimited if None
+        """
+        self.collapse_whitespace = collapse_whitespace
+        self.lowercase = lowercase
+        self.ignore_case = ignore_case
+        self.max_phrases = max_phrases
+        self.max_phrase_length = max_phrase_length
+        self.phrases = []
+        self.duplicates = 0
+        self._seen = set()
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def add(self, phrase):
+        """Normalizes and adds a phrase unless it is empty or a duplicate
+
+        :param phrase: string of the phrase, bytes being decoded as UTF-8
+        :returns: True if the phrase was added
+        :raises: ValueError if the phrase is too long or there are too many phrases
+        """
+        if isinstance(phrase, six.binary_type):
+            phrase = phrase.decode('utf-8')
+        phrase = unicodedata.normalize('NFC', six.text_type(phrase))
+        if self.collapse_whitespace:
+            phrase = ' '.join(phrase.split())
+        if self.lowercase:
+            phrase = phrase.lower()
+        if not phrase:
+            return False
+
+        key = phrase.lower() if self.ignore_case else phrase
+        if key in self._seen:
+            self.duplicates += 1
+            return False
+        if self.max_phrase_length is not None and len(phrase) > self.max_phrase_length:
+            raise ValueError('Phrase {!r}... is {} characters long, more than the maximum of {}'
+                             .format(phrase[:40], len(phrase), self.max_phrase_length))
+        if self.max_phrases is not None and len(self.phrases) >= self.max_phrases:
+            raise ValueError('Custom vocabulary has more than the maximum of {} distinct phrases'
+                             .format(self.max_phrases))
+        self._seen.add(key)
+        self.phrases.append(phrase)
+        return True
+
+    def update(self, phrases):
+        """Adds every phrase of an iterable, which is consumed lazily
+
+        :param phrases: iterable of strings
+        :returns: number of phrases added
+        """
+        add = self.add
+        return sum(1 for phrase in phrases if add(phrase))
+
+    def add_file(self, path, encoding='utf-8'):
+        """Adds the phrases of a text file with one phrase per line. The file
+        is read line by line, and blank lines are skipped.
+
+        :param path: path of the file
+        :param encoding (optional): encoding of the file
+        :returns: number of phrases added
+        :raises: ValueError naming the line of a phrase which breaks a limit
+        """
+        added = 0
+        with io.open(path, encoding=encoding) as f:
+            for number, line in enumerate(f, 1):
+                line = line.rstrip('\r\n')
+                if not line.strip():
+                    continue
+                try:
+                    added += self.add(line)
+                except ValueError as err:
+                    raise ValueError('{}, line {}: {}'.format(path, number, err))
+        return added
+
+    def to_dict(self):
+        """Returns the raw form of the custom vocabulary as the api expects it"""
+        return {'phrases': self.phrases}
+
+    def to_custom_vocabulary(self):
+        """Returns a CustomVocabulary of the phrases"""
+        return CustomVocabulary(self.phrases)
+
+    def iter_json(self):
+        """Yields the JSON bytes of the custom vocabulary, as the api expects
+        it, in chunks of a bounded number of phrases. Submissions encode
+        builders this way instead of through to_dict.
+        """
+        yield b'{"phrases":['
+        for start in range(0, len(self.phrases), _JSON_BATCH_SIZE):
+            batch = jsonbackend.dumps(self.phrases[start:start + _JSON_BATCH_SIZE])[1:-1]
+            yield (b',' if start else b'') + batch.encode('utf-8')
+        yield b']}'
+
+    def to_json(self):
+        """Returns the JSON bytes of the custom vocabulary, as the api expects it"""
+        return b''.join(self.iter_json())
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""Local registry of submitted custom vocabularies, keyed by their phrases"""
+
+import hashlib
+import json
+import threading
+import time
+from .singleflight import SingleFlight
+from . import deadline
+from . import utils
+
+
+class VocabularyRegistry:
+    """SQLite registry mapping a hash of a set of custom vocabularies to the
+    id of the custom vocabulary submitted for it, so that the same phrases
+    are only submitted and processed once. Phrases are compared after
+    trimming and collapsing whitespace, regardless of their order and of
+    duplicates. The database can be shared by threads and processes of one
+    host. Processed vocabularies are trusted until removed, so vocabularies
+    should be deleted through delete_custom_vocabulary or
+    delete_custom_vocabularies given the registry, or removed with remove.
+
+    Example::
+
+        registry = VocabularyRegistry(RevAiCustomVocabulariesClient(token), 'vocabularies.db')
+        client = RevAiAPIClient(token, vocabulary_registry=registry)
+        client.submit_job_url(url, custom_vocabulary_id=CustomVocabulary(phrases))
+    """
+
+    def __init__(self, client, path, poll_interval=1.0, timeout=600.0):
+        """Constructor
+
+        :param client: RevAiCustomVocabulariesClient used to submit
+            vocabularies and check their status
+        :param path: path of the SQLite database file, created if needed
+        :param poll_interval (optional): seconds between status checks while
+            a vocabulary is processed
+        :param timeout (optional): seconds to wait for a vocabulary to be
+            processed. Waits indefinitely if None
+        """
+        if not path:
+            raise ValueError('path must be provided')
+
+        self.client = client
+        self.path = path
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.single_flight = SingleFlight()
+        self._local = threading.local()
+        # Ids of vocabularies known to be complete, by key
+        self._complete = {}
+        self._connection().execute(
+            'CREATE TABLE IF NOT EXISTS vocabularies ('
+            'key TEXT PRIMARY KEY, vocabulary_id TEXT NOT NULL, status TEXT NOT NULL, '
+            'created_at REAL NOT NULL)')
+
+    def make_key(self, custom_vocabularies):
+        """Returns the key of a set of custom vocabularies, a SHA-256 of their
+        canonical form
+
+        :param custom_vocabularies: CustomVocabulary or VocabularyBuilder, or
+            list of them or of dictionaries with a 'phrases' key
+        """
+        canonical = sorted(sorted(set(' '.join(phrase.split()) for phrase in phrases))
+                           for phrases in _phrase_lists(custom_vocabularies))
+        return hashlib.sha256(json.dumps(canonical, ensure_ascii=False, separators=(',', ':'))
+                              .encode('utf-8')).hexdigest()
+
+    def resolve(self, custom_vocabularies, metadata=None):
+        """Returns the id of a processed custom vocabulary with these phrases,
+        submitting them and waiting for them to be processed if they were
+        never submitted
+
+        :param custom_vocabularies: CustomVocabulary or VocabularyBuilder, or
+            list of them or of dictionaries with a 'phrases' key
+        :param metadata (optional): metadata of the vocabulary if it is submitted
+        :returns: id of the custom vocabulary
+        :raises: RuntimeError if processing the vocabulary failed or timed out
+        :raises: DeadlineExceeded if the current Deadline passed
+        :raises: HTTPError
+        """
+        if hasattr(custom_vocabularies, 'to_dict'):
+            custom_vocabularies = [custom_vocabularies]
+        if not custom_vocabularies:
+            raise ValueError('custom_vocabularies must be provided')
+
+        key = self.make_key(custom_vocabularies)
+        vocabulary_id = self._complete.get(key)
+        if vocabulary_id is not None:
+            return vocabulary_id
+        return self.single_flight.do(
+            key, lambda: self._resolve(key, custom_vocabularies, metadata))
+
+    def get(self, custom_vocabularies):
+        """Returns the id registered for these phrases, processed or not, or None"""
+        row = self._connection().execute(
+            'SELECT vocabulary_id FROM vocabularies WHERE key = ?',
+            (self.make_key(custom_vocabularies),)).fetchone()
+        return row[0] if row else None
+
+    def remove(self, vocabulary_id):
+        """Removes the entries of a vocabulary, for example after deleting it"""
+        self._connection().execute(
+            'DELETE FROM vocabularies WHERE vocabulary_id = ?', (vocabulary_id,))
+        for key, known_id in list(self._complete.items()):
+            if known_id == vocabulary_id:
+                self._complete.pop(key, None)
+
+    def _resolve(self, key, custom_vocabularies, metadata):
+        from requests.exceptions import HTTPError
+
+        row = self._connection().execute(
+            'SELECT vocabulary_id, status FROM vocabularies WHERE key = ?', (key,)).fetchone()
+        if row is not None:
+            vocabulary_id, status = row
+            if status == 'complete':
+                self._complete[key] = vocabulary_id
+                return vocabulary_id
+            try:
+                return self._wait(key, vocabulary_id)
+            except HTTPError as err:
+                if not utils._is_not_found(err):
+                    raise
+            # The vocabulary was deleted on the server, so it is submitted again
+            self.remove(vocabulary_id)
+
+        information = self.client.submit_custom_vocabularies(
+            custom_vocabularies, metadata=metadata)
+        self._connection().execute(
+            'INSERT OR REPLACE INTO vocabularies (key, vocabulary_id, status, created_at) '
+            'VALUES (?, ?, ?, ?)', (key, information['id'], information['status'], time.time()))
+        if information['status'] == 'complete':
+            self._complete[key] = information['id']
+            return information['id']
+        return self._wait(key, information['id'])
+
+    def _wait(self, key, vocabulary_id):
+        expires_at = None if self.timeout is None else time.time() + self.timeout
+        while True:
+            information = self.client.get_custom_vocabularies_information(vocabulary_id)
+            status = information['status']
+            if status == 'complete':
+                self._connection().execute(
+                    'UPDATE vocabularies SET status = ? WHERE key = ?', (status, key))
+                self._complete[key] = vocabulary_id
+                return vocabulary_id
+            if status == 'failed':
+                self.remove(vocabulary_id)
+                raise RuntimeError('Custom vocabulary {} failed: {}'.format(
+                    vocabulary_id, information.get('failure')))
+            if expires_at is not None and time.time() + self.poll_interval > expires_at:
+                raise RuntimeError('Custom vocabulary {} still in progress after {} seconds'
+                                   .format(vocabulary_id, self.timeout))
+            budget = deadline.remaining()
+            time.sleep(self.poll_interval if budget is None
+                       else min(self.poll_interval, budget))
+            deadline.check()
+
+    def _connection(self):
+        return utils._thread_connection(self._local, self.path)
+
+
+def _phrase_lists(custom_vocabularies):
+    if hasattr(custom_vocabularies, 'to_dict'):
+        custom_vocabularies = [custom_vocabularies]
+    for custom_vocabulary in utils._process_vocabularies(custom_vocabularies):
+        yield custom_vocabulary['phrases']
+
+
+def _resolve_vocabulary_id(registry, custom_vocabulary_id):
+    """Returns custom_vocabulary_id, resolved through the registry when it is
+    a CustomVocabulary or a list of them rather than an id
+    """
+    if not isinstance(custom_vocabulary_id, (list, tuple)) and \
+            not hasattr(custom_vocabulary_id, 'to_dict'):
+        return custom_vocabulary_id
+    if registry is None:
+        raise ValueError('A vocabulary_registry is required to pass a CustomVocabulary '
+                         'as custom_vocabulary_id')
+    return registry.resolve(custom_vocabulary_id)
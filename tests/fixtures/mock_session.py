@@ -22,11 +22,12 @@ def make_mock_response(mocker):
         response.reason = 'Testing'
         response.url = url
         if text:
-            type(response).text = mocker.PropertyMock(return_value=text)
-            type(response).content = mocker.PropertyMock(return_value=text)
+            mocker.patch.object(requests.Response, 'text', new_callable=mocker.PropertyMock,
+                                return_value=text)
+            mocker.patch.object(requests.Response, 'content', new_callable=mocker.PropertyMock,
+                                return_value=text)
         if json_data:
             response.json = mocker.Mock(return_value=json_data)
-            type(response).content = mocker.PropertyMock(
-                return_value=str(json_data).encode('utf-8'))
+            response._content = json.dumps(json_data).encode('utf-8')
         return response
     return _mock_response
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the account monitor"""
+
+import wave
+import pytest
+from requests.exceptions import HTTPError
+from src.rev_ai import accountmonitor
+from src.rev_ai.accountmonitor import AccountMonitor, InsufficientBalance, probe_duration
+from src.rev_ai.apiclient import RevAiAPIClient
+from src.rev_ai.models.asynchronous import Account, Job, JobStatus
+
+CREATED_ON = '2018-05-05T23:23:22.29Z'
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [1000.0]
+    mocker.patch.object(accountmonitor, '_clock', side_effect=lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def client(mocker):
+    client = mocker.Mock()
+    client.get_account.return_value = Account('a@b.c', 100)
+    return client
+
+
+def write_wav(path, seconds, rate=8000):
+    writer = wave.open(path, 'wb')
+    writer.setnchannels(1)
+    writer.setsampwidth(2)
+    writer.setframerate(rate)
+    writer.writeframes(b'\0\0' * int(seconds * rate))
+    writer.close()
+
+
+class TestAccountMonitor():
+    def test_account_is_cached_for_ttl(self, client, clock):
+        monitor = AccountMonitor(client, ttl=60)
+
+        assert monitor.account() == Account('a@b.c', 100)
+        clock[0] += 59
+        monitor.account()
+        assert client.get_account.call_count == 1
+        clock[0] += 2
+        monitor.account()
+        assert client.get_account.call_count == 2
+
+    def test_charges_reduce_available_seconds(self, client, clock):
+        monitor = AccountMonitor(client, reserve_seconds=10)
+        monitor.charge('1', 30)
+        monitor.charge('2', None)
+
+        assert monitor.available_seconds() == 60
+        monitor.update(Job('2', CREATED_ON, JobStatus.IN_PROGRESS, duration_seconds=20))
+        assert monitor.ledger() == {'1': 30, '2': 20}
+        monitor.update(Job('1', CREATED_ON, JobStatus.FAILED))
+        assert monitor.available_seconds() == 70
+
+    def test_reconcile_drops_jobs_finished_before_fetch(self, client, clock):
+        monitor = AccountMonitor(client)
+        monitor.charge('1', 30)
+        monitor.charge('2', 20)
+        monitor.update(Job('1', CREATED_ON, JobStatus.TRANSCRIBED))
+        clock[0] += 1
+        client.get_account.return_value = Account('a@b.c', 70)
+
+        monitor.reconcile()
+
+        assert monitor.ledger() == {'2': 20}
+        assert monitor.available_seconds() == 50
+
+    def test_reconcile_refreshes_outstanding_jobs(self, client, clock, mocker):
+        monitor = AccountMonitor(client)
+        monitor.charge('1', 30)
+        monitor.charge('2', 20)
+        monitor.charge('gone', 10)
+        jobs = {'1': Job('1', CREATED_ON, JobStatus.TRANSCRIBED, duration_seconds=31),
+                '2': Job('2', CREATED_ON, JobStatus.IN_PROGRESS)}
+
+        def get_job_details(job_id):
+            if job_id not in jobs:
+                raise HTTPError(response=mocker.Mock(status_code=404))
+            return jobs[job_id]
+        client.get_job_details.side_effect = get_job_details
+        client.get_account.return_value = Account('a@b.c', 69)
+
+        monitor.reconcile()
+
+        assert monitor.ledger() == {'2': 20}
+        assert monitor.available_seconds() == 49
+
+    def test_admit_reserves_until_commit_or_release(self, client, clock):
+        monitor = AccountMonitor(client)
+        first = monitor.admit(60)
+
+        with pytest.raises(InsufficientBalance, match='50 seconds of audio exceed the 40'):
+            monitor.admit(50)
+        second = monitor.admit(40)
+        monitor.release(first)
+        monitor.commit(second, '2', 35)
+
+        assert monitor.ledger() == {'2': 35}
+        assert monitor.available_seconds() == 65
+
+    def test_partial_release(self, client, clock):
+        monitor = AccountMonitor(client)
+        reservation = monitor.admit(60)
+        monitor.release(reservation, 45)
+
+        assert monitor.outstanding_seconds() == 15
+        monitor.commit(reservation, '1')
+        assert monitor.ledger() == {'1': 15}
+
+    def test_admit_refetches_once_before_refusing(self, client, clock):
+        monitor = AccountMonitor(client)
+        monitor.account()
+        client.get_account.return_value = Account('a@b.c', 200)
+
+        monitor.release(monitor.admit(150))
+        assert client.get_account.call_count == 2
+
+        with pytest.raises(InsufficientBalance, match='250 seconds of audio exceed the 200'):
+            monitor.admit(250)
+        assert client.get_account.call_count == 3
+
+    def test_admit_refuses_unknown_duration_without_balance(self, client, clock):
+        client.get_account.return_value = Account('a@b.c', 0)
+
+        with pytest.raises(InsufficientBalance):
+            AccountMonitor(client).admit(0)
+
+
+def test_probe_duration(tmpdir):
+    path = str(tmpdir.join('audio.wav'))
+    write_wav(path, 1.5)
+
+    assert probe_duration(path) == 1.5
+    assert probe_duration(str(tmpdir.join('missing.mp3'))) is None
+
+
+def test_client_charges_local_files(tmpdir, mock_session, make_mock_response, mocker):
+    path = str(tmpdir.join('audio.wav'))
+    write_wav(path, 40)
+    mocker.patch.object(RevAiAPIClient, 'get_account', return_value=Account('a@b.c', 60))
+    mock_session.request.return_value = make_mock_response(json_data={
+        'id': '1', 'status': 'in_progress', 'created_on': CREATED_ON})
+    client = RevAiAPIClient('token', account_monitor=AccountMonitor())
+
+    client.submit_job_local_file(path)
+
+    assert client.account_monitor.client is client
+    assert client.account_monitor.ledger() == {'1': 40}
+    with pytest.raises(InsufficientBalance):
+        client.submit_job_local_file(path)
+    # The refused submission only refreshed the status of the outstanding job
+    assert [c[0][0] for c in mock_session.request.call_args_list] == ['POST', 'GET']
+
+
+def test_client_releases_reservation_of_failed_upload(tmpdir, mock_session, make_mock_response,
+                                                      mocker):
+    path = str(tmpdir.join('audio.wav'))
+    write_wav(path, 40)
+    mocker.patch.object(RevAiAPIClient, 'get_account', return_value=Account('a@b.c', 60))
+    mock_session.request.return_value = make_mock_response(status=500, json_data={})
+    client = RevAiAPIClient('token', account_monitor=AccountMonitor())
+
+    with pytest.raises(HTTPError):
+        client.submit_job_local_file(path)
+
+    assert client.account_monitor.outstanding_seconds() == 0
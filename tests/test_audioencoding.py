@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for audio encoding"""
+
+import io
+import math
+import struct
+import wave
+import pytest
+from src.rev_ai.audioencoding import FlacEncoder, MulawEncoder, encode_file, _crc16
+from src.rev_ai.models.streaming import MediaConfig
+from src.rev_ai.streamingclient import RevAiStreamingClient
+
+
+def make_pcm(frames, channels=1):
+    samples = []
+    for i in range(frames):
+        samples.extend([int(8000 * math.sin(i * 0.05))] * channels)
+    return struct.pack('<{}h'.format(len(samples)), *samples)
+
+
+class TestMulawEncoder():
+    @pytest.mark.parametrize('sample, expected', [
+        (0, 0xFF), (-1, 0x7E), (32767, 0x80), (-32768, 0x00), (1000, 0xCE), (-1000, 0x4E)])
+    def test_encode_known_values(self, sample, expected):
+        encoder = MulawEncoder()
+
+        data = encoder.encode(struct.pack('<h', sample))
+
+        assert data[len(encoder.header()):] == bytearray([expected])
+
+    def test_encode_stream_halves_size(self):
+        pcm = make_pcm(1000)
+        encoder = MulawEncoder(8000)
+
+        data = b''.join(encoder.encode_stream(iter([pcm[:333], pcm[333:]])))
+
+        header = encoder.header()
+        assert data.startswith(header)
+        assert len(data) - len(header) == len(pcm) // 2
+
+    def test_media_config(self):
+        assert MulawEncoder().media_config().get_content_type_string() == 'audio/x-wav'
+
+
+class TestFlacEncoder():
+    def test_header(self):
+        encoder = FlacEncoder(16000, 2, block_size=1024)
+
+        header = encoder.header(48000)
+
+        assert header[:4] == b'fLaC'
+        assert len(header) == 42
+        assert struct.unpack('>HH', header[8:12]) == (1024, 1024)
+        info = int.from_bytes(header[18:26], 'big')
+        assert info >> 44 == 16000
+        assert (info >> 41) & 0x7 == 1
+        assert (info >> 36) & 0x1F == 15
+        assert info & 0xFFFFFFFFF == 48000
+
+    def test_output_does_not_depend_on_chunking(self):
+        pcm = make_pcm(5000, channels=2)
+        whole = b''.join(FlacEncoder(channels=2, block_size=1024).encode_stream(iter([pcm])))
+
+        chunks = [pcm[i:i + 777] for i in range(0, len(pcm), 777)]
+        chunked = b''.join(FlacEncoder(channels=2, block_size=1024).encode_stream(iter(chunks)))
+
+        assert whole == chunked
+
+    def test_frames_are_valid(self):
+        encoder = FlacEncoder(block_size=1024)
+        pcm = make_pcm(1024)
+
+        frame = encoder.encode(pcm)[42:]
+
+        assert frame[:2] == b'\xff\xf8'
+        assert struct.unpack('>H', frame[-2:])[0] == _crc16(frame[:-2])
+        assert len(frame) < len(pcm) // 2
+
+    def test_silence_uses_constant_subframes(self):
+        encoder = FlacEncoder(block_size=4096)
+
+        frame = encoder.encode(b'\0' * 8192)[42:]
+
+        # 8 byte frame header, 1 byte subframe header, 2 byte constant value, crc
+        assert len(frame) == 8 + 3 + 2
+
+    def test_invalid_block_size(self):
+        with pytest.raises(ValueError):
+            FlacEncoder(block_size=8)
+
+
+def test_encode_wav_file_rewrites_header(tmpdir):
+    filename = str(tmpdir.join('audio.wav'))
+    writer = wave.open(filename, 'wb')
+    writer.setnchannels(2)
+    writer.setsampwidth(2)
+    writer.setframerate(8000)
+    writer.writeframes(make_pcm(3000, channels=2))
+    writer.close()
+    encoder = FlacEncoder()
+    output = io.BytesIO()
+
+    encode_file(encoder, filename, output)
+
+    assert (encoder.rate, encoder.channels, encoder.frames_encoded) == (8000, 2, 3000)
+    assert output.getvalue()[:42] == encoder.header(3000)
+
+
+def test_encode_file_to_unseekable_stream(tmpdir):
+    filename = str(tmpdir.join('audio.raw'))
+    with open(filename, 'wb') as f:
+        f.write(make_pcm(3000))
+
+    class Stream:
+        def __init__(self):
+            self.data = io.BytesIO()
+
+        def write(self, data):
+            self.data.write(data)
+
+        def tell(self):
+            raise IOError('Illegal seek')
+    output = Stream()
+    encoder = FlacEncoder(rate=8000, channels=1)
+
+    encode_file(encoder, filename, output)
+
+    assert encoder.frames_encoded == 3000
+    assert output.data.getvalue()[:42] == encoder.header(0)
+
+
+def test_streaming_client_with_encoder():
+    config = MediaConfig('audio/x-raw', 'interleaved', 8000, 'S16LE', 1)
+
+    client = RevAiStreamingClient('token', config, encoder=MulawEncoder())
+
+    assert client.config.get_content_type_string() == 'audio/x-wav'
+    assert client.encoder.rate == 8000
+
+
+@pytest.mark.parametrize('config', [
+    MediaConfig('audio/x-wav'),
+    MediaConfig('audio/x-flac', rate=8000, channels=1),
+    MediaConfig('audio/x-raw', 'interleaved', 8000, 'F32LE', 1),
+    MediaConfig('audio/x-raw', 'interleaved', None, 'S16LE', 1),
+    MediaConfig('audio/x-raw', 'interleaved', 8000, 'S16LE'),
+])
+def test_streaming_client_encoder_requires_raw_s16le(config):
+    with pytest.raises(ValueError, match='raw S16LE'):
+        RevAiStreamingClient('token', config, encoder=MulawEncoder())
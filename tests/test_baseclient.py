@@ -43,7 +43,7 @@ class TestBaseClient:
             HTTPError,
             match="(?=.*{})(?=.*{})".format(
                 status,
-                re.escape(json.dumps(error).replace('\"', '\'')))
+                re.escape(json.dumps(error)))
         ):
             client._make_http_request(method, URL)
         mock_session.request.assert_called_once_with(
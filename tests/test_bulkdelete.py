@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for bulk deletion"""
+
+from datetime import datetime, timedelta
+import requests
+from requests.exceptions import HTTPError
+from src.rev_ai.bulkdelete import delete_jobs, RetentionSweeper
+from src.rev_ai.models.asynchronous import Job, JobStatus
+from src.rev_ai.ratelimit import TokenBucket
+
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return HTTPError('{} Error'.format(status_code), response=response)
+
+
+def make_job(id_, created_on, status=JobStatus.TRANSCRIBED, metadata=None):
+    return Job(id_, created_on.strftime('%Y-%m-%dT%H:%M:%S.%fZ'), status, metadata=metadata)
+
+
+def test_delete_jobs(mocker):
+    client = mocker.Mock()
+    errors = {'2': http_error(404), '3': http_error(409)}
+
+    def delete_job(id_):
+        if id_ in errors:
+            raise errors[id_]
+    client.delete_job.side_effect = delete_job
+
+    report = delete_jobs(client, (str(i) for i in range(1, 21)), max_workers=3)
+
+    assert sorted(report.deleted, key=int) == ['1'] + [str(i) for i in range(4, 21)]
+    assert report.already_deleted == ['2']
+    assert report.failed == {'3': errors['3']}
+    assert client.delete_job.call_count == 20
+    assert report.deletes_per_second > 0
+
+
+def test_delete_jobs_checkpoint(tmpdir, mocker):
+    checkpoint = str(tmpdir.join('checkpoint'))
+    client = mocker.Mock()
+    client.delete_job.side_effect = [None, http_error(500)]
+    first = delete_jobs(client, ['1', '2'], max_workers=1, checkpoint=checkpoint)
+    client.delete_job.side_effect = None
+
+    second = delete_jobs(client, ['1', '2', '3'], max_workers=1, checkpoint=checkpoint)
+
+    assert first.deleted == ['1'] and list(first.failed) == ['2']
+    assert second.deleted == ['2', '3']
+    assert second.already_deleted == ['1']
+    with open(checkpoint) as f:
+        assert f.read().split() == ['1', '2', '3']
+
+
+def test_delete_jobs_rate_limit(mocker):
+    client = mocker.Mock()
+    bucket = mocker.Mock(spec=TokenBucket)
+
+    delete_jobs(client, ['1', '2'], rate=bucket)
+
+    assert bucket.acquire.call_count == 2
+
+
+def test_retention_sweeper(mocker):
+    now = datetime.utcnow()
+    jobs = [make_job('1', now - timedelta(days=31), metadata='tenant=a;user=1'),
+            make_job('2', now - timedelta(days=32), metadata='tenant=b'),
+            make_job('3', now - timedelta(days=40))]
+    client = mocker.Mock()
+    client.iter_jobs.return_value = iter(jobs)
+
+    report = RetentionSweeper(client, max_age=timedelta(days=30),
+                              metadata_contains='tenant=a').sweep()
+
+    assert report.deleted == ['1']
+    client.delete_job.assert_called_once_with('1')
+    kwargs = client.iter_jobs.call_args[1]
+    assert kwargs['statuses'] == (JobStatus.TRANSCRIBED, JobStatus.FAILED)
+    assert abs(kwargs['created_before'] - (now - timedelta(days=30))) < timedelta(minutes=1)
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for custom vocabulary iteration and bulk management"""
+
+import requests
+from requests.exceptions import HTTPError
+from src.rev_ai.bulkvocabularies import delete_custom_vocabularies, \
+    refresh_custom_vocabularies
+from src.rev_ai.custom_vocabularies_client import RevAiCustomVocabulariesClient
+from src.rev_ai.models import CustomVocabularyInformation, CustomVocabularyStatus
+
+CREATED_ON = '2021-06-01T00:00:00.000Z'
+
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return HTTPError('{} Error'.format(status_code), response=response)
+
+
+def vocabulary_json(id_, status='complete'):
+    return {'id': id_, 'status': status, 'created_on': CREATED_ON}
+
+
+def test_iter_custom_vocabularies(mocker):
+    client = RevAiCustomVocabulariesClient('token')
+    pages = {None: [vocabulary_json('1'), vocabulary_json('2', 'failed')],
+             '2': [vocabulary_json('3', 'in_progress'), vocabulary_json('4')],
+             '4': [vocabulary_json('5')]}
+    mocker.patch.object(client, 'get_list_of_custom_vocabularies',
+                        side_effect=lambda limit, starting_after: pages[starting_after])
+
+    vocabularies = list(client.iter_custom_vocabularies(
+        page_size=2, statuses=[CustomVocabularyStatus.COMPLETE]))
+
+    assert [v.id for v in vocabularies] == ['1', '4', '5']
+    assert vocabularies[0] == CustomVocabularyInformation(
+        '1', CustomVocabularyStatus.COMPLETE, CREATED_ON)
+
+
+def test_iter_custom_vocabularies_stops_when_cursor_is_ignored(mocker):
+    client = RevAiCustomVocabulariesClient('token')
+    mocker.patch.object(client, 'get_list_of_custom_vocabularies',
+                        return_value=[vocabulary_json('1'), vocabulary_json('2')])
+
+    assert [v.id for v in client.iter_custom_vocabularies(page_size=2)] == ['1', '2']
+
+
+def test_delete_custom_vocabularies(mocker):
+    client = mocker.Mock()
+    errors = {'2': http_error(404), '3': http_error(500)}
+
+    def delete(id_):
+        if id_ in errors:
+            raise errors[id_]
+    client.delete_custom_vocabulary.side_effect = delete
+    vocabularies = [CustomVocabularyInformation(str(i), CustomVocabularyStatus.COMPLETE)
+                    for i in range(1, 11)]
+
+    report = delete_custom_vocabularies(client, iter(vocabularies), max_workers=3, rate=1000)
+
+    assert sorted(report.deleted, key=int) == ['1'] + [str(i) for i in range(4, 11)]
+    assert report.already_deleted == ['2']
+    assert report.failed == {'3': errors['3']}
+
+
+def test_delete_custom_vocabularies_removes_them_from_the_registry(mocker):
+    client = RevAiCustomVocabulariesClient('token')
+    mocker.patch.object(client, '_make_http_request', side_effect=[None, http_error(404)])
+    registry = mocker.Mock()
+
+    report = delete_custom_vocabularies(client, ['1', '2'], max_workers=1,
+                                        vocabulary_registry=registry)
+
+    assert report.deleted == ['1']
+    assert report.already_deleted == ['2']
+    assert [c[0][0] for c in registry.remove.call_args_list] == ['1', '2']
+
+
+def test_refresh_custom_vocabularies(mocker):
+    client = mocker.Mock()
+
+    def details(id_):
+        if id_ == 'gone':
+            raise http_error(404)
+        return CustomVocabularyInformation(id_, CustomVocabularyStatus.COMPLETE)
+    client.get_custom_vocabulary_details.side_effect = details
+
+    vocabularies = refresh_custom_vocabularies(client, ['1', 'gone', '2'], max_workers=2)
+
+    assert vocabularies == {
+        '1': CustomVocabularyInformation('1', CustomVocabularyStatus.COMPLETE),
+        '2': CustomVocabularyInformation('2', CustomVocabularyStatus.COMPLETE)}
+
+
+def test_get_custom_vocabulary_details(mock_session, make_mock_response):
+    mock_session.request.return_value = make_mock_response(
+        json_data=dict(vocabulary_json('1', 'failed'), failure='internal_processing'))
+
+    vocabulary = RevAiCustomVocabulariesClient('token').get_custom_vocabulary_details('1')
+
+    assert vocabulary == CustomVocabularyInformation(
+        '1', CustomVocabularyStatus.FAILED, CREATED_ON, failure='internal_processing')
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the transcript cache"""
+
+import json
+import os
+import pytest
+from src.rev_ai.apiclient import RevAiAPIClient
+from src.rev_ai.cache import TranscriptCache
+from src.rev_ai.models import CaptionType
+from src.rev_ai.models.asynchronous import Transcript
+
+try:
+    from urllib.parse import urljoin
+except ImportError:
+    from urlparse import urljoin
+
+JOB_ID = '1'
+TOKEN = 'token'
+TRANSCRIPT_URL = urljoin(RevAiAPIClient.base_url, 'jobs/{}/transcript'.format(JOB_ID))
+TRANSCRIPT = {'monologues': [{'speaker': 1, 'elements': [
+    {'type': 'text', 'value': 'Hello', 'ts': 0.75, 'end_ts': 1.25, 'confidence': 0.85}]}]}
+
+
+@pytest.fixture
+def make_response(mocker):
+    return lambda content: mocker.Mock(content=content)
+
+
+class TestTranscriptCache():
+    def test_lru_eviction_by_size(self):
+        cache = TranscriptCache(max_bytes=10)
+        cache.put('1', 'text/plain', b'abcd')
+        cache.put('2', 'text/plain', b'efgh')
+        cache.get('1', 'text/plain')
+        cache.put('3', 'text/plain', b'ijkl')
+
+        assert cache.get('2', 'text/plain') is None
+        assert cache.get('1', 'text/plain') == b'abcd'
+        assert cache.get('3', 'text/plain') == b'ijkl'
+        assert cache.stats() == {'hits': 3, 'disk_hits': 0, 'misses': 1, 'hit_ratio': 0.75,
+                                 'evictions': 1, 'entries': 2, 'bytes': 8}
+
+    def test_oversized_payload_is_not_kept(self):
+        cache = TranscriptCache(max_bytes=2)
+        cache.put('1', 'text/plain', b'abc')
+
+        assert cache.get('1', 'text/plain') is None
+
+    def test_keys_include_accept_and_channel(self):
+        cache = TranscriptCache()
+        cache.put('1', 'text/vtt', b'channel 1', channel_id=1)
+
+        assert cache.get('1', 'text/vtt') is None
+        assert cache.get('1', 'application/x-subrip', 1) is None
+        assert cache.get('1', 'text/vtt', 1) == b'channel 1'
+
+    def test_disk_tier(self, tmpdir):
+        directory = str(tmpdir.join('cache'))
+        TranscriptCache(directory=directory).put('1', 'text/plain', b'text')
+        cache = TranscriptCache(directory=directory)
+
+        assert cache.get('1', 'text/plain') == b'text'
+        assert cache.get('1', 'text/plain') == b'text'
+        assert cache.stats()['disk_hits'] == 1
+
+        cache.invalidate('1')
+
+        assert cache.get('1', 'text/plain') is None
+        assert os.listdir(directory) == []
+
+
+class TestClientCache():
+    def test_transcript_is_downloaded_once(self, mock_session, make_response):
+        mock_session.request.return_value = make_response(json.dumps(TRANSCRIPT).encode('utf-8'))
+        client = RevAiAPIClient(TOKEN, cache=TranscriptCache())
+
+        assert client.get_transcript_json(JOB_ID) == TRANSCRIPT
+        assert client.get_transcript_object(JOB_ID) == Transcript.from_json(TRANSCRIPT)
+        mock_session.request.assert_called_once_with(
+            'GET', TRANSCRIPT_URL,
+            headers=dict(client.default_headers, Accept=RevAiAPIClient.rev_json_content_type))
+
+    def test_captions_are_cached_per_channel(self, mock_session, make_response):
+        mock_session.request.side_effect = lambda *args, **kwargs: make_response(b'1\n')
+        client = RevAiAPIClient(TOKEN, cache=TranscriptCache())
+
+        for _ in range(2):
+            assert client.get_captions(JOB_ID, CaptionType.VTT, channel_id=1) == '1\n'
+            client.get_captions(JOB_ID, CaptionType.VTT)
+            client.get_transcript_text(JOB_ID)
+
+        assert mock_session.request.call_count == 3
+
+    def test_delete_job_invalidates(self, mock_session, make_response):
+        mock_session.request.side_effect = lambda *args, **kwargs: make_response(b'text')
+        client = RevAiAPIClient(TOKEN, cache=TranscriptCache())
+        client.get_transcript_text(JOB_ID)
+
+        client.delete_job(JOB_ID)
+        client.get_transcript_text(JOB_ID)
+
+        assert mock_session.request.call_count == 3
+        assert client.cache.stats()['misses'] == 2
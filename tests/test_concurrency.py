@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for adaptive concurrency limiting"""
+
+import threading
+import pytest
+import requests
+from requests.exceptions import HTTPError
+from src.rev_ai import concurrency
+from src.rev_ai.bulkdelete import delete_jobs
+from src.rev_ai.concurrency import AdaptiveConcurrencyLimiter
+
+
+def http_error(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return HTTPError('{} Error'.format(status_code), response=response)
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [0.0]
+    mocker.patch.object(concurrency, '_clock', lambda: now[0])
+    return now
+
+
+def complete(limiter, clock, latency=0.1, error=None):
+    token = limiter.acquire()
+    clock[0] += latency
+    limiter.release(token, error)
+
+
+class TestAdaptiveConcurrencyLimiter():
+    def test_healthy_requests_increase_the_limit(self, clock):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=4)
+
+        for _ in range(20):
+            complete(limiter, clock)
+
+        assert limiter.limit == 4
+        assert [entry[1:] for entry in limiter.history] == \
+            [(2, 'initial'), (3, 'healthy'), (4, 'healthy')]
+
+    @pytest.mark.parametrize('error, decreases', [
+        (http_error(429), True),
+        (http_error(503), True),
+        (requests.exceptions.ConnectionError(), True),
+        (http_error(404), False),
+    ])
+    def test_errors(self, clock, error, decreases):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+
+        complete(limiter, clock, error=error)
+
+        assert limiter.limit == (4 if decreases else 8)
+
+    def test_requests_started_before_a_decrease_do_not_decrease_again(self, clock):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8)
+        tokens = [limiter.acquire() for _ in range(3)]
+        clock[0] += 1
+
+        for token in tokens:
+            limiter.release(token, http_error(429))
+
+        assert limiter.limit == 4
+        complete(limiter, clock, error=http_error(429))
+        assert limiter.limit == 2
+
+    def test_latency_spike_decreases_the_limit(self, clock):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=8, max_limit=8)
+        for _ in range(10):
+            complete(limiter, clock, latency=0.1)
+
+        complete(limiter, clock, latency=1.0)
+
+        assert limiter.limit == 4
+        assert limiter.history[-1][2] == 'latency'
+
+    def test_limit_bounds_concurrency(self):
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=2, max_limit=2)
+        lock = threading.Lock()
+        active = []
+        peak = [0]
+
+        def work():
+            with lock:
+                active.append(1)
+                peak[0] = max(peak[0], len(active))
+            threading.Event().wait(0.02)
+            with lock:
+                active.pop()
+
+        threads = [threading.Thread(target=limiter.call, args=(work,)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert peak[0] == 2
+        assert limiter.in_flight == 0
+
+    def test_invalid_limits(self):
+        with pytest.raises(ValueError):
+            AdaptiveConcurrencyLimiter(initial_limit=10, max_limit=5)
+
+
+def test_delete_jobs_with_adaptive_concurrency(mocker):
+    client = mocker.Mock()
+    client.delete_job.side_effect = [http_error(429)] + [None] * 9
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=4)
+
+    report = delete_jobs(client, [str(i) for i in range(10)], concurrency=limiter)
+
+    assert len(report.deleted) == 9
+    assert len(report.failed) == 1
+    assert limiter.limit == 2
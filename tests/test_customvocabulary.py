@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 """Unit tests for custom vocabulary"""
+import json
 from src.rev_ai.custom_vocabularies_client import RevAiCustomVocabulariesClient
 from src.rev_ai.models import CustomVocabulary
 
@@ -38,6 +39,21 @@ class TestCustomVocabulary():
 
 
 class TestCustomVocabularyEndpoints():
+    def test_submit_custom_vocabularies_success(self, mock_session, make_mock_response):
+        data = {'id': CV_ID, 'status': 'in_progress'}
+        client = RevAiCustomVocabulariesClient(TOKEN)
+        mock_session.request.return_value = make_mock_response(url=client.base_url,
+                                                               json_data=data)
+
+        res = client.submit_custom_vocabularies([CustomVocabulary([u'café'])], metadata='test')
+
+        assert res == data
+        args, kwargs = mock_session.request.call_args
+        assert args == ("POST", client.base_url)
+        assert json.loads(kwargs['data'].decode('utf-8')) == {
+            'custom_vocabularies': [{'phrases': [u'café']}], 'metadata': 'test'}
+        assert kwargs['headers']['Content-Type'] == 'application/json'
+
     def test_get_custom_vocabularies_information_success(self, mock_session, make_mock_response):
         data = {
             'id': CV_ID,
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for request timeouts and deadlines"""
+
+import threading
+import pytest
+from requests.exceptions import ConnectTimeout, ReadTimeout
+from src.rev_ai import deadline
+from src.rev_ai.apiclient import RevAiAPIClient
+from src.rev_ai.bulkdelete import delete_jobs
+from src.rev_ai.deadline import Deadline, DeadlineExceeded, request_timeout
+
+TOKEN = 'token'
+URL = RevAiAPIClient.base_url + 'account'
+ACCOUNT = {'email': 'a@b.com', 'balance_seconds': 10}
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [0.0]
+    mocker.patch.object(deadline, '_clock', lambda: now[0])
+    return now
+
+
+def timeout_of(mock_session):
+    return mock_session.request.call_args[1].get('timeout')
+
+
+class TestClientTimeouts():
+    def test_no_timeout_by_default(self, mock_session, make_mock_response):
+        mock_session.request.return_value = make_mock_response(json_data=ACCOUNT)
+
+        RevAiAPIClient(TOKEN).get_account()
+
+        assert 'timeout' not in mock_session.request.call_args[1]
+
+    def test_client_timeout(self, mock_session, make_mock_response):
+        mock_session.request.return_value = make_mock_response(json_data=ACCOUNT)
+
+        RevAiAPIClient(TOKEN, timeout=(3.05, 30)).get_account()
+
+        assert timeout_of(mock_session) == (3.05, 30)
+
+    def test_override(self, mock_session, make_mock_response):
+        mock_session.request.return_value = make_mock_response(json_data=ACCOUNT)
+        client = RevAiAPIClient(TOKEN, timeout=(3.05, 30))
+
+        with request_timeout(120):
+            client.get_account()
+
+        assert timeout_of(mock_session) == 120
+
+    def test_timeouts_are_counted(self, mock_session):
+        client = RevAiAPIClient(TOKEN, timeout=1)
+        mock_session.request.side_effect = [ConnectTimeout(), ReadTimeout()]
+
+        with pytest.raises(ConnectTimeout):
+            client.get_account()
+        with pytest.raises(ReadTimeout):
+            client.get_account()
+
+        assert client.timeout_stats() == {'connect': 1, 'read': 1, 'deadline': 0}
+
+
+class TestDeadline():
+    def test_caps_request_timeouts(self, mock_session, make_mock_response, clock):
+        mock_session.request.return_value = make_mock_response(json_data=ACCOUNT)
+        client = RevAiAPIClient(TOKEN, timeout=(3, 30))
+
+        with Deadline(10):
+            clock[0] += 8
+            client.get_account()
+
+        assert timeout_of(mock_session) == (2, 2)
+
+    def test_earliest_nested_deadline_applies(self, clock):
+        with Deadline(10):
+            with Deadline(20):
+                assert deadline.remaining() == 10
+        assert deadline.remaining() is None
+
+    def test_no_request_after_the_deadline(self, mock_session, clock):
+        client = RevAiAPIClient(TOKEN)
+
+        with Deadline(5):
+            clock[0] += 5
+            with pytest.raises(DeadlineExceeded):
+                client.get_account()
+
+        mock_session.request.assert_not_called()
+        assert client.timeout_stats()['deadline'] == 1
+
+    def test_propagates_to_worker_threads(self, mocker, clock):
+        client = mocker.Mock()
+        client.delete_job.side_effect = lambda id_: deadline.check()
+
+        with Deadline(5):
+            clock[0] += 6
+            report = delete_jobs(client, ['1', '2'])
+
+        assert all(isinstance(error, DeadlineExceeded) for error in report.failed.values())
+        assert len(report.failed) == 2
+
+    def test_is_local_to_threads(self, clock):
+        remaining = []
+        with Deadline(5):
+            thread = threading.Thread(target=lambda: remaining.append(deadline.remaining()))
+            thread.start()
+            thread.join()
+
+        assert remaining == [None]
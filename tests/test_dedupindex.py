@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the job dedup index"""
+
+import threading
+import time
+import pytest
+from src.rev_ai.apiclient import RevAiAPIClient
+from src.rev_ai.dedupindex import JobDedupIndex
+from src.rev_ai.models.asynchronous import Job, JobStatus
+
+try:
+    from urllib.parse import urljoin
+except ImportError:
+    from urlparse import urljoin
+
+TOKEN = "token"
+CREATED_ON = '2018-05-05T23:23:22.29Z'
+JOBS_URL = urljoin(RevAiAPIClient.base_url, 'jobs')
+
+
+@pytest.fixture
+def index(tmpdir):
+    return JobDedupIndex(str(tmpdir.join('dedup.db')), poll_interval=0.01)
+
+
+@pytest.fixture
+def media(tmpdir):
+    filename = str(tmpdir.join('media.mp3'))
+    with open(filename, 'wb') as f:
+        f.write(b'media content')
+    return filename
+
+
+class TestJobDedupIndex():
+    def test_make_key_depends_on_content_and_options(self, index, media, tmpdir):
+        copy = str(tmpdir.join('copy.mp3'))
+        with open(copy, 'wb') as f:
+            f.write(b'media content')
+
+        key = index.make_key(media, {'language': 'en', 'metadata': 'a'})
+
+        assert key == index.make_key(copy, {'metadata': 'a', 'language': 'en'})
+        assert key != index.make_key(media, {'language': 'es', 'metadata': 'a'})
+
+    def test_acquire_claims_then_returns_recorded_job(self, index):
+        assert index.acquire('key') is None
+
+        index.record('key', 'job1')
+
+        assert index.acquire('key') == 'job1'
+
+    def test_released_claim_can_be_acquired(self, index):
+        index.acquire('key')
+
+        index.release('key')
+
+        assert index.acquire('key') is None
+
+    def test_stale_claim_is_taken_over(self, index):
+        index.claim_timeout = 0
+        index.acquire('key')
+
+        assert index.acquire('key') is None
+
+    def test_entry_expires_after_delete_after_seconds(self, index, mocker):
+        index.acquire('key')
+        index.record('key', 'job1', delete_after_seconds=60)
+        mocker.patch('time.time', return_value=time.time() + 61)
+
+        assert index.purge_expired() == 1
+        assert index.acquire('key') is None
+
+    def test_remove_job(self, index):
+        index.acquire('key')
+        index.record('key', 'job1')
+
+        index.remove_job('job1')
+
+        assert index.acquire('key') is None
+
+    def test_concurrent_acquire_waits_for_claim(self, index):
+        assert index.acquire('key') is None
+        results = []
+        waiter = threading.Thread(target=lambda: results.append(index.acquire('key')))
+        waiter.start()
+        time.sleep(0.05)
+
+        assert results == []
+        index.record('key', 'job1')
+        waiter.join(1)
+        assert results == ['job1']
+
+
+@pytest.mark.usefixtures('mock_session', 'make_mock_response')
+class TestDeduplicatedSubmission():
+    def test_duplicate_is_not_uploaded(self, index, media, mock_session, make_mock_response):
+        submitted = make_mock_response(url=JOBS_URL, json_data={
+            'id': '1', 'status': 'in_progress', 'created_on': CREATED_ON})
+        details = make_mock_response(url=JOBS_URL, json_data={
+            'id': '1', 'status': 'transcribed', 'created_on': CREATED_ON})
+        mock_session.request.side_effect = [submitted, details]
+        client = RevAiAPIClient(TOKEN, dedup_index=index)
+
+        first = client.submit_job_local_file(media, language='en')
+        second = client.submit_job_local_file(media, language='en')
+
+        assert first == Job('1', CREATED_ON, JobStatus.IN_PROGRESS)
+        assert second == Job('1', CREATED_ON, JobStatus.TRANSCRIBED)
+        assert mock_session.request.call_count == 2
+        assert mock_session.request.call_args[0][0] == 'GET'
+
+    def test_deleted_job_is_submitted_again(self, index, media, mock_session,
+                                            make_mock_response):
+        index.acquire(index.make_key(media, {}))
+        index.record(index.make_key(media, {}), 'deleted')
+        not_found = make_mock_response(url=JOBS_URL, status=404)
+        submitted = make_mock_response(url=JOBS_URL, json_data={
+            'id': '2', 'status': 'in_progress', 'created_on': CREATED_ON})
+        mock_session.request.side_effect = [not_found, submitted]
+        client = RevAiAPIClient(TOKEN, dedup_index=index)
+
+        job = client.submit_job_local_file(media)
+
+        assert job.id == '2'
+        assert index.acquire(index.make_key(media, {})) == '2'
+
+    def test_failed_upload_releases_claim(self, index, media, mock_session, make_mock_response):
+        mock_session.request.return_value = make_mock_response(url=JOBS_URL, status=500)
+        client = RevAiAPIClient(TOKEN, dedup_index=index)
+
+        with pytest.raises(Exception):
+            client.submit_job_local_file(media)
+
+        assert index.acquire(index.make_key(media, {})) is None
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for exporting artifacts of jobs"""
+
+import os
+import pytest
+from src.rev_ai.export import export_jobs
+from src.rev_ai.models import CaptionType
+
+
+class StreamedResponse:
+    def __init__(self, content, fail_after=None):
+        self.content = content
+        self.fail_after = fail_after
+        self.closed = False
+        self.chunk_sizes = []
+
+    def iter_content(self, chunk_size):
+        self.chunk_sizes.append(chunk_size)
+        for index in range(0, len(self.content), chunk_size):
+            if self.fail_after is not None and index >= self.fail_after:
+                raise IOError('connection reset')
+            yield self.content[index:index + chunk_size]
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def client(mocker):
+    client = mocker.Mock()
+    client.get_transcript_json_as_stream.side_effect = \
+        lambda id_: StreamedResponse('{{"id": "{}"}}'.format(id_).encode('utf-8'))
+    client.get_transcript_text_as_stream.side_effect = \
+        lambda id_: StreamedResponse(b'text of ' + id_.encode('utf-8'))
+    client.get_captions_as_stream.side_effect = \
+        lambda id_, content_type, channel_id: StreamedResponse(
+            '{} {} {}'.format(id_, content_type.name, channel_id).encode('utf-8'))
+    return client
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_export_jobs(client, tmpdir):
+    output_dir = str(tmpdir.join('export'))
+
+    report = export_jobs(client, ['a', 'b'], output_dir, chunk_size=4)
+
+    assert sorted(os.listdir(output_dir)) == ['a.json', 'a.srt', 'a.txt', 'a.vtt',
+                                              'b.json', 'b.srt', 'b.txt', 'b.vtt']
+    assert read(os.path.join(output_dir, 'a.json')) == b'{"id": "a"}'
+    assert read(os.path.join(output_dir, 'b.vtt')) == b'b VTT None'
+    assert report.files[('a', 'text', None)] == os.path.join(output_dir, 'a.txt')
+    assert report.failed == {}
+    assert report.bytes_written == sum(
+        os.path.getsize(os.path.join(output_dir, name)) for name in os.listdir(output_dir))
+
+
+def test_export_captions_per_channel(client, tmpdir):
+    report = export_jobs(client, ['a', 'b'], str(tmpdir), artifacts=['srt'],
+                         channel_ids={'a': [1, 2]})
+
+    assert sorted(os.listdir(str(tmpdir))) == ['a.ch1.srt', 'a.ch2.srt', 'b.srt']
+    assert read(str(tmpdir.join('a.ch2.srt'))) == b'a SRT 2'
+    client.get_captions_as_stream.assert_any_call('a', CaptionType.SRT, 1)
+    assert len(report.files) == 3
+
+
+def test_failed_download_leaves_no_file(client, tmpdir):
+    response = StreamedResponse(b'0123456789', fail_after=4)
+    client.get_transcript_text_as_stream.side_effect = None
+    client.get_transcript_text_as_stream.return_value = response
+
+    report = export_jobs(client, ['a'], str(tmpdir), artifacts=['json', 'text'], chunk_size=2)
+
+    assert os.listdir(str(tmpdir)) == ['a.json']
+    assert list(report.failed) == [('a', 'text', None)]
+    assert response.closed
+    assert response.chunk_sizes == [2]
+
+
+def test_skip_existing(client, tmpdir):
+    tmpdir.join('a.txt').write('old')
+
+    export_jobs(client, ['a'], str(tmpdir), artifacts=['text'], skip_existing=True)
+
+    assert read(str(tmpdir.join('a.txt'))) == b'old'
+    client.get_transcript_text_as_stream.assert_not_called()
+
+
+def test_unknown_artifact(client, tmpdir):
+    with pytest.raises(ValueError, match='unknown artifact'):
+        export_jobs(client, ['a'], str(tmpdir), artifacts=['pdf'])
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for request hedging"""
+
+import threading
+import pytest
+from src.rev_ai.apiclient import RevAiAPIClient
+from src.rev_ai.custom_vocabularies_client import RevAiCustomVocabulariesClient
+from src.rev_ai.hedging import HedgingPolicy, LatencyHistogram
+
+
+def make_send(delays):
+    """Returns a send function whose nth call waits delays[n] seconds"""
+    calls = []
+    release = threading.Event()
+
+    def send():
+        index = len(calls)
+        calls.append(index)
+        release.wait(delays[index])
+        return 'response {}'.format(index)
+    send.calls = calls
+    send.release = release
+    return send
+
+
+def warm_up(policy, endpoint, seconds, count=20):
+    for _ in range(count):
+        policy.histogram(endpoint).observe(seconds)
+    policy.requests += count
+
+
+class TestLatencyHistogram():
+    def test_percentile(self):
+        histogram = LatencyHistogram()
+        for _ in range(90):
+            histogram.observe(0.01)
+        for _ in range(10):
+            histogram.observe(1.0)
+
+        assert histogram.percentile(50) == pytest.approx(0.01, rel=0.25)
+        assert histogram.percentile(95) == pytest.approx(1.0, rel=0.25)
+        assert histogram.count == 100
+
+    def test_empty(self):
+        assert LatencyHistogram().percentile(99) is None
+
+
+class TestHedgingPolicy():
+    def test_slow_request_is_hedged(self):
+        policy = HedgingPolicy(budget=0.5)
+        warm_up(policy, 'GET jobs/{id}', 0.01)
+        send = make_send([5, 0])
+
+        response = policy.execute('GET jobs/{id}', send)
+        send.release.set()
+
+        assert response == 'response 1'
+        assert policy.stats() == {'requests': 21, 'hedges': 1, 'hedge_wins': 1}
+
+    def test_fast_request_is_not_hedged(self):
+        policy = HedgingPolicy(budget=0.5)
+        warm_up(policy, 'GET jobs/{id}', 1.0)
+        send = make_send([0])
+
+        assert policy.execute('GET jobs/{id}', send) == 'response 0'
+        assert send.calls == [0]
+
+    def test_budget_caps_hedges(self):
+        policy = HedgingPolicy(budget=0.05)
+        warm_up(policy, 'GET jobs/{id}', 0.001, count=1)
+        send = make_send([0.2])
+
+        assert policy.execute('GET jobs/{id}', send) == 'response 0'
+        assert policy.hedges == 0
+
+    def test_no_hedge_before_min_samples(self):
+        policy = HedgingPolicy(budget=1)
+
+        assert policy.delay('GET account') is None
+        assert HedgingPolicy(initial_delay=0.5).delay('GET account') == 0.5
+
+    def test_failed_attempt_falls_back_to_the_other(self):
+        policy = HedgingPolicy(budget=0.5)
+        warm_up(policy, 'GET jobs/{id}', 0.01)
+        calls = []
+
+        def send():
+            calls.append(1)
+            if len(calls) == 2:
+                raise IOError('connection reset')
+            threading.Event().wait(0.3)
+            return 'slow response'
+
+        assert policy.execute('GET jobs/{id}', send) == 'slow response'
+
+
+@pytest.mark.parametrize('client, url, expected', [
+    (RevAiAPIClient('token'), RevAiAPIClient.base_url + 'jobs/abc/captions?speaker_channel=1',
+     'GET jobs/{id}/captions'),
+    (RevAiAPIClient('token'), RevAiAPIClient.base_url + 'jobs?limit=5', 'GET jobs'),
+    (RevAiCustomVocabulariesClient('token'),
+     RevAiCustomVocabulariesClient.base_url + 'vocabularies/abc', 'GET vocabularies/{id}'),
+])
+def test_endpoint_name(client, url, expected):
+    assert client._endpoint_name('GET', url) == expected
+
+
+def test_client_hedges_only_gets(mock_session, make_mock_response):
+    policy = HedgingPolicy()
+    client = RevAiAPIClient('token', hedging_policy=policy)
+    mock_session.request.return_value = make_mock_response(
+        json_data={'email': 'a@b.com', 'balance_seconds': 10})
+
+    client.get_account()
+    client.delete_job('1')
+
+    assert policy.stats()['requests'] == 1
+    assert policy.histogram('GET account').count == 1
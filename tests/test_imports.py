@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Regression tests for the import time of the package"""
+
+import os
+import subprocess
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Budgets of cumulative import time in microseconds, generous enough for slow machines
+IMPORT_BUDGETS = {
+    'src.rev_ai': 20000,
+    'src.rev_ai.models': 50000,
+    'src.rev_ai.apiclient': 150000,
+}
+
+HEAVY_MODULES = ['requests', 'urllib3', 'websocket', 'six', 'sqlite3', 'concurrent.futures',
+                 'numpy']
+
+
+def run(code, *options):
+    return subprocess.run([sys.executable] + list(options) + ['-c', code], cwd=ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                          universal_newlines=True, check=True)
+
+
+def import_time(module):
+    """Returns the cumulative import time of module in microseconds"""
+    stderr = run('import {}'.format(module), '-X', 'importtime').stderr
+    for line in stderr.splitlines():
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module:
+            return int(fields[1])
+    raise AssertionError('{} not found in import times'.format(module))
+
+
+pytestmark = pytest.mark.skipif(sys.version_info < (3, 7),
+                                reason='imports are only lazy on Python 3.7+')
+
+
+@pytest.mark.parametrize('module', sorted(IMPORT_BUDGETS))
+def test_import_time_budget(module):
+    assert import_time(module) <= IMPORT_BUDGETS[module]
+
+
+@pytest.mark.parametrize('module', ['src.rev_ai', 'src.rev_ai.models', 'src.rev_ai.apiclient',
+                                    'src.rev_ai.streamingclient'])
+def test_heavy_dependencies_are_not_imported(module):
+    code = 'import sys, {}; print(" ".join(sorted(sys.modules)))'.format(module)
+
+    loaded = set(run(code).stdout.split())
+
+    assert [name for name in HEAVY_MODULES if name in loaded] == []
+
+
+def test_public_names_are_available():
+    code = ('import sys, src.rev_ai as rev_ai; '
+            'print(rev_ai.Job.__name__, rev_ai.apiclient.RevAiAPIClient.__name__, '
+            '"requests" in sys.modules)')
+
+    assert run(code).stdout.split() == ['Job', 'RevAiAPIClient', 'False']
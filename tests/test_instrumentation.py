@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for instrumentation hooks"""
+
+import pytest
+from requests.exceptions import ConnectionError, HTTPError
+from src.rev_ai.apiclient import RevAiAPIClient
+from src.rev_ai.instrumentation import Hooks, HookList, PrometheusHooks, SpanHooks, \
+    RequestInfo
+
+TOKEN = 'token'
+JOB = {'id': 'abc', 'created_on': '2018-05-05T23:23:22.29Z', 'status': 'in_progress'}
+
+
+class RecordingHooks(Hooks):
+    def __init__(self):
+        self.events = []
+
+    def before_request(self, request):
+        self.events.append(('before', request.method, request.endpoint, request.job_id))
+
+    def after_request(self, request):
+        self.events.append(('after', request.status_code, request.response_bytes,
+                            type(request.error).__name__ if request.error else None))
+
+    def stream_opened(self, stream):
+        self.events.append(('opened', stream.url))
+
+    def message_received(self, stream, message_type, size):
+        self.events.append(('message', message_type, size))
+
+    def stream_closed(self, stream):
+        self.events.append(('closed', stream.job_id, stream.close_code, stream.messages))
+
+
+class FakeSpan:
+    def __init__(self, name, attributes):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.events = []
+        self.exceptions = []
+        self.ended = False
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def add_event(self, name, attributes):
+        self.events.append((name, attributes))
+
+    def record_exception(self, exception):
+        self.exceptions.append(exception)
+
+    def end(self):
+        self.ended = True
+
+
+class FakeTracer:
+    def __init__(self):
+        self.spans = []
+
+    def start_span(self, name, attributes):
+        self.spans.append(FakeSpan(name, attributes))
+        return self.spans[-1]
+
+
+def finished_request(method, endpoint, status_code=200, duration=0.2, error=None):
+    request = RequestInfo(method, 'https://example.com', endpoint)
+    request.status_code = status_code
+    request.duration = duration
+    request.response_bytes = 10
+    request.error = error
+    return request
+
+
+class TestClientHooks():
+    def test_requests_are_reported(self, mock_session, make_mock_response):
+        hooks = RecordingHooks()
+        client = RevAiAPIClient(TOKEN, hooks=HookList([hooks]))
+        mock_session.request.side_effect = [make_mock_response(json_data=JOB),
+                                            make_mock_response(status=404, json_data=JOB)]
+
+        client.get_job_details('abc')
+        with pytest.raises(HTTPError):
+            client.delete_job('abc')
+
+        size = len(str(JOB).encode('utf-8'))
+        assert hooks.events == [('before', 'GET', 'jobs/{id}', 'abc'),
+                                ('after', 200, size, None),
+                                ('before', 'DELETE', 'jobs/{id}', 'abc'),
+                                ('after', 404, size, None)]
+
+    def test_errors_are_reported(self, mock_session):
+        hooks = RecordingHooks()
+        mock_session.request.side_effect = ConnectionError()
+
+        with pytest.raises(ConnectionError):
+            RevAiAPIClient(TOKEN, hooks=hooks).get_list_of_jobs()
+
+        assert hooks.events == [('before', 'GET', 'jobs', None),
+                                ('after', None, None, 'ConnectionError')]
+
+
+class TestStreamingHooks():
+    def test_stream_events(self, mock_streaming_client, mock_generator):
+        hooks = RecordingHooks()
+        mock_streaming_client.hooks = hooks
+        mock_streaming_client.on_connected = lambda job_id: None
+        mock_streaming_client.on_close = lambda code, reason: None
+        mock_streaming_client.client.recv_data.side_effect = [
+            [0x1, b'{"type":"connected","id":"testid"}'],
+            [0x1, b'{"type":"final","elements":[]}'],
+            [0x8, b'\x03\xe8End of input']]
+
+        list(mock_streaming_client.start(mock_generator()))
+
+        assert hooks.events[0][0] == 'opened'
+        assert 'access_token=*' in hooks.events[0][1]
+        assert TOKEN not in hooks.events[0][1].replace('access_token', '')
+        assert hooks.events[1:] == [('message', 'connected', 34),
+                                    ('message', 'final', 30),
+                                    ('closed', 'testid', 1000, 2)]
+
+
+def test_prometheus_exposition():
+    hooks = PrometheusHooks()
+    hooks.after_request(finished_request('GET', 'jobs/{id}', duration=0.2))
+    hooks.after_request(finished_request('GET', 'jobs/{id}', status_code=404, duration=0.02))
+    hooks.after_request(finished_request('GET', 'jobs/{id}', error=ConnectionError()))
+    hooks.message_received(None, 'partial', 40)
+
+    text = hooks.exposition()
+
+    assert '# TYPE rev_ai_requests_total counter' in text
+    assert 'rev_ai_requests_total{method="GET",endpoint="jobs/{id}",status="200"} 1' in text
+    assert 'rev_ai_requests_total{method="GET",endpoint="jobs/{id}",status="404"} 1' in text
+    assert 'rev_ai_request_errors_total{method="GET",endpoint="jobs/{id}",' \
+        'error="ConnectionError"} 1' in text
+    assert 'rev_ai_request_duration_seconds_bucket{method="GET",endpoint="jobs/{id}",' \
+        'le="0.025"} 1' in text
+    assert 'rev_ai_request_duration_seconds_bucket{method="GET",endpoint="jobs/{id}",' \
+        'le="+Inf"} 2' in text
+    assert 'rev_ai_request_duration_seconds_count{method="GET",endpoint="jobs/{id}"} 2' in text
+    assert 'rev_ai_response_bytes_total{method="GET",endpoint="jobs/{id}"} 20' in text
+    assert 'rev_ai_stream_messages_total{type="partial"} 1' in text
+
+
+def test_span_hooks_trace_a_job(mock_session, make_mock_response):
+    tracer = FakeTracer()
+    client = RevAiAPIClient(TOKEN, hooks=SpanHooks(tracer))
+    mock_session.request.side_effect = [make_mock_response(json_data=JOB),
+                                        make_mock_response(json_data=JOB)]
+
+    client.submit_job_url('https://example.com/audio.mp3')
+    client.get_job_details('abc')
+
+    assert [span.name for span in tracer.spans] == ['POST jobs', 'GET jobs/{id}']
+    assert all(span.attributes['rev_ai.job_id'] == 'abc' for span in tracer.spans)
+    assert all(span.ended for span in tracer.spans)
+    assert tracer.spans[0].attributes['http.status_code'] == 200
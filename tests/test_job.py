@@ -3,7 +3,9 @@
 
 import json
 import pytest
+from datetime import datetime
 from src.rev_ai.apiclient import RevAiAPIClient
+from src.rev_ai.audioencoding import FlacEncoder
 from src.rev_ai.models.asynchronous import Job, JobStatus
 
 try:
@@ -98,6 +100,48 @@ class TestJobEndpoints():
         assert len(res) == 1
         mock_session.request.assert_called_once_with("GET", url, headers=client.default_headers)
 
+    @pytest.mark.parametrize('prefetch', [True, False])
+    def test_iter_jobs_follows_cursors(self, prefetch, mock_session, make_mock_response):
+        pages = {
+            JOBS_URL + '?limit=2': [
+                {'id': '5', 'status': 'in_progress', 'created_on': '2018-05-05T23:23:22.29Z'},
+                {'id': '4', 'status': 'transcribed', 'created_on': '2018-05-05T20:00:00Z'}],
+            JOBS_URL + '?limit=2&starting_after=4': [
+                {'id': '3', 'status': 'transcribed', 'created_on': '2018-05-04T23:23:22.29Z'}]
+        }
+        mock_session.request.side_effect = \
+            lambda method, url, **kwargs: make_mock_response(url=url, json_data=pages[url])
+        client = RevAiAPIClient(TOKEN)
+
+        res = list(client.iter_jobs(page_size=2, prefetch=prefetch))
+
+        assert [job.id for job in res] == ['5', '4', '3']
+        assert mock_session.request.call_count == 2
+
+    def test_iter_jobs_filters_and_stops_early(self, mock_session, make_mock_response):
+        data = [
+            {'id': '6', 'status': 'transcribed', 'created_on': '2018-05-07T00:00:00Z'},
+            {'id': '5', 'status': 'in_progress', 'created_on': '2018-05-06T00:00:00.5Z'},
+            {'id': '4', 'status': 'transcribed', 'created_on': '2018-05-05T12:00:00Z'},
+            {'id': '3', 'status': 'transcribed', 'created_on': '2018-05-04T00:00:00Z'}
+        ]
+        mock_session.request.return_value = make_mock_response(url=JOBS_URL, json_data=data)
+        client = RevAiAPIClient(TOKEN)
+
+        res = list(client.iter_jobs(page_size=4,
+                                    statuses=[JobStatus.TRANSCRIBED],
+                                    created_after=datetime(2018, 5, 5),
+                                    created_before='2018-05-06T12:00:00Z'))
+
+        assert [job.id for job in res] == ['4']
+        mock_session.request.assert_called_once_with(
+            "GET", JOBS_URL + '?limit=4', headers=client.default_headers)
+
+    @pytest.mark.parametrize('page_size', [0, 1001])
+    def test_iter_jobs_with_invalid_page_size(self, page_size, mock_session):
+        with pytest.raises(ValueError, match='page_size must be between 1 and 1000'):
+            next(RevAiAPIClient(TOKEN).iter_jobs(page_size=page_size))
+
     def test_submit_job_url_with_success(self, mock_session, make_mock_response):
         data = {
             'id': JOB_ID,
@@ -127,24 +171,25 @@ class TestJobEndpoints():
                           JobStatus.IN_PROGRESS,
                           metadata=METADATA,
                           callback_url=CALLBACK_URL)
-        mock_session.request.assert_called_once_with(
-            "POST",
-            JOBS_URL,
-            json={
-                'media_url': MEDIA_URL,
-                'callback_url': CALLBACK_URL,
-                'metadata': METADATA,
-                'skip_diarization': True,
-                'skip_punctuation': True,
-                'speaker_channels_count': 1,
-                'custom_vocabularies': CUSTOM_VOCAB,
-                'filter_profanity': True,
-                'remove_disfluencies': True,
-                'delete_after_seconds': 0,
-                'language': LANGUAGE,
-                'custom_vocabulary_id': CUSTOM_VOCAB_ID
-            },
-            headers=client.default_headers)
+        assert mock_session.request.call_count == 1
+        args, kwargs = mock_session.request.call_args
+        assert args == ("POST", JOBS_URL)
+        assert json.loads(kwargs['data'].decode('utf-8')) == {
+            'media_url': MEDIA_URL,
+            'callback_url': CALLBACK_URL,
+            'metadata': METADATA,
+            'skip_diarization': True,
+            'skip_punctuation': True,
+            'speaker_channels_count': 1,
+            'custom_vocabularies': CUSTOM_VOCAB,
+            'filter_profanity': True,
+            'remove_disfluencies': True,
+            'delete_after_seconds': 0,
+            'language': LANGUAGE,
+            'custom_vocabulary_id': CUSTOM_VOCAB_ID
+        }
+        assert kwargs['headers'] == dict(client.default_headers,
+                                         **{'Content-Type': 'application/json'})
 
     @pytest.mark.parametrize('url', [None, ''])
     def test_submit_job_url_with_no_media_url(self, url, mock_session):
@@ -201,11 +246,31 @@ class TestJobEndpoints():
                             'delete_after_seconds': 0,
                             'language': LANGUAGE,
                             'custom_vocabulary_id': CUSTOM_VOCAB_ID
-                        }, sort_keys=True)
+                        }, sort_keys=True, separators=(',', ':'))
                     )
                 },
                 headers=client.default_headers)
 
+    def test_submit_job_local_file_with_encoder(self, tmpdir, mock_session, make_mock_response):
+        filename = str(tmpdir.join('test.raw'))
+        with open(filename, 'wb') as f:
+            f.write(b'\0' * 64000)
+        data = {
+            'id': JOB_ID,
+            'status': 'in_progress',
+            'created_on': CREATED_ON
+        }
+        response = make_mock_response(url=JOB_ID_URL, json_data=data)
+        mock_session.request.return_value = response
+        client = RevAiAPIClient(TOKEN)
+
+        res = client.submit_job_local_file(filename, encoder=FlacEncoder())
+
+        assert res == Job(JOB_ID, CREATED_ON, JobStatus.IN_PROGRESS)
+        media_name, media = mock_session.request.call_args[1]['files']['media']
+        assert media_name == str(tmpdir.join('test.flac'))
+        assert media.closed
+
     @pytest.mark.parametrize('filename', [None, ''])
     def test_submit_job_url_with_no_filename(self, filename, mock_session):
         with pytest.raises(ValueError, match='filename must be provided'):
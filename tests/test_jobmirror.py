@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the job mirror"""
+
+import pytest
+import requests
+from requests.exceptions import HTTPError
+from src.rev_ai.jobmirror import JobMirror
+from src.rev_ai.models.asynchronous import Job, JobStatus
+
+
+def make_job(id_, created_on, status=JobStatus.TRANSCRIBED, metadata=None):
+    return Job(id_, created_on, status, metadata=metadata, callback_url='https://callback.com/')
+
+
+def not_found():
+    response = requests.Response()
+    response.status_code = 404
+    return HTTPError('404 Client Error', response=response)
+
+
+@pytest.fixture
+def client(mocker):
+    return mocker.Mock()
+
+
+@pytest.fixture
+def mirror(client, tmpdir):
+    return JobMirror(client, str(tmpdir.join('jobs.db')))
+
+
+class TestJobMirror():
+    def test_first_sync_stores_all_jobs(self, client, mirror):
+        jobs = [make_job('3', '2018-05-07T00:00:00Z', JobStatus.IN_PROGRESS, 'tenant=a'),
+                make_job('2', '2018-05-06T00:00:00.5Z', metadata='tenant=b'),
+                make_job('1', '2018-05-05T00:00:00Z', JobStatus.FAILED, 'tenant=a')]
+        client.iter_jobs.return_value = iter(jobs)
+
+        result = mirror.sync()
+
+        assert result == {'added': 3, 'refreshed': 0, 'removed': 0}
+        assert mirror.get('2') == jobs[1]
+        assert mirror.find() == jobs
+        client.get_job_details.assert_not_called()
+
+    def test_incremental_sync(self, client, mirror):
+        client.iter_jobs.return_value = iter([
+            make_job('2', '2018-05-06T00:00:00Z', JobStatus.IN_PROGRESS),
+            make_job('1', '2018-05-05T00:00:00Z', JobStatus.IN_PROGRESS)])
+        mirror.sync()
+        client.iter_jobs.return_value = iter([
+            make_job('3', '2018-05-07T00:00:00Z', JobStatus.IN_PROGRESS),
+            make_job('2', '2018-05-06T00:00:00Z', JobStatus.IN_PROGRESS),
+            make_job('1', '2018-05-05T00:00:00Z', JobStatus.IN_PROGRESS)])
+        details = {'2': make_job('2', '2018-05-06T00:00:00Z', JobStatus.TRANSCRIBED)}
+
+        def get_job_details(id_):
+            if id_ not in details:
+                raise not_found()
+            return details[id_]
+        client.get_job_details.side_effect = get_job_details
+
+        result = mirror.sync()
+
+        assert result == {'added': 1, 'refreshed': 1, 'removed': 1}
+        assert mirror.get('1') is None
+        assert mirror.get('2').status == JobStatus.TRANSCRIBED
+        assert mirror.get('3').status == JobStatus.IN_PROGRESS
+        assert sorted(call[0][0] for call in client.get_job_details.call_args_list) == ['1', '2']
+
+    def test_find_filters(self, client, mirror):
+        jobs = [make_job('4', '2018-05-08T00:00:00Z', metadata='tenant=a;batch=1'),
+                make_job('3', '2018-05-07T00:00:00Z', JobStatus.IN_PROGRESS, 'tenant=a'),
+                make_job('2', '2018-05-06T00:00:00Z', metadata='tenant=b'),
+                make_job('1', '2018-05-05T00:00:00Z', JobStatus.FAILED, 'tenant=a')]
+        client.iter_jobs.return_value = iter(jobs)
+        mirror.sync()
+
+        assert [j.id for j in mirror.find(statuses=[JobStatus.TRANSCRIBED])] == ['4', '2']
+        assert [j.id for j in mirror.find(created_after='2018-05-06T00:00:00Z',
+                                          created_before='2018-05-08T00:00:00Z')] == ['3', '2']
+        assert [j.id for j in mirror.find(metadata='tenant=a')] == ['3', '1']
+        assert [j.id for j in mirror.find(metadata_contains='tenant=a')] == ['4', '3', '1']
+        assert [j.id for j in mirror.find(limit=1)] == ['4']
+        assert mirror.count_by_status() == {JobStatus.TRANSCRIBED: 2,
+                                            JobStatus.IN_PROGRESS: 1,
+                                            JobStatus.FAILED: 1}
+
+    def test_remove(self, client, mirror):
+        client.iter_jobs.return_value = iter([make_job('1', '2018-05-05T00:00:00Z')])
+        mirror.sync()
+
+        mirror.remove('1')
+
+        assert mirror.find() == []
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the JSON backend and bulk decoders"""
+
+import copy
+import json
+import pytest
+from src.rev_ai import jsonbackend
+from src.rev_ai.jsonbackend import JsonBackend, decode_jobs, decode_transcript, decode_account
+from src.rev_ai.models.asynchronous import Job, JobStatus, Account, Transcript, Monologue, \
+    Element
+
+CREATED_ON = '2018-05-05T23:23:22.29Z'
+
+
+def available_backends():
+    names = []
+    for name in jsonbackend.BACKENDS:
+        try:
+            JsonBackend(name)
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+
+@pytest.fixture(params=available_backends())
+def backend(request):
+    previous = jsonbackend.set_backend(request.param)
+    yield jsonbackend.get_backend()
+    jsonbackend.set_backend(previous)
+
+
+class TestJsonBackend():
+    def test_round_trip(self, backend):
+        data = {'b': [1, 2.5, None, True], 'a': u'café https://example.com/'}
+
+        text = backend.dumps(data)
+
+        assert json.loads(text) == data
+        assert backend.loads(text) == data
+        assert backend.loads(text.encode('utf-8')) == data
+
+    def test_sort_keys(self, backend):
+        text = backend.dumps({'b': 1, 'a': 2}, sort_keys=True)
+
+        assert text == '{"a":2,"b":1}'
+
+    def test_output_is_the_same_for_every_backend(self, backend):
+        data = {'metadata': u'café', 'media_url': 'https://example.com/a.mp3', 'x': [True]}
+
+        assert backend.dumps(data) == \
+            json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError, match='Unknown JSON backend'):
+            JsonBackend('yaml')
+
+    def test_environment_variable(self, monkeypatch):
+        monkeypatch.setenv(jsonbackend.BACKEND_ENV, 'json')
+        previous = jsonbackend.set_backend(None)
+        try:
+            assert jsonbackend.get_backend().name == 'json'
+        finally:
+            jsonbackend.set_backend(previous)
+
+
+def test_decode_jobs(backend):
+    data = json.dumps([
+        {'id': '1', 'created_on': CREATED_ON, 'status': 'in_progress', 'metadata': 'meta'},
+        {'id': '2', 'created_on': CREATED_ON, 'status': 'failed', 'failure': 'download_failure'}
+    ]).encode('utf-8')
+
+    assert decode_jobs(data) == [
+        Job('1', CREATED_ON, JobStatus.IN_PROGRESS, metadata='meta'),
+        Job('2', CREATED_ON, JobStatus.FAILED, failure='download_failure')]
+
+
+def test_decode_transcript(backend):
+    data = json.dumps({'monologues': [{'speaker': 1, 'elements': [
+        {'type': 'text', 'value': 'Hello', 'ts': 0.5, 'end_ts': 1.5, 'confidence': 1},
+        {'type': 'punct', 'value': '.'}]}]}).encode('utf-8')
+
+    assert decode_transcript(data) == Transcript([Monologue(1, [
+        Element('text', 'Hello', 0.5, 1.5, 1), Element('punct', '.', None, None, None)])])
+
+
+def test_decode_account(backend):
+    data = b'{"email": "a@b.c", "balance_seconds": 10}'
+
+    assert decode_account(data) == Account('a@b.c', 10)
+
+
+def test_models_are_slotted():
+    job = Job('1', CREATED_ON, JobStatus.TRANSCRIBED, name='a.mp3')
+
+    with pytest.raises(AttributeError):
+        job.unknown = 1
+    assert not hasattr(Element('text', 'a', 0, 1, 1), '__dict__')
+    assert copy.copy(job) == job
+    assert copy.deepcopy(job) is not job
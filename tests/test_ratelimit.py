@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for rate limiting"""
+
+import time
+import pytest
+from src.rev_ai import ratelimit
+from src.rev_ai.apiclient import RevAiAPIClient
+from src.rev_ai.ratelimit import TokenBucket, SharedTokenBucket, RateLimiter, RateLimitExceeded
+
+
+@pytest.fixture
+def clock(mocker):
+    now = [100.0]
+    mocker.patch.object(ratelimit, '_clock', lambda: now[0])
+
+    def sleep(seconds):
+        now[0] += seconds
+    return mocker.patch('time.sleep', side_effect=sleep)
+
+
+class TestTokenBucket():
+    def test_allows_bursts_up_to_capacity(self, clock):
+        bucket = TokenBucket(2, capacity=3)
+
+        assert [bucket.acquire(blocking=False) for _ in range(4)] == [True, True, True, False]
+        clock.assert_not_called()
+
+    def test_blocks_until_tokens_are_added(self, clock):
+        bucket = TokenBucket(4, capacity=1)
+        bucket.acquire()
+
+        assert bucket.acquire()
+        clock.assert_called_once_with(0.25)
+        assert bucket.available == 0
+
+    def test_timeout(self, clock):
+        bucket = TokenBucket(1, capacity=1)
+        bucket.acquire()
+
+        assert not bucket.acquire(timeout=0.5)
+        clock.assert_not_called()
+
+    def test_invalid_arguments(self):
+        with pytest.raises(ValueError):
+            TokenBucket(0)
+        with pytest.raises(ValueError):
+            TokenBucket(1, capacity=2).acquire(3)
+
+
+class TestSharedTokenBucket():
+    def test_buckets_with_the_same_name_share_tokens(self, tmpdir):
+        path = str(tmpdir.join('ratelimit.db'))
+        first = SharedTokenBucket(path, 'polling', 0.001, capacity=2)
+        second = SharedTokenBucket(path, 'polling', 0.001, capacity=2)
+        other = SharedTokenBucket(path, 'downloads', 0.001, capacity=2)
+
+        assert first.acquire(blocking=False)
+        assert second.acquire(blocking=False)
+        assert not first.acquire(blocking=False)
+        assert other.acquire(blocking=False)
+
+    def test_release_returns_tokens_up_to_capacity(self, tmpdir):
+        bucket = SharedTokenBucket(str(tmpdir.join('ratelimit.db')), 'polling', 0.001, capacity=2)
+        bucket.acquire(2)
+        bucket.release()
+
+        assert bucket.acquire(blocking=False)
+        bucket.release(5)
+        assert bucket.available == pytest.approx(2)
+
+    def test_blocks_until_tokens_are_added(self, tmpdir):
+        bucket = SharedTokenBucket(str(tmpdir.join('ratelimit.db')), 'polling', 20, capacity=1)
+        bucket.acquire()
+        start = time.time()
+
+        assert bucket.acquire()
+        assert time.time() - start >= 0.04
+
+
+class TestRateLimiter():
+    @pytest.mark.parametrize('method, endpoint, category', [
+        ('POST', 'POST jobs', 'submissions'),
+        ('POST', 'POST vocabularies', 'submissions'),
+        ('GET', 'GET jobs/{id}', 'polling'),
+        ('GET', 'GET account', 'polling'),
+        ('GET', 'GET jobs/{id}/transcript', 'downloads'),
+        ('GET', 'GET jobs/{id}/captions', 'downloads'),
+        ('DELETE', 'DELETE jobs/{id}', 'other'),
+    ])
+    def test_category(self, method, endpoint, category):
+        assert RateLimiter().category(method, endpoint) == category
+
+    def test_fail_fast(self):
+        limiter = RateLimiter(polling=TokenBucket(0.001, capacity=1), blocking=False)
+        limiter.acquire('GET', 'GET jobs/{id}')
+        limiter.acquire('POST', 'POST jobs')
+
+        with pytest.raises(RateLimitExceeded, match='polling'):
+            limiter.acquire('GET', 'GET jobs/{id}')
+
+    def test_total_applies_to_every_request(self):
+        limiter = RateLimiter(total=TokenBucket(0.001, capacity=1), blocking=False)
+        limiter.acquire('POST', 'POST jobs')
+
+        with pytest.raises(RateLimitExceeded, match='total'):
+            limiter.acquire('GET', 'GET jobs/{id}/transcript')
+
+    def test_refused_request_does_not_spend_its_category(self):
+        polling = TokenBucket(0.001, capacity=2)
+        limiter = RateLimiter(polling=polling, total=TokenBucket(0.001, capacity=1),
+                              blocking=False)
+        limiter.acquire('GET', 'GET jobs/{id}')
+
+        with pytest.raises(RateLimitExceeded, match='total'):
+            limiter.acquire('GET', 'GET jobs/{id}')
+        assert polling.available == pytest.approx(1, abs=0.01)
+
+    def test_shared(self, tmpdir):
+        limiter = RateLimiter.shared(str(tmpdir.join('ratelimit.db')), submissions=2)
+
+        assert isinstance(limiter.buckets['submissions'], SharedTokenBucket)
+        assert list(limiter.buckets) == ['submissions']
+
+
+def test_client_requests_are_rate_limited(mock_session, make_mock_response, mocker):
+    limiter = mocker.Mock(spec=RateLimiter)
+    mock_session.request.return_value = make_mock_response(
+        json_data={'email': 'a@b.com', 'balance_seconds': 10})
+    client = RevAiAPIClient('token', rate_limiter=limiter)
+
+    client.get_account()
+    client.delete_job('1')
+
+    assert limiter.acquire.call_args_list == [mocker.call('GET', 'GET account'),
+                                              mocker.call('DELETE', 'DELETE jobs/{id}')]
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for segmented transcription"""
+
+import struct
+import wave
+import pytest
+from src.rev_ai.apiclient import RevAiAPIClient
+from src.rev_ai.accountmonitor import AccountMonitor, InsufficientBalance, probe_duration
+from src.rev_ai.models.asynchronous import Account, Job, JobStatus, Transcript, Monologue, Element
+from src.rev_ai.segmentedtranscription import AudioSegment, split_audio, wait_for_jobs, \
+    merge_transcripts, transcribe_segmented
+
+RATE = 1000
+CREATED_ON = '2018-05-05T23:23:22.29Z'
+
+
+def tone(seconds):
+    frames = int(round(seconds * RATE))
+    return struct.pack('<{}h'.format(frames), *([8000, -8000] * frames)[:frames])
+
+
+def silence(seconds):
+    return b'\0' * (2 * int(round(seconds * RATE)))
+
+
+def write_raw(tmpdir, data):
+    filename = str(tmpdir.join('long.raw'))
+    with open(filename, 'wb') as f:
+        f.write(data)
+    return filename
+
+
+def read_frames(filename):
+    reader = wave.open(filename, 'rb')
+    try:
+        return reader.getnframes()
+    finally:
+        reader.close()
+
+
+def make_job(id_, status):
+    return Job(id_, CREATED_ON, status)
+
+
+def make_transcript(*words):
+    return Transcript([Monologue(0, [Element('text', value, ts, ts + 0.25, 0.9)
+                                     for value, ts in words])])
+
+
+def words(transcript):
+    return [[(e.value, e.timestamp, e.end_timestamp) for e in m.elements]
+            for m in transcript.monologues]
+
+
+class TestSplitAudio():
+    def test_cuts_at_silence_with_overlap(self, tmpdir):
+        filename = write_raw(tmpdir, tone(7) + silence(0.5) + tone(5.5) + silence(0.5) + tone(6))
+
+        segments = split_audio(filename, str(tmpdir), segment_length=10, overlap=0.2,
+                               search_window=4, rate=RATE, window=0.1)
+
+        assert [(s.start, s.end) for s in segments] == \
+            [(0.0, 7.5), (7.3, 13.5), (13.3, 19.5)]
+        assert [read_frames(s.filename) for s in segments] == [7500, 6200, 6200]
+
+    def test_short_audio_is_one_segment(self, tmpdir):
+        filename = write_raw(tmpdir, tone(3))
+
+        segments = split_audio(filename, str(tmpdir), segment_length=10, overlap=0.2,
+                               search_window=4, rate=RATE, window=0.1)
+
+        assert segments == [AudioSegment(str(tmpdir.join('long.0000.wav')), 0.0, 3.0)]
+
+    def test_invalid_lengths(self, tmpdir):
+        with pytest.raises(ValueError):
+            split_audio('long.raw', str(tmpdir), segment_length=10, overlap=5, search_window=4)
+
+
+def test_wait_for_jobs_polls_in_batches(mocker):
+    client = mocker.Mock()
+    client.iter_jobs.side_effect = [
+        iter([make_job('3', JobStatus.IN_PROGRESS), make_job('1', JobStatus.TRANSCRIBED)]),
+        iter([make_job('3', JobStatus.TRANSCRIBED), make_job('1', JobStatus.TRANSCRIBED)])]
+    client.get_job_details.return_value = make_job('old', JobStatus.FAILED)
+    mocker.patch('time.sleep')
+
+    jobs = wait_for_jobs(client, ['1', '3', 'old'], poll_interval=1)
+
+    assert jobs == {'1': make_job('1', JobStatus.TRANSCRIBED),
+                    '3': make_job('3', JobStatus.TRANSCRIBED),
+                    'old': make_job('old', JobStatus.FAILED)}
+    assert client.iter_jobs.call_count == 2
+    client.iter_jobs.assert_called_with(page_size=1000, created_after=CREATED_ON,
+                                        prefetch=False)
+    client.get_job_details.assert_called_once_with('old')
+
+
+def test_wait_for_jobs_stops_paging_before_oldest_job(mocker):
+    client = RevAiAPIClient('token')
+    older = [Job('o{}'.format(i), '2018-05-04T00:00:00.000Z', JobStatus.TRANSCRIBED)
+             for i in range(998)]
+    # Full pages, so that only the creation time of the oldest job stops paging
+    pages = {None: [Job('new', '2018-05-06T00:00:00.000Z', JobStatus.TRANSCRIBED),
+                    Job('1', '2018-05-05T00:00:00.000Z', JobStatus.TRANSCRIBED)] + older,
+             'o997': older + older[:2]}
+    get_list_of_jobs = mocker.patch.object(
+        client, 'get_list_of_jobs', side_effect=lambda limit, starting_after=None:
+        pages[starting_after])
+    mocker.patch.object(client, 'get_job_details',
+                        return_value=Job('deleted', '2018-05-05T00:00:00.000Z',
+                                         JobStatus.FAILED))
+    submitted = [Job('1', '2018-05-05T00:00:00.000Z', JobStatus.IN_PROGRESS),
+                 Job('deleted', '2018-05-05T00:00:00.000Z', JobStatus.IN_PROGRESS)]
+
+    jobs = wait_for_jobs(client, submitted)
+
+    assert jobs['1'].status == JobStatus.TRANSCRIBED
+    assert jobs['deleted'].status == JobStatus.FAILED
+    assert get_list_of_jobs.call_count == 1
+    client.get_job_details.assert_called_once_with('deleted')
+
+
+def test_wait_for_jobs_timeout(mocker):
+    client = mocker.Mock()
+    client.iter_jobs.side_effect = lambda **kwargs: iter([make_job('1', JobStatus.IN_PROGRESS)])
+
+    with pytest.raises(RuntimeError):
+        wait_for_jobs(client, ['1'], poll_interval=10, timeout=5)
+
+
+def test_merge_transcripts_removes_overlap_duplicates():
+    segments = [AudioSegment('a.wav', 0.0, 10.0), AudioSegment('b.wav', 9.0, 15.0)]
+    first = make_transcript(('one', 8.0), ('two', 9.25), ('three', 9.75))
+    first.monologues[0].elements.insert(1, Element('punct', ',', None, None, None))
+    first.monologues[0].elements.append(Element('punct', '.', None, None, None))
+    second = make_transcript(('two', 0.25), ('three', 0.75), ('four', 2.0))
+
+    merged = merge_transcripts([(segments[0], first), (segments[1], second)])
+
+    assert words(merged) == [
+        [('one', 8.0, 8.25), (',', None, None), ('two', 9.25, 9.5)],
+        [('three', 9.75, 10.0), ('four', 11.0, 11.25)]]
+
+
+def test_transcribe_segmented(tmpdir, mocker):
+    filename = write_raw(tmpdir, tone(7) + silence(0.5) + tone(3))
+    client = mocker.Mock()
+    client.submit_job_local_file.side_effect = \
+        lambda name, **options: make_job(name[-8:-4], JobStatus.IN_PROGRESS)
+    client.iter_jobs.side_effect = lambda **kwargs: iter([
+        make_job('0000', JobStatus.TRANSCRIBED), make_job('0001', JobStatus.TRANSCRIBED)])
+    client.get_transcript_object.side_effect = lambda id_: make_transcript((id_, 1.0))
+
+    transcript = transcribe_segmented(client, filename, segment_length=8, overlap=0.2,
+                                      rate=RATE, output_dir=str(tmpdir), language='en')
+
+    assert words(transcript) == [[('0000', 1.0, 1.25)],
+                                 [('0001', pytest.approx(8.29), pytest.approx(8.54))]]
+    client.submit_job_local_file.assert_any_call(str(tmpdir.join('long.0001.wav')),
+                                                 language='en')
+
+
+def test_transcribe_segmented_failed_job(tmpdir, mocker):
+    filename = write_raw(tmpdir, tone(3))
+    client = mocker.Mock()
+    client.submit_job_local_file.return_value = make_job('1', JobStatus.IN_PROGRESS)
+    client.iter_jobs.side_effect = lambda **kwargs: iter([make_job('1', JobStatus.FAILED)])
+
+    with pytest.raises(RuntimeError, match='Segment job 1 failed'):
+        transcribe_segmented(client, filename, segment_length=8, overlap=0.2, rate=RATE)
+
+
+def test_transcribe_segmented_insufficient_balance(tmpdir, mocker):
+    filename = write_raw(tmpdir, tone(7) + silence(0.5) + tone(3))
+    client = mocker.Mock()
+    client.account_monitor.admit.side_effect = InsufficientBalance('balance')
+
+    with pytest.raises(InsufficientBalance):
+        transcribe_segmented(client, filename, segment_length=8, overlap=0.2, rate=RATE)
+    client.account_monitor.admit.assert_called_once_with(pytest.approx(10.71))
+    assert not client.submit_job_local_file.called
+
+
+def test_transcribe_segmented_reserves_each_segment_once(tmpdir, mocker):
+    filename = write_raw(tmpdir, tone(7) + silence(0.5) + tone(3))
+    client = mocker.Mock()
+    client.get_account.return_value = Account('a@b.c', 11)
+    client.account_monitor = AccountMonitor(client)
+
+    def submit(name, **options):
+        seconds = probe_duration(name)
+        client.account_monitor.commit(client.account_monitor.admit(seconds), name, seconds)
+        return make_job(name[-8:-4], JobStatus.IN_PROGRESS)
+    client.submit_job_local_file.side_effect = submit
+    client.iter_jobs.side_effect = lambda **kwargs: iter([
+        make_job('0000', JobStatus.TRANSCRIBED), make_job('0001', JobStatus.TRANSCRIBED)])
+    client.get_transcript_object.side_effect = lambda id_: make_transcript((id_, 1.0))
+
+    transcribe_segmented(client, filename, segment_length=8, overlap=0.2, rate=RATE,
+                         output_dir=str(tmpdir))
+
+    assert client.account_monitor.outstanding_seconds() == pytest.approx(10.71, abs=0.01)
+
+
+@pytest.mark.parametrize('segment_length, overlap', [(8, 3), (2, 1.5), (1, 0.1)])
+def test_transcribe_segmented_derives_a_valid_search_window(tmpdir, mocker, segment_length,
+                                                             overlap):
+    filename = write_raw(tmpdir, tone(3))
+    client = mocker.Mock()
+    client.account_monitor = None
+    client.submit_job_local_file.side_effect = \
+        lambda name, **options: make_job(name[-8:-4], JobStatus.IN_PROGRESS)
+    client.iter_jobs.side_effect = lambda **kwargs: iter([])
+    client.get_job_details.side_effect = lambda id_: make_job(id_, JobStatus.TRANSCRIBED)
+    client.get_transcript_object.side_effect = lambda id_: make_transcript((id_, 0.0))
+
+    transcript = transcribe_segmented(client, filename, segment_length=segment_length,
+                                      overlap=overlap, rate=RATE)
+
+    assert transcript.monologues
+
+
+@pytest.mark.parametrize('overlap', [-1, 8, 9])
+def test_transcribe_segmented_invalid_overlap(tmpdir, mocker, overlap):
+    with pytest.raises(ValueError, match='overlap must be'):
+        transcribe_segmented(mocker.Mock(), str(tmpdir.join('missing.wav')), segment_length=8,
+                             overlap=overlap, rate=RATE)
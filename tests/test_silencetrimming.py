@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for silence trimming"""
+
+import struct
+import wave
+import pytest
+from src.rev_ai import silencetrimming
+from src.rev_ai.silencetrimming import TimeMap, compact_silence
+from src.rev_ai.models.asynchronous import Transcript, Monologue, Element
+
+RATE = 1000
+
+
+def tone(seconds):
+    frames = int(seconds * RATE)
+    return struct.pack('<{}h'.format(frames), *([8000, -8000] * frames)[:frames])
+
+
+def silence(seconds):
+    return b'\0' * (2 * int(seconds * RATE))
+
+
+def read_frames(filename):
+    reader = wave.open(filename, 'rb')
+    try:
+        return reader.getnframes()
+    finally:
+        reader.close()
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def energy_backend(request, monkeypatch):
+    if request.param == 'python':
+        monkeypatch.setattr(silencetrimming, 'numpy', None)
+    elif silencetrimming.numpy is None:
+        pytest.skip('numpy is not installed')
+
+
+@pytest.mark.usefixtures('energy_backend')
+class TestCompactSilence():
+    def test_long_silences_are_shortened(self, tmpdir):
+        source = str(tmpdir.join('audio.raw'))
+        output = str(tmpdir.join('compacted.wav'))
+        with open(source, 'wb') as f:
+            f.write(silence(3) + tone(1) + silence(0.5) + tone(1) + silence(4) + tone(1)
+                    + silence(2))
+
+        time_map = compact_silence(source, output, rate=RATE, min_silence=1.0,
+                                   padding=0.2, window=0.1)
+
+        # leading: 0.2, short gap kept: 0.5, long gap: 0.4, trailing: 0.2
+        assert read_frames(output) == int(RATE * (0.2 + 1 + 0.5 + 1 + 0.4 + 1 + 0.2))
+        assert time_map == TimeMap([0.0, 2.9], [2.8, 9.3])
+        assert time_map.to_original(0.2) == pytest.approx(3.0)
+        assert time_map.to_original(3.0) == pytest.approx(9.4)
+
+    def test_audio_without_silence_is_unchanged(self, tmpdir):
+        source = str(tmpdir.join('audio.raw'))
+        output = str(tmpdir.join('compacted.wav'))
+        with open(source, 'wb') as f:
+            f.write(tone(2.05))
+
+        time_map = compact_silence(source, output, rate=RATE, window=0.1)
+
+        assert read_frames(output) == int(RATE * 2.05)
+        assert time_map == TimeMap([0.0], [0.0])
+
+    def test_wav_input(self, tmpdir):
+        source = str(tmpdir.join('audio.wav'))
+        output = str(tmpdir.join('compacted.wav'))
+        writer = wave.open(source, 'wb')
+        writer.setnchannels(1)
+        writer.setsampwidth(2)
+        writer.setframerate(RATE)
+        writer.writeframes(silence(2) + tone(1))
+        writer.close()
+
+        time_map = compact_silence(source, output, rate=16000, padding=0.1, window=0.1)
+
+        assert read_frames(output) == int(RATE * 1.1)
+        assert time_map == TimeMap([0.0], [1.9])
+
+
+def test_compact_silence_invalid_padding(tmpdir):
+    with pytest.raises(ValueError):
+        compact_silence('audio.raw', 'compacted.wav', min_silence=0.3, padding=0.2)
+
+
+def test_remap_transcript():
+    time_map = TimeMap([0.0, 2.0], [1.0, 10.0])
+    transcript = Transcript([Monologue(0, [
+        Element('text', 'hello', 0.5, 2.0, 0.9),
+        Element('punct', ' ', None, None, None),
+        Element('text', 'world', 2.0, 2.5, 0.9)])])
+
+    time_map.remap_transcript(transcript)
+
+    assert transcript == Transcript([Monologue(0, [
+        Element('text', 'hello', 1.5, 3.0, 0.9),
+        Element('punct', ' ', None, None, None),
+        Element('text', 'world', 10.0, 10.5, 0.9)])])
+
+
+def test_time_map_json_round_trip():
+    time_map = TimeMap([0.0, 2.0], [1.0, 10.0])
+
+    assert TimeMap.from_json(time_map.to_json()) == time_map
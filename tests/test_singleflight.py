@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for request coalescing"""
+
+import threading
+import pytest
+from src.rev_ai.apiclient import RevAiAPIClient
+from src.rev_ai.singleflight import SingleFlight
+
+
+def run_concurrently(function, count):
+    results = [None] * count
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, function()))
+               for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestSingleFlight():
+    def test_concurrent_calls_share_one_call(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def function():
+            calls.append(1)
+            release.wait(5)
+            return {'value': 1}
+
+        def call():
+            return single_flight.do('key', function, copy=dict)
+        threading.Timer(0.2, release.set).start()
+        results = run_concurrently(call, 5)
+
+        assert len(calls) == 1
+        assert results == [{'value': 1}] * 5
+        assert len(set(id(result) for result in results)) == 5
+        assert single_flight.stats() == {'calls': 1, 'saved': 4}
+
+    def test_sequential_calls_are_not_shared(self):
+        single_flight = SingleFlight()
+
+        assert single_flight.do('key', lambda: 1) == 1
+        assert single_flight.do('key', lambda: 2) == 2
+        assert single_flight.saved == 0
+
+    def test_error_is_raised_to_every_caller(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+        errors = []
+
+        def function():
+            release.wait(5)
+            raise ValueError('failed')
+
+        def call():
+            try:
+                single_flight.do('key', function)
+            except ValueError as err:
+                errors.append(err)
+        threading.Timer(0.2, release.set).start()
+        run_concurrently(call, 3)
+
+        assert len(errors) == 3
+        with pytest.raises(KeyError):
+            single_flight._in_flight['key']
+
+    def test_copy_error_is_raised_to_waiters(self):
+        single_flight = SingleFlight()
+        release = threading.Event()
+        results = []
+        errors = []
+
+        def copy(result):
+            raise TypeError('cannot copy')
+
+        def call():
+            try:
+                results.append(single_flight.do('key', lambda: release.wait(5), copy))
+            except TypeError as err:
+                errors.append(err)
+        threading.Timer(0.2, release.set).start()
+        run_concurrently(call, 3)
+
+        assert results == [True]
+        assert len(errors) == 2
+
+
+def test_client_coalesces_job_details(mock_session, make_mock_response):
+    release = threading.Event()
+    response = make_mock_response(json_data={'id': '1', 'created_on': '2018-05-05T23:23:22.29Z',
+                                             'status': 'transcribed'})
+
+    def request(*args, **kwargs):
+        release.wait(5)
+        return response
+    mock_session.request.side_effect = request
+    client = RevAiAPIClient('token')
+    threading.Timer(0.2, release.set).start()
+
+    jobs = run_concurrently(lambda: client.get_job_details('1'), 4)
+
+    assert mock_session.request.call_count == 1
+    assert all(job == jobs[0] for job in jobs)
+    assert len(set(id(job) for job in jobs)) == 4
+    assert client.single_flight.saved == 3
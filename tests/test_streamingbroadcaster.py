@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the streaming broadcaster"""
+
+import json
+import threading
+import pytest
+from src.rev_ai.streamingbroadcaster import StreamingBroadcaster, OverflowPolicy
+
+
+def make_response(type_, transcript):
+    return json.dumps({'type': type_, 'transcript': transcript})
+
+
+class TestStreamingBroadcaster():
+    def test_all_subscribers_receive_all_responses(self):
+        responses = [make_response('partial', 'a'), make_response('final', 'a b')]
+        broadcaster = StreamingBroadcaster(iter(responses))
+        first = broadcaster.subscribe('first')
+        second = broadcaster.subscribe('second')
+
+        broadcaster.start()
+
+        assert list(first) == responses
+        assert list(second) == responses
+        assert first.delivered == 2
+
+    def test_drop_partials_keeps_finals(self):
+        responses = [make_response('partial', 'a'),
+                     make_response('final', 'a'),
+                     make_response('partial', 'b'),
+                     make_response('partial', 'b c'),
+                     make_response('final', 'b c')]
+        broadcaster = StreamingBroadcaster(iter(responses), max_buffer_size=2)
+        subscription = broadcaster.subscribe()
+
+        broadcaster.start()
+        broadcaster.reader_thread.join()
+
+        assert list(subscription) == [responses[1], responses[4]]
+        assert subscription.dropped == 3
+        assert not subscription.disconnected
+
+    def test_disconnect_policy_drops_slow_subscriber(self):
+        responses = [make_response('final', str(i)) for i in range(5)]
+        broadcaster = StreamingBroadcaster(iter(responses), max_buffer_size=2)
+        slow = broadcaster.subscribe('slow', overflow_policy=OverflowPolicy.DISCONNECT)
+        fast = broadcaster.subscribe('fast', max_buffer_size=10)
+
+        broadcaster.start()
+        broadcaster.reader_thread.join()
+
+        assert slow.disconnected
+        assert list(slow) == []
+        assert list(fast) == responses
+
+    def test_block_policy_waits_for_subscriber(self):
+        responses = [make_response('final', str(i)) for i in range(5)]
+        broadcaster = StreamingBroadcaster(iter(responses), max_buffer_size=1,
+                                           overflow_policy=OverflowPolicy.BLOCK)
+        subscription = broadcaster.subscribe()
+
+        broadcaster.start()
+
+        assert list(subscription) == responses
+        assert subscription.dropped == 0
+
+    def test_block_policy_disconnects_after_timeout(self):
+        responses = [make_response('final', str(i)) for i in range(3)]
+        broadcaster = StreamingBroadcaster(iter(responses), max_buffer_size=1)
+        subscription = broadcaster.subscribe(overflow_policy=OverflowPolicy.BLOCK,
+                                             block_timeout=0.01)
+
+        broadcaster.start()
+        broadcaster.reader_thread.join()
+
+        assert subscription.disconnected
+
+    def test_block_policy_has_finite_default_timeout(self, monkeypatch):
+        monkeypatch.setattr('src.rev_ai.streamingbroadcaster.DEFAULT_BLOCK_TIMEOUT', 0.01)
+        responses = [make_response('final', str(i)) for i in range(3)]
+        broadcaster = StreamingBroadcaster(iter(responses), max_buffer_size=1,
+                                           overflow_policy=OverflowPolicy.BLOCK)
+        subscription = broadcaster.subscribe()
+
+        broadcaster.start()
+        broadcaster.reader_thread.join()
+
+        assert subscription.disconnected
+
+    def test_lag(self):
+        release = threading.Event()
+
+        def responses():
+            for i in range(3):
+                yield make_response('final', str(i))
+            release.wait()
+
+        broadcaster = StreamingBroadcaster(responses())
+        subscription = broadcaster.subscribe('analytics')
+        broadcaster.start()
+        next(subscription)
+        while subscription.lag < 2:
+            pass
+
+        assert broadcaster.lag() == {'analytics': 2}
+        release.set()
+
+    def test_reader_error_is_raised_to_subscribers(self):
+        def responses():
+            yield make_response('final', 'a')
+            raise RuntimeError('connection lost')
+
+        broadcaster = StreamingBroadcaster(responses())
+        subscription = broadcaster.subscribe()
+        broadcaster.start()
+
+        assert next(subscription) == make_response('final', 'a')
+        with pytest.raises(RuntimeError, match='connection lost'):
+            next(subscription)
+
+    def test_subscribe_after_end(self):
+        broadcaster = StreamingBroadcaster(iter([]))
+        broadcaster.start()
+        broadcaster.reader_thread.join()
+
+        with pytest.raises(RuntimeError):
+            broadcaster.subscribe()
@@ -3,9 +3,11 @@
 
 import pytest
 import six
+import threading
+import websocket
 from src.rev_ai import __version__
 from src.rev_ai.models.streaming import MediaConfig
-from src.rev_ai.streamingclient import RevAiStreamingClient
+from src.rev_ai.streamingclient import RevAiStreamingClient, StreamingTimeoutError
 
 try:
     from urllib.parse import parse_qs, urlparse
@@ -103,6 +105,57 @@ class TestStreamingClient():
         with pytest.raises(ZeroDivisionError):
             mock_streaming_client.start(mock_generator())
 
+    def test_start_skips_control_and_binary_frames(self, mock_streaming_client, mock_generator):
+        example_data = six.b('{"type":"final","transcript":"Test"}')
+        data = [[0x9, b'ping'],
+                [0xa, b'pong'],
+                [0x2, b'\x00\x01'],
+                [0x1, example_data],
+                [0x8, b'']]
+        mock_streaming_client.client.recv_data.side_effect = data
+
+        responses = list(mock_streaming_client.start(mock_generator()))
+
+        assert responses == [example_data.decode('utf-8') if six.PY3 else example_data]
+        mock_streaming_client.client.recv_data.assert_called_with(control_frame=True)
+
+    def test_start_records_message_bytes(self, mock_streaming_client, mock_generator, mocker):
+        example_data = u'{"type":"final","transcript":"café"}'.encode('utf-8')
+        mock_streaming_client.hooks = mocker.Mock()
+        mock_streaming_client.client.recv_data.side_effect = [[0x1, example_data], [0x8, b'']]
+
+        list(mock_streaming_client.start(mock_generator()))
+
+        mock_streaming_client.hooks.message_received.assert_called_once_with(
+            mocker.ANY, 'final', len(example_data))
+
+    def test_start_idle_timeout(self, mock_streaming_client, mock_generator, mocker):
+        mock_streaming_client.idle_timeout = 5
+        mock_streaming_client.client.settimeout = mocker.Mock(name="mock_settimeout")
+        mock_streaming_client.client.recv_data.side_effect = \
+            websocket.WebSocketTimeoutException('timed out')
+
+        response_gen = mock_streaming_client.start(mock_generator())
+
+        with pytest.raises(StreamingTimeoutError):
+            next(response_gen)
+        mock_streaming_client.client.settimeout.assert_called_once_with(5)
+        mock_streaming_client.client.abort.assert_called_once_with()
+        assert mock_streaming_client._stop_heartbeat.is_set()
+
+    def test_start_sends_heartbeats(self, mock_streaming_client, mock_generator, mocker):
+        pinged = threading.Event()
+        mock_streaming_client.heartbeat_interval = 0.01
+        mock_streaming_client.client.ping = mocker.Mock(side_effect=lambda: pinged.set())
+        mock_streaming_client.client.recv_data.side_effect = [[0x8, b'']]
+
+        response_gen = mock_streaming_client.start(mock_generator())
+
+        assert pinged.wait(1)
+        assert list(response_gen) == []
+        mock_streaming_client.heartbeat_thread.join(1)
+        assert not mock_streaming_client.heartbeat_thread.is_alive()
+
     def test_end(self, mock_streaming_client):
         mock_streaming_client.end()
 
@@ -3,8 +3,11 @@
 
 import pytest
 import json
-from src.rev_ai.models.asynchronous import Transcript, Monologue, Element
+from src.rev_ai.models import CustomVocabularyInformation, CustomVocabularyStatus
+from src.rev_ai.models.asynchronous import Transcript, Monologue, Element, Job, JobStatus, \
+    Account
 from src.rev_ai.apiclient import RevAiAPIClient
+from src.rev_ai.silencetrimming import TimeMap
 
 try:
     from urllib.parse import urljoin
@@ -147,7 +150,40 @@ class TestTranscriptEndpoints():
         mock_session.request.assert_called_once_with(
             "GET", URL, headers=expected_headers)
 
+    def test_get_transcript_object_with_time_map(self, mock_session, make_mock_response):
+        data = {
+            'monologues': [{
+                'speaker': 1,
+                'elements': [{
+                    'type': 'text',
+                    'value': 'Hello',
+                    'ts': 0.75,
+                    'end_ts': 1.25,
+                    'confidence': 0.85
+                }]
+            }]
+        }
+        expected = Transcript([Monologue(1, [Element('text', 'Hello', 10.75, 11.25, 0.85)])])
+        response = make_mock_response(url=URL, json_data=data)
+        mock_session.request.return_value = response
+
+        res = RevAiAPIClient(TOKEN).get_transcript_object(JOB_ID, TimeMap([0.0], [10.0]))
+
+        assert res == expected
+
     @pytest.mark.parametrize('id', [None, ''])
     def test_get_transcript_object_with_no_job_id(self, id, mock_session):
         with pytest.raises(ValueError, match='id_ must be provided'):
             RevAiAPIClient(TOKEN).get_transcript_object(id)
+
+
+@pytest.mark.parametrize('model', [
+    Transcript([]),
+    Monologue(0, []),
+    Element('text', 'a', 0.0, 0.5, 0.9),
+    Job('1', '2018-05-05T23:23:22.29Z', JobStatus.TRANSCRIBED),
+    Account('a@b.c', 10),
+    CustomVocabularyInformation('cv1', CustomVocabularyStatus.COMPLETE),
+])
+def test_models_use_slots(model):
+    assert not hasattr(model, '__dict__')
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the transcript time index"""
+
+import random
+
+from src.rev_ai.models.asynchronous import Transcript, Monologue, Element
+from src.rev_ai.transcriptindex import TranscriptIndex
+
+
+def word(value, start, end):
+    return Element('text', value, start, end, 0.9)
+
+
+def punct(value):
+    return Element('punct', value, None, None, None)
+
+
+TRANSCRIPT = Transcript([
+    Monologue(0, [word('Hello', 0.5, 1.0), punct(' '), word('there', 1.2, 1.6), punct('.')]),
+    Monologue(1, [word('General', 2.0, 2.5), punct(' '), word('Kenobi', 2.6, 3.4),
+                  punct('!')]),
+    Monologue(0, [word('Indeed', 5.0, 5.5)])])
+
+
+def values(elements):
+    return [element.value for element in elements]
+
+
+class TestTranscriptIndex():
+    def test_untimed_punctuation_is_skipped(self):
+        assert len(TranscriptIndex(TRANSCRIPT)) == 5
+
+    def test_element_at(self):
+        index = TranscriptIndex(TRANSCRIPT)
+
+        assert index.element_at(0.5).value == 'Hello'
+        assert index.element_at(0.99).value == 'Hello'
+        assert index.element_at(1.0) is None
+        assert index.element_at(2.6).value == 'Kenobi'
+        assert index.element_at(10) is None
+        assert index.element_at(0) is None
+
+    def test_elements_between(self):
+        index = TranscriptIndex(TRANSCRIPT)
+
+        assert values(index.elements_between(0.9, 2.1)) == ['Hello', 'there', 'General']
+        assert values(index.elements_between(1.0, 1.2)) == []
+        assert values(index.elements_between(3.0, 100)) == ['Kenobi', 'Indeed']
+        assert index.text_between(0, 2) == 'Hello there'
+
+    def test_speaker_at(self):
+        index = TranscriptIndex(TRANSCRIPT)
+
+        assert index.speaker_at(1.1) == 0
+        assert index.speaker_at(3.0) == 1
+        assert index.speaker_at(4.0) is None
+        assert index.speaker_at(5.2) == 0
+
+    def test_interleaved_channels_are_sorted(self):
+        transcript = Transcript([
+            Monologue(0, [word('a', 0.0, 1.0), word('c', 4.0, 5.0)]),
+            Monologue(1, [word('b', 2.0, 3.0)])])
+        index = TranscriptIndex(transcript)
+
+        assert values(index.elements_between(0, 10)) == ['a', 'b', 'c']
+        assert index.element_at(2.5).value == 'b'
+        assert index.speaker_at(2.5) == 1
+
+    def test_empty_transcript(self):
+        index = TranscriptIndex(Transcript([]))
+
+        assert index.element_at(1) is None
+        assert index.elements_between(0, 1) == []
+        assert index.speaker_at(1) is None
+
+    def test_long_element_does_not_hide_later_words(self):
+        words = [word(str(i), i + 0.1, i + 0.5) for i in range(1000)]
+        transcript = Transcript([Monologue(0, [word('music', 0.0, 2000.0)]),
+                                 Monologue(1, words)])
+        index = TranscriptIndex(transcript)
+
+        assert index.element_at(500.3).value == '500'
+        assert index.element_at(500.7).value == 'music'
+        assert values(index.elements_between(500.7, 502.2)) == ['music', '501', '502']
+        assert index.speaker_at(500.3) == 1
+        assert index.speaker_at(1500) == 0
+
+    def test_matches_linear_scan(self):
+        rng = random.Random(7)
+        elements = []
+        for i in range(300):
+            start = round(rng.uniform(0, 100), 1)
+            elements.append(word(str(i), start, start + round(rng.choice([0, 0.3, 1, 40]), 1)))
+        index = TranscriptIndex(Transcript([Monologue(0, elements)]))
+        ordered = sorted(elements, key=lambda e: (e.timestamp, e.end_timestamp))
+
+        for _ in range(200):
+            time = round(rng.uniform(-1, 101), 1)
+            end = time + round(rng.uniform(0, 5), 1)
+            spanning = [e for e in ordered if e.timestamp <= time and
+                        (time < e.end_timestamp or e.timestamp == e.end_timestamp == time)]
+            assert index.element_at(time) is (spanning[-1] if spanning else None)
+            assert index.elements_between(time, end) == [
+                e for e in ordered if e.timestamp < end and
+                (e.end_timestamp > time or e.timestamp == e.end_timestamp == time)]
@@ -1,13 +1,25 @@
 # -*- coding: utf-8 -*-
 """Unit tests for RevAi Utils"""
 
-from src.rev_ai.utils import _process_vocabularies
+from datetime import datetime, timedelta, tzinfo
+from src.rev_ai.utils import _process_vocabularies, _parse_datetime
 from src.rev_ai.models import CustomVocabulary
 
 phrases = ["Patrick Henry Winston", "Noam Chomsky"]
 other_phrases = ['Steve Jobs']
 
 
+class FixedOffset(tzinfo):
+    def __init__(self, hours):
+        self.offset = timedelta(hours=hours)
+
+    def utcoffset(self, dt):
+        return self.offset
+
+    def dst(self, dt):
+        return timedelta(0)
+
+
 class TestUtils:
     def test_process_vocabularies_with_custom_vocab_dict(self):
         customvocabs = [{'phrases': phrases}]
@@ -34,3 +46,13 @@ class TestUtils:
         processed_vocabs = _process_vocabularies([])
 
         assert processed_vocabs == []
+
+    def test_parse_datetime(self):
+        assert _parse_datetime('2018-05-05T23:23:22.29Z') == \
+            datetime(2018, 5, 5, 23, 23, 22, 290000)
+        assert _parse_datetime(datetime(2018, 5, 5)) == datetime(2018, 5, 5)
+
+    def test_parse_datetime_converts_aware_datetimes_to_utc(self):
+        value = datetime(2018, 5, 5, 2, 0, tzinfo=FixedOffset(3))
+
+        assert _parse_datetime(value) == datetime(2018, 5, 4, 23, 0)
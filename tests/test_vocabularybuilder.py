@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the custom vocabulary builder"""
+
+import io
+import json
+import pytest
+from src.rev_ai import utils
+from src.rev_ai.custom_vocabularies_client import RevAiCustomVocabulariesClient
+from src.rev_ai.models import CustomVocabulary
+from src.rev_ai.vocabularybuilder import VocabularyBuilder
+
+
+class TestVocabularyBuilder():
+    def test_normalizes_and_removes_duplicates(self):
+        builder = VocabularyBuilder()
+
+        added = builder.update(iter(['  Rev.ai ', 'speech\tto  text', 'Rev.ai', '', 'rev.ai']))
+
+        assert added == 3
+        assert builder.phrases == ['Rev.ai', 'speech to text', 'rev.ai']
+        assert builder.duplicates == 1
+
+    def test_byte_string_phrases_are_decoded(self):
+        builder = VocabularyBuilder()
+
+        builder.update([u'café'.encode('utf-8'), u'café', b'Rev.ai'])
+
+        assert builder.phrases == [u'café', u'Rev.ai']
+        assert builder.duplicates == 1
+
+    def test_ignore_case_keeps_first_spelling(self):
+        builder = VocabularyBuilder(ignore_case=True)
+
+        builder.update(['Noam Chomsky', 'noam chomsky', 'NOAM  CHOMSKY'])
+
+        assert builder.phrases == ['Noam Chomsky']
+
+    def test_lowercase(self):
+        builder = VocabularyBuilder(lowercase=True)
+
+        builder.update(['Noam Chomsky', 'noam chomsky'])
+
+        assert builder.phrases == ['noam chomsky']
+
+    def test_unicode_forms_are_duplicates(self):
+        builder = VocabularyBuilder()
+
+        builder.update([u'café', u'café'])
+
+        assert builder.phrases == [u'café']
+
+    def test_too_many_phrases(self):
+        builder = VocabularyBuilder(max_phrases=2)
+        builder.update(['a', 'b', 'a'])
+
+        with pytest.raises(ValueError, match='maximum of 2 distinct phrases'):
+            builder.add('c')
+
+    def test_phrase_too_long_in_file(self, tmpdir):
+        path = str(tmpdir.join('phrases.txt'))
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(u'short\n\n' + u'x' * 20 + u'\n')
+        builder = VocabularyBuilder(max_phrase_length=10)
+
+        with pytest.raises(ValueError, match='phrases.txt, line 3: .*20 characters long'):
+            builder.add_file(path)
+        assert builder.phrases == ['short']
+
+    def test_add_file(self, tmpdir):
+        path = str(tmpdir.join('phrases.txt'))
+        with io.open(path, 'w', encoding='utf-8') as f:
+            f.write(u'Patrick Henry Winston\nRobert C Berwick\n\nPatrick Henry Winston\n')
+
+        assert VocabularyBuilder().add_file(path) == 2
+
+    def test_add_file_without_collapsing_whitespace(self, tmpdir):
+        path = str(tmpdir.join('phrases.txt'))
+        with io.open(path, 'w', encoding='utf-8', newline='') as f:
+            f.write(u'Rev.ai\r\n\n  speech  to text\n   \nlast')
+        builder = VocabularyBuilder(collapse_whitespace=False)
+
+        assert builder.add_file(path) == 3
+        assert builder.phrases == ['Rev.ai', '  speech  to text', 'last']
+
+    def test_json(self, monkeypatch):
+        monkeypatch.setattr('src.rev_ai.vocabularybuilder._JSON_BATCH_SIZE', 2)
+        builder = VocabularyBuilder()
+        builder.update([u'a "quoted" word', u'café', 'c'])
+
+        assert json.loads(builder.to_json().decode('utf-8')) == builder.to_dict()
+        assert VocabularyBuilder().to_json() == b'{"phrases":[]}'
+
+    def test_usable_as_custom_vocabulary(self):
+        builder = VocabularyBuilder()
+        builder.update(['a', 'b'])
+
+        assert utils._process_vocabularies([builder, {'phrases': ['c']}]) == \
+            [{'phrases': ['a', 'b']}, {'phrases': ['c']}]
+        assert builder.to_custom_vocabulary().phrases == ['a', 'b']
+
+    def test_submissions_encode_builders_with_iter_json(self, mock_session, make_mock_response,
+                                                        mocker):
+        builder = VocabularyBuilder()
+        builder.update([u'café', 'b'])
+        iter_json = mocker.spy(builder, 'iter_json')
+        mock_session.request.return_value = make_mock_response(
+            json_data={'id': 'cv1', 'status': 'in_progress'})
+        client = RevAiCustomVocabulariesClient('token')
+
+        client.submit_custom_vocabularies([builder, CustomVocabulary(['c'])], metadata='m')
+
+        assert iter_json.call_count == 1
+        kwargs = mock_session.request.call_args[1]
+        assert json.loads(kwargs['data'].decode('utf-8')) == {
+            'custom_vocabularies': [{'phrases': [u'café', 'b']}, {'phrases': ['c']}],
+            'metadata': 'm'}
+        assert kwargs['headers']['Content-Type'] == 'application/json'
+
+    def test_json_body_without_other_options(self):
+        builder = VocabularyBuilder()
+        builder.add('a')
+
+        assert utils._json_body({'custom_vocabularies': [builder.to_dict()]}, [builder]) == \
+            b'{"custom_vocabularies":[{"phrases":["a"]}]}'
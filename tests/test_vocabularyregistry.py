@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Unit tests for the custom vocabulary registry"""
+
+import json
+import pytest
+from requests.exceptions import HTTPError
+from src.rev_ai.apiclient import RevAiAPIClient
+from src.rev_ai.custom_vocabularies_client import RevAiCustomVocabulariesClient
+from src.rev_ai.models import CustomVocabulary, MediaConfig
+from src.rev_ai.streamingclient import RevAiStreamingClient
+from src.rev_ai.vocabularyregistry import VocabularyRegistry
+
+PHRASES = ['Rev.ai', 'speech  to text', 'diarization']
+
+
+@pytest.fixture
+def client(mocker):
+    client = mocker.Mock()
+    client.submit_custom_vocabularies.return_value = {'id': 'cv1', 'status': 'in_progress'}
+    client.get_custom_vocabularies_information.side_effect = [
+        {'id': 'cv1', 'status': 'in_progress'}, {'id': 'cv1', 'status': 'complete'}]
+    mocker.patch('time.sleep')
+    return client
+
+
+@pytest.fixture
+def registry(client, tmpdir):
+    return VocabularyRegistry(client, str(tmpdir.join('vocabularies.db')))
+
+
+def not_found(mocker):
+    return HTTPError(response=mocker.Mock(status_code=404))
+
+
+class TestVocabularyRegistry():
+    def test_key_ignores_order_duplicates_and_spacing(self, registry):
+        key = registry.make_key(CustomVocabulary(PHRASES))
+
+        assert registry.make_key([CustomVocabulary(
+            ['diarization', ' speech to text', 'Rev.ai', 'diarization'])]) == key
+        assert registry.make_key([{'phrases': PHRASES}]) == key
+        assert registry.make_key(CustomVocabulary(['rev.ai'])) != key
+
+    def test_submits_once_and_waits_until_complete(self, registry, client):
+        assert registry.resolve(CustomVocabulary(PHRASES)) == 'cv1'
+        assert registry.resolve([CustomVocabulary(list(reversed(PHRASES)))]) == 'cv1'
+
+        assert client.submit_custom_vocabularies.call_count == 1
+        assert client.get_custom_vocabularies_information.call_count == 2
+
+    def test_mapping_is_persistent(self, registry, client, tmpdir):
+        registry.resolve(CustomVocabulary(PHRASES))
+        reopened = VocabularyRegistry(client, str(tmpdir.join('vocabularies.db')))
+
+        assert reopened.resolve(CustomVocabulary(PHRASES)) == 'cv1'
+        assert client.submit_custom_vocabularies.call_count == 1
+
+    def test_pending_vocabulary_deleted_on_server_is_submitted_again(
+            self, registry, client, mocker):
+        registry._connection().execute(
+            "INSERT INTO vocabularies VALUES (?, 'gone', 'in_progress', 0)",
+            (registry.make_key(CustomVocabulary(PHRASES)),))
+        client.get_custom_vocabularies_information.side_effect = [
+            not_found(mocker), {'id': 'cv1', 'status': 'complete'}]
+
+        assert registry.resolve(CustomVocabulary(PHRASES)) == 'cv1'
+        assert client.submit_custom_vocabularies.call_count == 1
+
+    def test_deleted_vocabulary_is_submitted_again(self, registry, client, mocker):
+        registry.resolve(CustomVocabulary(PHRASES))
+        vocabularies_client = RevAiCustomVocabulariesClient('token')
+        mocker.patch.object(vocabularies_client, '_make_http_request')
+        client.submit_custom_vocabularies.return_value = {'id': 'cv2', 'status': 'complete'}
+
+        vocabularies_client.delete_custom_vocabulary('cv1', vocabulary_registry=registry)
+
+        assert registry.get(CustomVocabulary(PHRASES)) is None
+        assert registry.resolve(CustomVocabulary(PHRASES)) == 'cv2'
+
+    def test_failed_vocabulary(self, registry, client):
+        client.get_custom_vocabularies_information.side_effect = [
+            {'id': 'cv1', 'status': 'failed', 'failure': 'internal_processing'}]
+
+        with pytest.raises(RuntimeError, match='internal_processing'):
+            registry.resolve(CustomVocabulary(PHRASES))
+        assert registry.get(CustomVocabulary(PHRASES)) is None
+
+    def test_timeout(self, client, tmpdir):
+        client.get_custom_vocabularies_information.side_effect = None
+        client.get_custom_vocabularies_information.return_value = {
+            'id': 'cv1', 'status': 'in_progress'}
+        registry = VocabularyRegistry(client, str(tmpdir.join('vocabularies.db')),
+                                      poll_interval=10, timeout=5)
+
+        with pytest.raises(RuntimeError, match='still in progress'):
+            registry.resolve(CustomVocabulary(PHRASES))
+
+
+@pytest.mark.usefixtures('mock_session', 'make_mock_response')
+def test_submit_job_url_with_custom_vocabulary(registry, mock_session, make_mock_response):
+    mock_session.request.return_value = make_mock_response(json_data={
+        'id': '1', 'status': 'in_progress', 'created_on': '2018-05-05T23:23:22.29Z'})
+    client = RevAiAPIClient('token', vocabulary_registry=registry)
+
+    client.submit_job_url('https://example.com/a.mp3',
+                          custom_vocabulary_id=CustomVocabulary(PHRASES))
+
+    body = json.loads(mock_session.request.call_args[1]['data'].decode('utf-8'))
+    assert body['custom_vocabulary_id'] == 'cv1'
+
+
+def test_custom_vocabulary_requires_registry(mock_session):
+    with pytest.raises(ValueError, match='vocabulary_registry'):
+        RevAiAPIClient('token').submit_job_url(
+            'https://example.com/a.mp3', custom_vocabulary_id=CustomVocabulary(PHRASES))
+
+
+def test_streaming_start_with_custom_vocabulary(registry, mocker):
+    client = RevAiStreamingClient('token', MediaConfig(), vocabulary_registry=registry)
+    client.client.connect = mocker.Mock()
+    mocker.patch('threading.Thread')
+
+    client.start(iter([]), custom_vocabulary_id=CustomVocabulary(PHRASES))
+
+    assert 'custom_vocabulary_id=cv1' in client.client.connect.call_args[0][0]